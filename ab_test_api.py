@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Analytics API
+=============
+
+Local HTTP/JSON service exposing the dashboard's statistics for alerting and
+notebooks, built on asyncio and the standard library only.
+
+    GET /summary           users, conversions and the detailed metrics per group
+    GET /tests             z / chi-square, Welch and Bayesian tests of B vs A
+    GET /segments          users and conversion rate per segment and group
+    GET /segments/scan     all-segments scan with corrected p-values
+    GET /distributions     pre-binned histogram counts per group
+    GET /health            dataset version, cache and request counters
+
+Every endpoint takes the sidebar filters as query parameters: start and end
+(ISO dates) and device, channel and region (comma-separated or repeated):
+
+    curl 'localhost:8765/tests?device=Mobile,Tablet&start=2024-01-05'
+
+Filtering the cube happens off the event loop; the statistics and the JSON
+encoding run in a worker pool, one task per request. Responses are cached as
+encoded JSON under (endpoint, dataset version, normalized filters, options),
+and identical requests that arrive while one is being computed wait for
+that computation instead of starting their own.
+
+    python ab_test_api.py ab_test_enriched.csv --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from ab_test_bayes import perform_bayesian_tests
+from ab_test_cache import ResultCache, filter_key
+from ab_test_cube import (apply_filters, group_totals, metrics_table,
+                          segment_table)
+from ab_test_dataset import Dataset
+from ab_test_histograms import HISTOGRAM_BINS, group_counts
+from ab_test_json import plain
+from ab_test_metrics import (CORRECTIONS, perform_continuous_tests,
+                             perform_statistical_tests)
+from ab_test_segments import SEGMENT_DIMENSIONS, scan_segments
+from ab_test_sql import ENGINES, SqlDataset
+from ab_test_storage import read_dataset
+
+# Columns the endpoints read (user_id is never used)
+DATASET_COLUMNS = ['group', 'visit_date', 'converted', 'session_duration_sec',
+                   'page_views', 'device', 'channel', 'region']
+
+BACKENDS = ('pandas',) + ENGINES
+
+
+def load_dataset(path, backend='pandas'):
+    """Dataset of an export, in memory or behind a SQL engine"""
+    if backend == 'pandas':
+        return Dataset(read_dataset(path, DATASET_COLUMNS))
+    return SqlDataset(path, backend)
+
+
+def _choice(values):
+    def parse(value):
+        if value not in values:
+            raise ValueError(f"expected one of {', '.join(values)}")
+        return value
+    return parse
+
+
+def _bounded(cast, low, high):
+    def parse(value):
+        value = cast(value)
+        if not low <= value <= high:
+            raise ValueError(f"expected {low}..{high}")
+        return value
+    return parse
+
+
+# Query parameters beyond the filters: endpoint -> {name: (parse, default)}
+OPTIONS = {
+    '/summary': {},
+    '/tests': {'draws': (_bounded(int, 1_000, 200_000), 20_000)},
+    '/segments': {'dimension': (_choice(SEGMENT_DIMENSIONS), None)},
+    '/segments/scan': {
+        'depth': (_bounded(int, 1, len(SEGMENT_DIMENSIONS)), 2),
+        'correction': (_choice(list(CORRECTIONS)), 'fdr_bh'),
+        'alpha': (_bounded(float, 0.0, 1.0), 0.05),
+        'min_users': (_bounded(int, 0, 10**12), 30),
+        'limit': (_bounded(int, 0, 10**7), 100),
+    },
+    '/distributions': {'metric': (_choice(list(HISTOGRAM_BINS)), None)},
+}
+
+
+def parse_filters(query, dates):
+    """(date_range, selections) from query parameters
+
+    A missing start or end defaults to the first or last of `dates`.
+    """
+    start, end = (query.get(name, [None])[-1] for name in ('start', 'end'))
+    date_range = None
+    if start or end:
+        date_range = (pd.Timestamp(start) if start else dates.min(),
+                      pd.Timestamp(end) if end else dates.max())
+    selections = {}
+    for dimension in SEGMENT_DIMENSIONS:
+        values = [value for item in query.get(dimension, [])
+                  for value in item.split(',') if value]
+        selections[dimension] = values
+    return date_range, selections
+
+
+def parse_options(path, query):
+    """Validated options of an endpoint, as a sorted tuple of pairs"""
+    options = {}
+    for name, (parse, default) in OPTIONS[path].items():
+        raw = query.get(name, [None])[-1]
+        try:
+            options[name] = default if raw in (None, '') else parse(raw)
+        except ValueError as error:
+            raise ValueError(f"{name}: {error}") from None
+    return tuple(sorted(options.items()))
+
+
+def endpoint_inputs(dataset, path, date_range, selections):
+    """Filtered cells an endpoint works on (cheap, cube-sized)"""
+    selections = [selections.get(d) for d in ('device', 'channel', 'region')]
+    if path == '/distributions':
+        return {'edges': dataset.edges,
+                'cells': {metric: apply_filters(cells, date_range, *selections)
+                          for metric, cells in dataset.histograms.items()}}
+    return {'cube': apply_filters(dataset.cube, date_range, *selections)}
+
+
+def summary_payload(cube):
+    """Users, conversions and detailed metrics per group
+
+    The overall counts include rows without a group.
+    """
+    totals = group_totals(cube)
+    users, conversions = int(cube['users'].sum()), int(
+        cube['conversions'].sum())
+    return {
+        'users': users,
+        'conversions': conversions,
+        'conversion_rate': conversions / users if users else None,
+        'groups': metrics_table(totals).rename_axis('group').reset_index(),
+    }
+
+
+def tests_payload(cube, draws):
+    """Proportion, Welch and Bayesian tests of B against A"""
+    totals = group_totals(cube)
+    return {
+        'proportion': perform_statistical_tests(totals),
+        'continuous': perform_continuous_tests(totals).rename_axis(
+            'metric').reset_index(),
+        'bayesian': perform_bayesian_tests(totals, draws=draws),
+    }
+
+
+def segments_payload(cube, dimension):
+    """Segment table of one dimension, or of each"""
+    return {name: segment_table(cube, name).reset_index()
+            for name in ([dimension] if dimension else SEGMENT_DIMENSIONS)}
+
+
+def scan_payload(cube, depth, correction, alpha, min_users, limit):
+    """Most significant segments of the scan, with family counts"""
+    segments = scan_segments(cube, depth, correction, alpha, min_users)
+    return {'segments_tested': int(segments['p_value'].notna().sum()),
+            'segments_significant': int(segments['significant'].sum()),
+            'segments': segments.head(limit)}
+
+
+def distributions_payload(edges, cells, metric):
+    """Bin edges and per-group counts of one metric, or of each"""
+    payload = {}
+    for name in ([metric] if metric else list(edges)):
+        counts = group_counts(cells[name], len(edges[name]) - 1)
+        payload[name] = {'edges': edges[name],
+                         'counts': {'A': counts[0], 'B': counts[1]}}
+    return payload
+
+
+PAYLOADS = {
+    '/summary': summary_payload,
+    '/tests': tests_payload,
+    '/segments': segments_payload,
+    '/segments/scan': scan_payload,
+    '/distributions': distributions_payload,
+}
+
+
+def render(path, inputs, options, version):
+    """Encoded JSON response of an endpoint (worker pool entry point)"""
+    payload = PAYLOADS[path](**inputs, **dict(options))
+    return json.dumps({'dataset_version': version, **plain(payload)},
+                      allow_nan=False).encode()
+
+
+class AnalyticsService:
+    """Request handling, response cache and coalescing around one dataset"""
+
+    def __init__(self, dataset, executor=None, cache=None):
+        self.dataset = dataset
+        # None runs the statistics in the event loop's default thread pool
+        self.executor = executor
+        self.cache = cache or ResultCache(max_entries=1024, max_bytes=256 << 20)
+        self._in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def health(self):
+        return {'dataset_version': self.dataset.version,
+                'rows': self.dataset.n_rows,
+                'requests': self.requests,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._in_flight),
+                'cache': self.cache.stats()}
+
+    async def respond(self, path, query):
+        """(status, JSON body, cache outcome) of one GET request"""
+        self.requests += 1
+        if path == '/health':
+            return HTTPStatus.OK, json.dumps(self.health()).encode(), 'none'
+        if path not in PAYLOADS:
+            return _error(HTTPStatus.NOT_FOUND, f"unknown endpoint {path}")
+        # One dataset snapshot per request, even if it is reloaded meanwhile
+        dataset = self.dataset
+        try:
+            date_range, selections = parse_filters(
+                query, dataset.cube['visit_date'])
+            options = parse_options(path, query)
+        except ValueError as error:
+            return _error(HTTPStatus.BAD_REQUEST, str(error))
+        key = (path, dataset.version,
+               filter_key(date_range, selections['device'],
+                          selections['channel'], selections['region']),
+               options)
+        found, body = self.cache.get(key)
+        if found:
+            return HTTPStatus.OK, body, 'hit'
+
+        task = self._in_flight.get(key)
+        outcome = 'coalesced'
+        if task is None:
+            outcome = 'miss'
+            task = asyncio.ensure_future(self._compute(
+                key, dataset, path, date_range, selections, options))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded: a client hanging up must not cancel the shared work
+        return HTTPStatus.OK, await asyncio.shield(task), outcome
+
+    async def _compute(self, key, dataset, path, date_range, selections,
+                       options):
+        loop = asyncio.get_running_loop()
+        inputs = await loop.run_in_executor(
+            None, endpoint_inputs, dataset, path, date_range, selections)
+        body = await loop.run_in_executor(self.executor, render, path, inputs,
+                                          options, dataset.version)
+        self.cache.put(key, body)
+        return body
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await _send(writer, *_error(
+                        HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                        "request head too large"), keep_alive=False)
+                    break
+                request_line, *header_lines = head.decode('latin-1') \
+                    .rstrip('\r\n').split('\r\n')
+                headers = dict(_header(line) for line in header_lines)
+                try:
+                    method, target, version = request_line.split(' ')
+                except ValueError:
+                    await _send(writer, *_error(HTTPStatus.BAD_REQUEST,
+                                                "malformed request line"),
+                                keep_alive=False)
+                    break
+                if int(headers.get('content-length', 0) or 0):
+                    await reader.readexactly(int(headers['content-length']))
+                keep_alive = (version == 'HTTP/1.1' and
+                              headers.get('connection', '').lower() != 'close')
+
+                if method not in ('GET', 'HEAD'):
+                    response = _error(HTTPStatus.METHOD_NOT_ALLOWED,
+                                      "only GET is supported")
+                else:
+                    url = urlsplit(target)
+                    try:
+                        response = await self.respond(
+                            url.path.rstrip('/') or '/', parse_qs(url.query))
+                    except Exception as error:  # reported, connection kept
+                        response = _error(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                          f"{type(error).__name__}: {error}")
+                await _send(writer, *response, keep_alive=keep_alive,
+                            head_only=method == 'HEAD')
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def watch(self, path, load, interval):
+        """Reload the dataset whenever its source changes
+
+        Cached responses are keyed by dataset version, so a reload makes
+        every request compute afresh; stale entries age out of the LRU.
+        """
+        loop = asyncio.get_running_loop()
+        modified = os.path.getmtime(path)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                current = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if current != modified:
+                modified = current
+                self.dataset = await loop.run_in_executor(None, load)
+                print(f"🔄 Reloaded {path}: {self.dataset.n_rows:,} rows "
+                      f"(version {self.dataset.version})")
+
+
+def _header(line):
+    name, _, value = line.partition(':')
+    return name.strip().lower(), value.strip()
+
+
+def _error(status, message):
+    return status, json.dumps({'error': message}).encode(), 'none'
+
+
+async def _send(writer, status, body, outcome, keep_alive=True,
+                head_only=False):
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"X-Cache: {outcome}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        .encode('latin-1') + (b'' if head_only else body))
+    await writer.drain()
+
+
+async def serve(path, host='127.0.0.1', port=8765, workers=1,
+                backend='pandas', watch=None):
+    """Load the dataset and serve the API until cancelled"""
+    def load():
+        return load_dataset(path, backend)
+
+    # Spawned (not forked) workers: the server runs threads of its own
+    executor = (ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        if workers > 0 else None)
+    try:
+        service = AnalyticsService(load(), executor)
+        server = await asyncio.start_server(service.handle_connection, host,
+                                            port)
+        address = server.sockets[0].getsockname()
+        print(f"✅ Serving {service.dataset.n_rows:,} rows (version "
+              f"{service.dataset.version}) on http://{address[0]}:{address[1]}",
+              flush=True)
+        if watch:
+            asyncio.ensure_future(service.watch(path, load, watch))
+        async with server:
+            await server.serve_forever()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def main():
+    """Run the analytics API from the command line"""
+    parser = argparse.ArgumentParser(
+        description="Local HTTP/JSON API for the A/B test statistics")
+    parser.add_argument('path', nargs='?', default='ab_test_enriched.csv',
+                        help="CSV export (or directory of exports for the "
+                             "SQL backends)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Worker processes for the statistics (0: threads "
+                             "of the server process)")
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help="Reload the dataset when the source changes")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.path, args.host, args.port, args.workers,
+                          args.backend, args.watch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
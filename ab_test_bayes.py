@@ -0,0 +1,147 @@
+"""
+Bayesian Analysis
+=================
+
+Beta-Binomial analysis of conversion rates. With a Beta(alpha, beta) prior
+and x conversions out of n users, the posterior is
+Beta(alpha + x, beta + n - x), so posterior means and credible intervals are
+closed form. P(B > A) and the expected loss of shipping either variant are
+estimated from posterior draws.
+
+Draws depend only on (group, users, conversions, prior, number of draws,
+seed) and are kept in a process-wide LRU cache under that key. Reruns, other filter
+states and segments that share a group's counts reuse the same draws.
+Comparisons are evaluated in batches, one row of draws per comparison.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import stats
+
+# Uniform prior on the conversion rate
+DEFAULT_PRIOR = (1.0, 1.0)
+
+
+class PosteriorDrawCache:
+    """Thread-safe LRU cache of posterior draws, bounded by bytes"""
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def draws(self, group, users, conversions, prior, n_draws, seed):
+        """float32 draws from the Beta posterior of one group's counts
+
+        Each group draws from its own random stream, so A and B with equal
+        counts still get independent draws.
+        """
+        key = (group, int(users), int(conversions), float(prior[0]),
+               float(prior[1]), int(n_draws), int(seed))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # Seeded from the key, so a group's draws never depend on which
+        # other groups were evaluated with it
+        rng = np.random.default_rng(np.random.SeedSequence(
+            int(seed), spawn_key=(ord(group), int(users), int(conversions),
+                                  *np.float64(prior).view('uint64'),
+                                  int(n_draws))))
+        values = rng.beta(prior[0] + conversions,
+                          prior[1] + users - conversions,
+                          size=n_draws).astype('float32')
+        values.flags.writeable = False
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = values
+                self.nbytes += values.nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return values
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+POSTERIOR_DRAWS = PosteriorDrawCache()
+
+
+def beta_posterior(users, conversions, prior=DEFAULT_PRIOR, credible=0.95):
+    """Closed-form posterior mean and equal-tailed credible interval"""
+    users, conversions = (np.asarray(v, dtype='float64')
+                          for v in (users, conversions))
+    alpha = prior[0] + conversions
+    beta = prior[1] + users - conversions
+    tail = (1 - credible) / 2
+    return {
+        'mean': alpha / (alpha + beta),
+        'ci_lower': stats.beta.ppf(tail, alpha, beta),
+        'ci_upper': stats.beta.ppf(1 - tail, alpha, beta),
+    }
+
+
+def batch_bayesian_tests(n_a, x_a, n_b, x_b, prior=DEFAULT_PRIOR,
+                         draws=20_000, credible=0.95, seed=42,
+                         cache=POSTERIOR_DRAWS, block_size=256):
+    """Beta-Binomial comparison of B against A for many comparisons
+
+    Takes arrays of group sizes (n) and conversions (x) like
+    batch_proportion_tests. Returns closed-form posterior means and credible
+    intervals per group, plus P(B > A) and the expected loss (in conversion
+    rate) of choosing A or B, estimated from `draws` posterior draws.
+    Comparisons are evaluated block_size at a time to bound memory.
+    """
+    n_a, x_a, n_b, x_b = (np.atleast_1d(np.asarray(v, dtype='int64'))
+                          for v in (n_a, x_a, n_b, x_b))
+    posterior_a = beta_posterior(n_a, x_a, prior, credible)
+    posterior_b = beta_posterior(n_b, x_b, prior, credible)
+
+    prob_b_better = np.empty(len(n_a))
+    loss_a = np.empty(len(n_a))
+    loss_b = np.empty(len(n_a))
+    for start in range(0, len(n_a), block_size):
+        rows = range(start, min(start + block_size, len(n_a)))
+        draws_a, draws_b = (
+            np.stack([cache.draws(group, n[i], x[i], prior, draws, seed)
+                      for i in rows])
+            for group, n, x in (('A', n_a, x_a), ('B', n_b, x_b)))
+        difference = draws_b - draws_a
+        prob_b_better[rows.start:rows.stop] = (difference > 0).mean(axis=1)
+        # Conversion rate given up by shipping the worse variant
+        loss_b[rows.start:rows.stop] = np.maximum(-difference, 0).mean(axis=1)
+        loss_a[rows.start:rows.stop] = np.maximum(difference, 0).mean(axis=1)
+
+    return {
+        'mean_a': posterior_a['mean'],
+        'ci_lower_a': posterior_a['ci_lower'],
+        'ci_upper_a': posterior_a['ci_upper'],
+        'mean_b': posterior_b['mean'],
+        'ci_lower_b': posterior_b['ci_lower'],
+        'ci_upper_b': posterior_b['ci_upper'],
+        'prob_b_better': prob_b_better,
+        'expected_loss_a': loss_a,
+        'expected_loss_b': loss_b,
+    }
+
+
+def perform_bayesian_tests(totals, prior=DEFAULT_PRIOR, draws=20_000):
+    """Bayesian comparison of the two groups from per-group totals"""
+    results = batch_bayesian_tests(
+        totals.loc['A', 'users'], totals.loc['A', 'conversions'],
+        totals.loc['B', 'users'], totals.loc['B', 'conversions'],
+        prior, draws)
+    return {name: float(value[0]) for name, value in results.items()}
@@ -0,0 +1,165 @@
+"""
+Bootstrap Confidence Intervals
+==============================
+
+Bootstrap CIs for the B - A difference in means and in medians of skewed
+continuous metrics such as session duration and page views.
+
+Each group is compressed to its support (distinct values and counts), so a
+bootstrap replicate is a single multinomial draw of counts over the support
+instead of a resample of every row. Replicates are drawn in blocks, and
+blocks are spread over a process pool with independent, reproducible seeds.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+
+def compress_support(values, max_support=4096):
+    """Distinct values and their counts, binned when there are too many
+
+    Continuous data with more than max_support distinct values is binned on
+    an equal-width grid; each bin is represented by the mean of its values so
+    sample means are preserved exactly and medians to within half a bin.
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    support, counts = np.unique(values, return_counts=True)
+    if len(support) <= max_support:
+        return support, counts
+
+    edges = np.linspace(support[0], support[-1], max_support + 1)
+    bins = np.clip(np.searchsorted(edges, support, side='right') - 1,
+                   0, max_support - 1)
+    bin_counts = np.bincount(bins, weights=counts, minlength=max_support)
+    bin_sums = np.bincount(bins, weights=support * counts,
+                           minlength=max_support)
+    occupied = bin_counts > 0
+    return (bin_sums[occupied] / bin_counts[occupied],
+            bin_counts[occupied].astype('int64'))
+
+
+def _medians(support, resampled_counts, n):
+    """Median of each resampled row of counts over a sorted support"""
+    cumulative = np.cumsum(resampled_counts, axis=1)
+    # 1-based ranks of the two middle order statistics
+    lower_rank, upper_rank = (n + 1) // 2, n // 2 + 1
+    lower = support[(cumulative < lower_rank).sum(axis=1)]
+    upper = support[(cumulative < upper_rank).sum(axis=1)]
+    return (lower + upper) / 2
+
+
+def _resample_block(support_a, counts_a, support_b, counts_b, replicates,
+                    seed):
+    """Draw one block of replicates; returns (mean diffs, median diffs)"""
+    rng = np.random.default_rng(seed)
+    n_a, n_b = counts_a.sum(), counts_b.sum()
+    draws_a = rng.multinomial(n_a, counts_a / n_a, size=replicates)
+    draws_b = rng.multinomial(n_b, counts_b / n_b, size=replicates)
+    mean_diffs = draws_b @ support_b / n_b - draws_a @ support_a / n_a
+    median_diffs = (_medians(support_b, draws_b, n_b) -
+                    _medians(support_a, draws_a, n_a))
+    return mean_diffs, median_diffs
+
+
+def _weighted_median(support, counts):
+    """Median of the compressed sample"""
+    return _medians(support, counts[None, :], counts.sum())[0]
+
+
+def bootstrap_differences(values_a, values_b, replicates=10_000, seed=42,
+                          confidence=0.95, block_size=250, workers=1,
+                          executor=None, time_budget=None, max_support=4096):
+    """Bootstrap CIs for B - A differences in means and medians
+
+    Replicates are drawn in blocks of block_size, each seeded from
+    (seed, block index), so results do not depend on how blocks are spread
+    over workers. Blocks run in `executor` when given, otherwise in a
+    temporary process pool when workers > 1, otherwise inline. With a
+    time_budget (seconds) the blocks finished by the deadline are used and
+    the result reports how many replicates that was.
+    """
+    support_a, counts_a = compress_support(values_a, max_support)
+    support_b, counts_b = compress_support(values_b, max_support)
+    if counts_a.sum() < 2 or counts_b.sum() < 2:
+        raise ValueError("Each group needs at least two observations")
+
+    seeds = np.random.SeedSequence(seed).spawn(
+        -(-replicates // block_size))
+    blocks = [(support_a, counts_a, support_b, counts_b,
+               min(block_size, replicates - i * block_size), block_seed)
+              for i, block_seed in enumerate(seeds)]
+
+    start = time.perf_counter()
+    deadline = None if time_budget is None else start + time_budget
+    results = {}
+
+    if executor is None and workers <= 1:
+        for index, block in enumerate(blocks):
+            if deadline is not None and results and \
+                    time.perf_counter() > deadline:
+                break
+            results[index] = _resample_block(*block)
+    else:
+        own_executor = executor is None
+        executor = executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = {executor.submit(_resample_block, *block): index
+                       for index, block in enumerate(blocks)}
+            pending = set(futures)
+            while pending:
+                # Until one block is in, wait for it whatever the deadline
+                timeout = (None if deadline is None or not results
+                           else max(deadline - time.perf_counter(), 0))
+                done, pending = wait(pending, timeout=timeout,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+                if not done and results:
+                    # Out of time: keep what finished
+                    break
+            for future in pending:
+                future.cancel()
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    # Concatenate in block order so the replicate set is reproducible
+    ordered = [results[index] for index in sorted(results)]
+    mean_diffs = np.concatenate([block[0] for block in ordered])
+    median_diffs = np.concatenate([block[1] for block in ordered])
+
+    tail = (1 - confidence) / 2 * 100
+    observed_mean = (support_b @ counts_b / counts_b.sum() -
+                     support_a @ counts_a / counts_a.sum())
+    observed_median = (_weighted_median(support_b, counts_b) -
+                       _weighted_median(support_a, counts_a))
+    mean_ci = np.percentile(mean_diffs, [tail, 100 - tail])
+    median_ci = np.percentile(median_diffs, [tail, 100 - tail])
+
+    return {
+        'mean_difference': observed_mean,
+        'mean_ci_lower': mean_ci[0],
+        'mean_ci_upper': mean_ci[1],
+        'median_difference': observed_median,
+        'median_ci_lower': median_ci[0],
+        'median_ci_upper': median_ci[1],
+        'replicates': len(mean_diffs),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def bootstrap_metrics(df, metrics=('session_duration_sec', 'page_views'),
+                      **kwargs):
+    """Bootstrap table (one row per metric) for the A/B groups of a frame"""
+    in_a = (df['group'] == 'A').to_numpy()
+    in_b = (df['group'] == 'B').to_numpy()
+    rows = {}
+    for metric in metrics:
+        values = df[metric].to_numpy()
+        rows[metric] = bootstrap_differences(values[in_a], values[in_b],
+                                             **kwargs)
+    return pd.DataFrame(rows).T
@@ -0,0 +1,148 @@
+"""
+Result Cache
+============
+
+Process-wide LRU cache for statistics and figures, keyed on the dataset
+version and the normalized filter state, so repeated views are served
+without re-running scipy or rebuilding Plotly figures.
+"""
+
+import dataclasses
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from plotly.basedatatypes import BaseFigure
+
+from ab_test_filters import selected_values
+
+
+def dataset_version(frame):
+    """Content hash identifying a dataset (or its cube)"""
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(','.join(map(str, frame.columns)).encode())
+    return digest.hexdigest()[:16]
+
+
+def filter_key(date_range=None, devices=None, channels=None, regions=None):
+    """Hashable, order-independent representation of the sidebar filters"""
+    def normalize(selection):
+        values = selected_values(selection)
+        return None if values is None else tuple(sorted(map(str, values)))
+
+    dates = (None if date_range is None
+             else tuple(pd.Timestamp(d).date().isoformat() for d in date_range))
+    return (dates, normalize(devices), normalize(channels), normalize(regions))
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a cached value in bytes
+
+    Frames, arrays, figures and containers of them are measured in place;
+    anything else by its pickled length. Returns None for values that
+    cannot be sized, which are not cached.
+    """
+    if value is None or isinstance(value, (bool, int, float, np.generic)):
+        return 32
+    if isinstance(value, (str, bytes)):
+        return 64 + len(value)
+    if isinstance(value, np.ndarray):
+        return 128 + (value.nbytes if value.dtype != object else
+                      sum(estimate_size(item) or 0 for item in value.flat))
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return 128 + int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, BaseFigure):
+        # The figure's own dicts of trace data; no JSON encoding needed
+        return estimate_size(value.to_plotly_json())
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = [getattr(value, field.name)
+                 for field in dataclasses.fields(value)]
+    if isinstance(value, dict):
+        value = list(value.keys()) + list(value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        sizes = [estimate_size(item) for item in value]
+        return None if None in sizes else 64 + 8 * len(sizes) + sum(sizes)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes
+
+    Values are shared between callers (and Streamlit sessions) and must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=512 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, keep=None):
+        """Return the cached value for key, computing and storing it on a miss
+
+        With `keep`, a computed value is only stored if keep(value) is true.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        if keep is None or keep(value):
+            self.put(key, value)
+        return value
+
+    def get(self, key):
+        """(True, value) for a cached key, (False, None) otherwise"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries"""
+        size = estimate_size(value)
+        with self._lock:
+            # Values of unknown size could exceed max_bytes unnoticed
+            if size is None or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while (len(self._entries) > self.max_entries or
+                   self.nbytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Counters for display and monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,223 @@
+"""
+Chart Builders
+==============
+
+Plotly figures of the dashboard, built from cube-sized aggregates: the
+filtered cube, the daily series and the pre-binned histogram counts.
+
+Nothing here imports Streamlit, so the static reports, the benchmarks and
+their worker processes build the same figures as the dashboard without
+starting the app.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from ab_test_cube import GROUPS, segment_rates
+from ab_test_histograms import group_counts
+
+
+def create_conversion_comparison_chart(totals):
+    """Create conversion rate comparison chart"""
+    conversion_rates = pd.DataFrame({
+        'Group': totals.index.astype(str),
+        'Conversion Rate': (totals['conversions'] / totals['users']).to_numpy(),
+        'Sample Size': totals['users'].to_numpy()
+    })
+
+    fig = px.bar(
+        conversion_rates,
+        x='Group',
+        y='Conversion Rate',
+        text=conversion_rates['Conversion Rate'].apply(lambda x: f'{x:.3f}'),
+        color='Group',
+        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'},
+        title='Conversion Rate Comparison: Group A vs Group B'
+    )
+
+    fig.update_traces(textposition='outside')
+    fig.update_layout(
+        yaxis_title='Conversion Rate',
+        showlegend=False,
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(
+            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
+        title_font_size=18,
+        title_font_color='#ffffff'
+    )
+
+    return fig
+
+
+def create_timeseries_chart(series):
+    """Daily and cumulative conversion, running lift and running z-statistic"""
+    # Three stacked panels on one shared x axis, laid out by hand: this
+    # figure is rebuilt for every new filter state and make_subplots /
+    # add_hline dominate its cost
+    days = series.index
+    traces = []
+    for group, color in (('A', '#00d4ff'), ('B', '#ff6b6b')):
+        suffix = group.lower()
+        traces.append(go.Scatter(
+            x=days, y=series[f'rate_{suffix}'], mode='markers',
+            marker=dict(color=color, size=5, opacity=0.4),
+            name=f'Group {group} daily', showlegend=False))
+        traces.append(go.Scatter(
+            x=days, y=series[f'cumulative_rate_{suffix}'], mode='lines',
+            line=dict(color=color, width=2), name=f'Group {group}'))
+
+    # The CI of the difference, relative to A's cumulative rate
+    baseline = series['cumulative_rate_a'] / 100
+    traces.append(go.Scatter(
+        x=days, y=series['ci_upper'] / baseline, mode='lines',
+        line=dict(width=0), showlegend=False, hoverinfo='skip', yaxis='y2'))
+    traces.append(go.Scatter(
+        x=days, y=series['ci_lower'] / baseline, mode='lines',
+        line=dict(width=0), fill='tonexty',
+        fillcolor='rgba(255, 107, 107, 0.2)', showlegend=False,
+        hoverinfo='skip', yaxis='y2'))
+    traces.append(go.Scatter(
+        x=days, y=series['relative_improvement'], mode='lines',
+        line=dict(color='#ff6b6b'), name='Lift (%)', showlegend=False,
+        yaxis='y2'))
+    traces.append(go.Scatter(
+        x=days, y=series['z_statistic'], mode='lines',
+        line=dict(color='#ffd166'), name='Z', showlegend=False, yaxis='y3'))
+
+    # Zero lift and the two-sided 5% critical values of z
+    reference_lines = [dict(type='line', xref='paper', x0=0, x1=1,
+                            yref=axis, y0=y, y1=y,
+                            line=dict(color='#888888', dash=dash))
+                       for axis, y, dash in (('y2', 0, 'dot'),
+                                             ('y3', -1.96, 'dash'),
+                                             ('y3', 1.96, 'dash'))]
+    titles = [dict(text=text, x=0.5, y=top, xref='paper', yref='paper',
+                   xanchor='center', yanchor='bottom', showarrow=False)
+              for text, top in (
+                  ('Conversion Rate (markers: daily, lines: cumulative)', 1.0),
+                  ('Cumulative Lift of B over A (%) with 95% CI', 0.49),
+                  ('Running Z-Statistic', 0.2))]
+
+    return go.Figure(data=traces, layout=dict(
+        height=700,
+        xaxis=dict(anchor='y3'),
+        yaxis=dict(domain=[0.55, 1.0], title='Conversion Rate'),
+        yaxis2=dict(domain=[0.26, 0.49], title='Lift (%)'),
+        yaxis3=dict(domain=[0.0, 0.2], title='Z'),
+        shapes=reference_lines,
+        annotations=titles,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(
+            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
+        legend=dict(orientation='h', y=1.1)
+    ))
+
+
+# Segment dimensions, their tab labels and chart titles
+SEGMENT_TABS = {
+    'device': ("Device", 'Conversion Rate by Device Type'),
+    'channel': ("Channel", 'Conversion Rate by Channel'),
+    'region': ("Region", 'Conversion Rate by Region'),
+}
+
+
+def create_segment_chart(cube, dimension):
+    """Create the conversion rate chart of one segment dimension"""
+    segment_conv = segment_rates(cube, dimension)
+    fig = px.bar(
+        segment_conv,
+        x=dimension,
+        y='converted',
+        color='group',
+        barmode='group',
+        title=SEGMENT_TABS[dimension][1],
+        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'}
+    )
+    fig.update_layout(
+        yaxis_title='Conversion Rate',
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(
+            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
+        title_font_size=16,
+        title_font_color='#ffffff'
+    )
+    return fig
+
+
+def create_segmentation_charts(cube):
+    """Create segmentation analysis charts"""
+    return tuple(create_segment_chart(cube, dimension)
+                 for dimension in SEGMENT_TABS)
+
+
+def create_histogram_figure(cells, edges, title):
+    """Create an A/B histogram from pre-binned counts, one bar per bin"""
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
+    counts = group_counts(cells, len(centers))
+    colors = {'A': '#00d4ff', 'B': '#ff6b6b'}
+
+    fig = go.Figure()
+    for group, group_count in zip(GROUPS, counts):
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=group_count,
+            width=widths,
+            name=group,
+            marker_color=colors[group],
+            opacity=0.7,
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate=('group=' + group + '<br>%{customdata[0]:.4g} - '
+                           '%{customdata[1]:.4g}<br>count=%{y}<extra></extra>')
+        ))
+    fig.update_layout(title=title, barmode='relative', bargap=0,
+                      legend_title_text='group')
+    return fig
+
+
+def create_distribution_charts(histograms, edges):
+    """Create distribution charts for session duration and page views
+
+    `histograms` holds the filtered per-cell bin counts of each metric, so
+    the figures carry one bar per bin whatever the number of users.
+    """
+    # Session duration distribution
+    fig_duration = create_histogram_figure(
+        histograms['session_duration_sec'], edges['session_duration_sec'],
+        'Session Duration Distribution')
+    fig_duration.update_layout(
+        xaxis_title='Session Duration (seconds)',
+        yaxis_title='Count',
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(
+            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
+        title_font_size=16,
+        title_font_color='#ffffff'
+    )
+
+    # Page views distribution
+    fig_pages = create_histogram_figure(
+        histograms['page_views'], edges['page_views'],
+        'Page Views Distribution')
+    fig_pages.update_layout(
+        xaxis_title='Page Views',
+        yaxis_title='Count',
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(
+            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
+        title_font_size=16,
+        title_font_color='#ffffff'
+    )
+
+    return fig_duration, fig_pages
@@ -0,0 +1,135 @@
+"""
+Sufficient-Statistics Cube
+==========================
+
+Per-cell user counts, conversion sums and sums / sums-of-squares of the
+continuous metrics, keyed by (visit_date, device, channel, region, group).
+
+Filters, KPI cards, significance tests, segment bars and the mean/std table
+are all derived from these cells, so the cost of an interaction depends on
+the number of cells rather than the number of users.
+
+Rows missing a key (a blank device, say) keep their own cell with that key
+missing, so every row is counted: they pass the 'All' filters and count in
+their group's totals. Rows without a group count in the users of the cube
+but in neither group; `ungrouped_totals` adds them up.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ab_test_filters import selected_values
+
+CUBE_KEYS = ['visit_date', 'device', 'channel', 'region', 'group']
+
+GROUPS = ['A', 'B']
+
+# Continuous metrics and the prefix of their sum / sum-of-squares columns
+MOMENT_METRICS = {
+    'session_duration_sec': 'duration',
+    'page_views': 'page_views',
+}
+
+SUM_COLUMNS = ['users', 'conversions',
+               'duration_sum', 'duration_sumsq',
+               'page_views_sum', 'page_views_sumsq']
+
+
+def build_cube(df, keys=CUBE_KEYS):
+    """Aggregate row-level data into one row of sufficient statistics per cell"""
+    values = {'conversions': df['converted'].astype('int64')}
+    for column, prefix in MOMENT_METRICS.items():
+        # Accumulate in float64 whatever the storage dtype is
+        metric = df[column].astype('float64')
+        values[f'{prefix}_sum'] = metric
+        values[f'{prefix}_sumsq'] = metric * metric
+    values = pd.DataFrame(values, index=df.index)
+
+    grouped = values.groupby([df[key] for key in keys], observed=True,
+                             dropna=False)
+    cube = grouped.sum()
+    cube.insert(0, 'users', grouped.size())
+    return cube.reset_index()
+
+
+def merge_cubes(cubes, keys=CUBE_KEYS):
+    """Add up the cells of cubes built from disjoint sets of rows"""
+    cubes = [cube for cube in cubes if cube is not None and len(cube)]
+    if len(cubes) <= 1:
+        return cubes[0] if cubes else None
+    combined = pd.concat(cubes, ignore_index=True)
+    return combined.groupby(keys, observed=True, dropna=False)[
+        SUM_COLUMNS].sum().reset_index()
+
+
+def apply_filters(frame, date_range=None, device='All', channel='All',
+                  region='All'):
+    """Return the rows of a cube (or of the raw data) matching the sidebar filters
+
+    device, channel and region take 'All', a single value or a list of values.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if date_range is not None:
+        start, end = (pd.Timestamp(d) for d in date_range)
+        mask &= ((frame['visit_date'] >= start) &
+                 (frame['visit_date'] <= end)).to_numpy()
+    for column, value in (('device', device), ('channel', channel),
+                          ('region', region)):
+        values = selected_values(value)
+        if values is not None:
+            mask &= frame[column].isin(values).to_numpy()
+    return frame if mask.all() else frame[mask]
+
+
+def group_totals(cube):
+    """Sum the cells into one row of sufficient statistics per group"""
+    totals = cube.groupby('group', observed=True)[SUM_COLUMNS].sum()
+    totals.index = totals.index.astype(str)
+    return totals.reindex(GROUPS, fill_value=0)
+
+
+def ungrouped_totals(cube):
+    """Sufficient statistics of the cells whose group is missing (neither A nor B)"""
+    return cube.loc[cube['group'].isna(), SUM_COLUMNS].sum()
+
+
+def segment_table(cube, dimension):
+    """Users, conversions and conversion rate per (dimension, group)"""
+    segments = cube.groupby([dimension, 'group'], observed=True)[
+        ['users', 'conversions']].sum()
+    segments.columns = ['Users', 'Conversions']
+    segments['Conv_Rate'] = segments['Conversions'] / segments['Users']
+    return segments
+
+
+def segment_rates(cube, dimension):
+    """Conversion rate per (dimension, group), as plotted by the segment bars"""
+    segments = segment_table(cube, dimension).reset_index()
+    return segments.rename(columns={'Conv_Rate': 'converted'})[
+        [dimension, 'group', 'converted']]
+
+
+def moment_stats(totals, prefix):
+    """Mean and sample standard deviation from sums and sums-of-squares"""
+    n = totals['users'].astype('float64')
+    total = totals[f'{prefix}_sum']
+    mean = total / n
+    # Clip tiny negative variances caused by floating point cancellation
+    variance = ((totals[f'{prefix}_sumsq'] - total * mean) /
+                (n - 1).where(n > 1)).clip(lower=0)
+    return mean, np.sqrt(variance)
+
+
+def metrics_table(totals):
+    """Detailed metrics table (count/sum/mean of conversions, mean/std of metrics)"""
+    table = pd.DataFrame({
+        'Users': totals['users'],
+        'Conversions': totals['conversions'],
+        'Conv_Rate': totals['conversions'] / totals['users'],
+    })
+    for label, prefix in (('Session_Duration', 'duration'),
+                          ('Page_Views', 'page_views')):
+        mean, std = moment_stats(totals, prefix)
+        table[f'Avg_{label}'] = mean
+        table[f'Std_{label}'] = std
+    return table.round(3)
@@ -1,11 +1,28 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from scipy import stats
+import functools
+import multiprocessing
+import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from ab_test_bayes import DEFAULT_PRIOR, perform_bayesian_tests
+from ab_test_bootstrap import bootstrap_metrics
+from ab_test_cache import ResultCache, filter_key
+from ab_test_charts import (SEGMENT_TABS, create_conversion_comparison_chart,
+                            create_distribution_charts, create_segment_chart,
+                            create_timeseries_chart)
+from ab_test_cube import apply_filters
+from ab_test_dataset import Dataset
+from ab_test_filters import sort_by_date
+from ab_test_generator import GeneratorConfig, generate_dataset
+from ab_test_ingest import IncrementalDataset
+from ab_test_profiling import PROFILER, profiled, stage
+from ab_test_segments import SEGMENT_DIMENSIONS, scan_segments
+from ab_test_sql import SqlDataset, default_engine
+from ab_test_metrics import CORRECTIONS, summarize_cube
+from ab_test_storage import (memory_report, read_dataset, read_shared,
+                              shared_path, write_shared)
 warnings.filterwarnings('ignore')
 
 # Page configuration
@@ -216,373 +233,226 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
-def load_data():
-    """Load and cache the A/B test data"""
-    try:
-        # Try to load the CSV file
-        df = pd.read_csv('ab_test_enriched.csv')
-    except FileNotFoundError:
-        # If file doesn't exist, generate sample data
-        st.info("📁 Sample data file not found. Generating sample A/B test data...")
-        df = generate_sample_data()
+# Columns read by the dashboard views (user_id is never displayed)
+DASHBOARD_COLUMNS = ('group', 'visit_date', 'converted', 'session_duration_sec',
+                     'page_views', 'device', 'channel', 'region')
 
-    return df
 
+# Source export of the dashboard
+DATA_PATH = 'ab_test_enriched.csv'
 
-def generate_sample_data():
-    """Generate sample A/B test data for demonstration"""
-    np.random.seed(42)
-    n_users = 10000
+# Serve every session from one memory-mapped, read-only copy of the rows
+SHARED_DATASET = os.environ.get('AB_TEST_SHARED', '0').lower() not in (
+    '', '0', 'false', 'no')
 
-    # To create user IDs
-    user_ids = [f"user_{i:06d}" for i in range(1, n_users + 1)]
+# 'pandas' loads the rows into memory; 'sql' (DuckDB if installed, else
+# SQLite), 'duckdb' or 'sqlite' leave them on disk behind an embedded engine
+BACKEND = os.environ.get('AB_TEST_BACKEND', 'pandas').lower()
 
-    # Randomly assign groups (A/B)
-    groups = np.random.choice(['A', 'B'], size=n_users, p=[0.5, 0.5])
 
-    # Generate conversion data with different rates for A and B
-    conversions = []
-    for group in groups:
-        if group == 'A':
-            # Group A has 12% conversion rate
-            conversions.append(np.random.choice([0, 1], p=[0.88, 0.12]))
-        else:
-            # Group B has 15% conversion rate (25% improvement)
-            conversions.append(np.random.choice([0, 1], p=[0.85, 0.15]))
-
-    # Generate session duration (in seconds)
-    session_durations = np.random.exponential(300, n_users)
-    session_durations = np.clip(session_durations, 30, 1800)
-
-    # Generate page views
-    page_views = np.random.poisson(8, n_users)
-    page_views = np.clip(page_views, 1, 50)
-
-    # Generate device types
-    devices = np.random.choice(
-        ['Desktop', 'Mobile', 'Tablet'], size=n_users, p=[0.6, 0.35, 0.05])
-
-    # Generate channels
-    channels = np.random.choice(['Organic', 'Paid', 'Direct', 'Social', 'Email'],
-                                size=n_users, p=[0.4, 0.25, 0.2, 0.1, 0.05])
-
-    # Generate regions
-    regions = np.random.choice(['North America', 'Europe', 'Asia', 'South America', 'Africa'],
-                               size=n_users, p=[0.4, 0.3, 0.2, 0.08, 0.02])
-
-    # Generate visit dates (last 30 days)
-    from datetime import datetime, timedelta
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-    visit_dates = [
-        start_date + timedelta(days=np.random.randint(0, 31)) for _ in range(n_users)]
-    visit_dates = [date.strftime('%Y-%m-%d') for date in visit_dates]
-
-    # Create DataFrame
-    df = pd.DataFrame({
-        'user_id': user_ids,
-        'group': groups,
-        'converted': conversions,
-        'session_duration_sec': session_durations,
-        'page_views': page_views,
-        'device': devices,
-        'channel': channels,
-        'region': regions,
-        'visit_date': visit_dates
-    })
-
-    return df
-
-
-def perform_statistical_tests(df):
-    """Perform statistical tests for A/B comparison"""
-    # Group data
-    group_a = df[df['group'] == 'A']['converted']
-    group_b = df[df['group'] == 'B']['converted']
-
-    # Z-test for proportions
-    n_a, n_b = len(group_a), len(group_b)
-    p_a, p_b = group_a.mean(), group_b.mean()
-
-    # Pooled proportion
-    p_pooled = (group_a.sum() + group_b.sum()) / (n_a + n_b)
-
-    # Standard error
-    se = np.sqrt(p_pooled * (1 - p_pooled) * (1/n_a + 1/n_b))
-
-    # Z-statistic
-    z_stat = (p_b - p_a) / se
-
-    # P-value (two-tailed)
-    p_value_z = 2 * (1 - stats.norm.cdf(abs(z_stat)))
-
-    # Chi-square test
-    contingency_table = pd.crosstab(df['group'], df['converted'])
-    chi2_stat, p_value_chi2, dof, expected = stats.chi2_contingency(
-        contingency_table)
-
-    # Confidence interval for difference
-    diff = p_b - p_a
-    ci_lower = diff - 1.96 * se
-    ci_upper = diff + 1.96 * se
-
-    return {
-        'z_statistic': z_stat,
-        'p_value_z': p_value_z,
-        'chi2_statistic': chi2_stat,
-        'p_value_chi2': p_value_chi2,
-        'difference': diff,
-        'ci_lower': ci_lower,
-        'ci_upper': ci_upper,
-        'relative_improvement': (p_b - p_a) / p_a * 100
-    }
+def load_data(columns=None):
+    """Load the A/B test data"""
+    # Not st.cache_data: that would keep a pickled copy of the frame and
+    # unpickle a fresh one per call. The only caller is the process-wide
+    # load_dataset resource below.
+    if columns is not None:
+        columns = list(columns)
+    try:
+        # Read the columnar copy if one exists, otherwise the CSV
+        df = read_dataset(DATA_PATH, columns)
+    except FileNotFoundError:
+        # If file doesn't exist, generate sample data
+        st.info("📁 Sample data file not found. Generating sample A/B test data...")
+        df = generate_sample_data()
+        if columns is not None:
+            df = df[columns]
 
+    # Keep each day's rows contiguous so date ranges are plain slices
+    return sort_by_date(df)
 
-def create_conversion_comparison_chart(df):
-    """Create conversion rate comparison chart"""
-    conversion_rates = df.groupby('group')['converted'].agg(
-        ['mean', 'count']).reset_index()
-    conversion_rates.columns = ['Group', 'Conversion Rate', 'Sample Size']
-
-    fig = px.bar(
-        conversion_rates,
-        x='Group',
-        y='Conversion Rate',
-        text=conversion_rates['Conversion Rate'].apply(lambda x: f'{x:.3f}'),
-        color='Group',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'},
-        title='Conversion Rate Comparison: Group A vs Group B'
-    )
 
-    fig.update_traces(textposition='outside')
-    fig.update_layout(
-        yaxis_title='Conversion Rate',
-        showlegend=False,
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=18,
-        title_font_color='#ffffff'
-    )
+def load_shared_data():
+    """Rows mapped read-only from the shared Arrow copy, written if stale"""
+    path = shared_path(DATA_PATH)
+    if not os.path.exists(path) or (
+            os.path.exists(DATA_PATH) and
+            os.path.getmtime(path) < os.path.getmtime(DATA_PATH)):
+        write_shared(load_data(DASHBOARD_COLUMNS), path)
+    return read_shared(path, list(DASHBOARD_COLUMNS))
 
-    return fig
-
-
-def create_segmentation_charts(df):
-    """Create segmentation analysis charts"""
-    # Device segmentation
-    device_conv = df.groupby(['device', 'group'])[
-        'converted'].mean().reset_index()
-    device_fig = px.bar(
-        device_conv,
-        x='device',
-        y='converted',
-        color='group',
-        barmode='group',
-        title='Conversion Rate by Device Type',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'}
-    )
-    device_fig.update_layout(
-        yaxis_title='Conversion Rate',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=16,
-        title_font_color='#ffffff'
-    )
 
-    # Channel segmentation
-    channel_conv = df.groupby(['channel', 'group'])[
-        'converted'].mean().reset_index()
-    channel_fig = px.bar(
-        channel_conv,
-        x='channel',
-        y='converted',
-        color='group',
-        barmode='group',
-        title='Conversion Rate by Channel',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'}
-    )
-    channel_fig.update_layout(
-        yaxis_title='Conversion Rate',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=16,
-        title_font_color='#ffffff'
-    )
+@st.cache_resource
+def load_dataset():
+    """Build the cube, filter indexes and version of the A/B test data"""
+    # One Dataset per server process, shared by every session; in shared
+    # mode its rows are also shared with other processes via the page cache
+    if BACKEND != 'pandas':
+        # Only the aggregates the engine returns are held in memory
+        return SqlDataset(DATA_PATH,
+                          default_engine() if BACKEND == 'sql' else BACKEND)
+    return Dataset(load_shared_data() if SHARED_DATASET
+                   else load_data(DASHBOARD_COLUMNS))
 
-    # Region segmentation
-    region_conv = df.groupby(['region', 'group'])[
-        'converted'].mean().reset_index()
-    region_fig = px.bar(
-        region_conv,
-        x='region',
-        y='converted',
-        color='group',
-        barmode='group',
-        title='Conversion Rate by Region',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'}
-    )
-    region_fig.update_layout(
-        yaxis_title='Conversion Rate',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=16,
-        title_font_color='#ffffff'
-    )
 
-    return device_fig, channel_fig, region_fig
+# Append-only CSV (or directory of rotated CSVs) tailed in live mode
+TAIL_PATH = os.environ.get('AB_TEST_TAIL_PATH', DATA_PATH)
 
 
-def create_distribution_charts(df):
-    """Create distribution charts for session duration and page views"""
-    # Session duration distribution
-    fig_duration = px.histogram(
-        df,
-        x='session_duration_sec',
-        color='group',
-        nbins=30,
-        title='Session Duration Distribution',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'},
-        opacity=0.7
-    )
-    fig_duration.update_layout(
-        xaxis_title='Session Duration (seconds)',
-        yaxis_title='Count',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=16,
-        title_font_color='#ffffff'
-    )
+@st.cache_resource
+def load_live_dataset(path):
+    """Dataset shared by all sessions that folds in rows appended to path"""
+    return IncrementalDataset(path, DASHBOARD_COLUMNS)
 
-    # Page views distribution
-    fig_pages = px.histogram(
-        df,
-        x='page_views',
-        color='group',
-        nbins=20,
-        title='Page Views Distribution',
-        color_discrete_map={'A': '#00d4ff', 'B': '#ff6b6b'},
-        opacity=0.7
-    )
-    fig_pages.update_layout(
-        xaxis_title='Page Views',
-        yaxis_title='Count',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(
-            family="-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"),
-        title_font_size=16,
-        title_font_color='#ffffff'
-    )
 
-    return fig_duration, fig_pages
+@st.cache_resource
+def get_result_cache():
+    """Process-wide cache of statistics and figures shared by all sessions"""
+    return ResultCache(max_entries=512, max_bytes=512 << 20)
 
 
-def main():
-    """Main dashboard function"""
-    # Header with modern styling
-    st.markdown('<h1 class="main-header">📊 A/B Testing Dashboard</h1>',
-                unsafe_allow_html=True)
+# Bootstrap replicates per metric and the time allowed to draw them (seconds)
+BOOTSTRAP_REPLICATES = 5000
+BOOTSTRAP_TIME_BUDGET = 3.0
 
-    # Load data
-    df = load_data()
+# Columns the bootstrap workers receive
+BOOTSTRAP_COLUMNS = ['group', 'session_duration_sec', 'page_views']
 
-    # Sidebar filters with modern styling
-    st.sidebar.markdown("""
-    <div style="background: linear-gradient(135deg, #1a1a1a 0%, #2d2d2d 100%); 
-                color: #00d4ff; 
-                padding: 1rem; 
-                border-radius: 12px; 
-                margin-bottom: 1rem;
-                border: 1px solid #333333;
-                box-shadow: 0 4px 16px rgba(0, 0, 0, 0.4);">
-        <h3 style="margin: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; font-weight: 600;">🔍 Filters</h3>
-    </div>
-    """, unsafe_allow_html=True)
 
-    # Date filter
-    if 'visit_date' in df.columns:
-        df['visit_date'] = pd.to_datetime(df['visit_date'])
-        date_range = st.sidebar.date_input(
-            "Select Date Range",
-            value=(df['visit_date'].min(), df['visit_date'].max()),
-            min_value=df['visit_date'].min(),
-            max_value=df['visit_date'].max()
-        )
-        if len(date_range) == 2:
-            df = df[(df['visit_date'].dt.date >= date_range[0]) &
-                    (df['visit_date'].dt.date <= date_range[1])]
-
-    # Device filter
-    devices = ['All'] + list(df['device'].unique())
-    selected_device = st.sidebar.selectbox("Device Type", devices)
-    if selected_device != 'All':
-        df = df[df['device'] == selected_device]
-
-    # Channel filter
-    channels = ['All'] + list(df['channel'].unique())
-    selected_channel = st.sidebar.selectbox("Channel", channels)
-    if selected_channel != 'All':
-        df = df[df['channel'] == selected_channel]
-
-    # Region filter
-    regions = ['All'] + list(df['region'].unique())
-    selected_region = st.sidebar.selectbox("Region", regions)
-    if selected_region != 'All':
-        df = df[df['region'] == selected_region]
+@st.cache_resource
+def get_bootstrap_pool():
+    """Process pool shared by all sessions for bootstrap resampling"""
+    # Spawned (not forked) workers: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(max_workers=os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
 
-    # Display data summary
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### 📈 Data Summary")
-    st.sidebar.metric("Total Users", f"{len(df):,}")
-    st.sidebar.metric("Group A Users", f"{len(df[df['group']=='A']):,}")
-    st.sidebar.metric("Group B Users", f"{len(df[df['group']=='B']):,}")
 
-    # Main content
+def generate_sample_data():
+    """Generate sample A/B test data for demonstration"""
+    # 10,000 users; group A converts at 12%, group B at 15%
+    return generate_dataset(10000, GeneratorConfig(), seed=42)
+
+
+# Columns of the segment scan table and their display names
+SCAN_COLUMNS = {
+    'segment': 'Segment', 'depth': 'Depth',
+    'users_a': 'Users_A', 'users_b': 'Users_B',
+    'rate_a': 'Conv_Rate_A', 'rate_b': 'Conv_Rate_B',
+    'difference': 'Difference', 'relative_improvement': 'Improvement_%',
+    'p_value': 'P_Value', 'p_adjusted': 'P_Adjusted',
+    'significant': 'Significant',
+    'prob_b_better': 'P_B_Better', 'expected_loss_b': 'Expected_Loss_B',
+}
+
+
+def segment_scan_table(cube, max_depth, correction, min_users):
+    """Ranked segment scan, formatted for display"""
+    segments = scan_segments(cube, max_depth=max_depth, correction=correction,
+                             min_users=min_users)
+    table = segments[list(SCAN_COLUMNS)].rename(columns=SCAN_COLUMNS)
+    return table.round({'Conv_Rate_A': 4, 'Conv_Rate_B': 4,
+                        'Difference': 4, 'Improvement_%': 1,
+                        'P_Value': 5, 'P_Adjusted': 5, 'P_B_Better': 3,
+                        'Expected_Loss_B': 5})
+
+
+class DashboardView:
+    """Filtered view of a dataset shared by the dashboard sections
+
+    Every section reads the four sidebar filters, so they share one cache
+    key: (dataset version, normalized filters). The filtered cube is only
+    built when a section misses the result cache.
+    """
+
+    def __init__(self, dataset, result_cache, date_range=None, devices=None,
+                 channels=None, regions=None):
+        self.dataset = dataset
+        self.result_cache = result_cache
+        self.date_range = date_range
+        self.selections = {'device': devices, 'channel': channels,
+                           'region': regions}
+        self.key = (dataset.version,
+                    filter_key(date_range, devices, channels, regions))
+
+    def cached(self, name, compute, keep=None):
+        """Result of compute(), cached under this view's key (if keep(result))"""
+        def timed_compute():
+            with stage(name):
+                return compute()
+
+        return self.result_cache.get_or_compute((name,) + self.key,
+                                                timed_compute, keep)
+
+    @functools.cached_property
+    def cube(self):
+        with stage('apply_filters', rows=len(self.dataset.cube)):
+            return self.filter(self.dataset.cube)
+
+    @property
+    def metrics(self):
+        # Per-group aggregates, tests and summary table in one pass over the cells
+        return self.cached('experiment_metrics',
+                           lambda: summarize_cube(self.cube))
+
+    def filter(self, cells):
+        """Cells of a cube-shaped frame matching the sidebar filters"""
+        return apply_filters(cells, self.date_range,
+                             self.selections['device'],
+                             self.selections['channel'],
+                             self.selections['region'])
+
+    def rows(self, columns=None):
+        """Row-level data matching the sidebar filters"""
+        # The date range is a slice of the date-sorted rows and the
+        # categorical filters go through the bitmap index, so only the
+        # requested columns of the matching rows are copied, at most once
+        with stage('filter_rows') as record:
+            rows = self.dataset.filter_rows(self.date_range, self.selections,
+                                            columns)
+            if record is not None:
+                record.rows = len(rows)
+        return rows
+
+
+def show_chart(fig):
+    """Send a figure to the browser (serialization is timed as a stage)"""
+    with stage('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@profiled
+def render_overview(view):
+    """KPI cards"""
+    metrics = view.metrics
+    conversions = metrics.conversions
+
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
         st.metric(
             "Overall Conversion Rate",
-            f"{df['converted'].mean():.3f}",
-            f"{df['converted'].sum():,} conversions"
+            f"{metrics.overall_rate:.3f}",
+            f"{metrics.total_conversions:,} conversions"
         )
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        group_a_conv = df[df['group'] == 'A']['converted'].mean()
+        group_a_conv = metrics.rates['A']
         st.metric(
             "Group A Conversion Rate",
             f"{group_a_conv:.3f}",
-            f"{df[df['group']=='A']['converted'].sum():,} conversions"
+            f"{conversions['A']:,} conversions"
         )
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col3:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        group_b_conv = df[df['group'] == 'B']['converted'].mean()
+        group_b_conv = metrics.rates['B']
         st.metric(
             "Group B Conversion Rate",
             f"{group_b_conv:.3f}",
-            f"{df[df['group']=='B']['converted'].sum():,} conversions"
+            f"{conversions['B']:,} conversions"
         )
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -596,12 +466,15 @@ def main():
         )
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # Statistical tests
+
+@profiled
+def render_statistical_analysis(view):
+    """Z-test, chi-square test, confidence interval and Bayesian posteriors"""
     st.markdown("---")
     st.markdown('<h2 class="section-header">🔬 Statistical Analysis</h2>',
                 unsafe_allow_html=True)
 
-    stats_results = perform_statistical_tests(df)
+    stats_results = view.metrics.tests
 
     col1, col2 = st.columns(2)
 
@@ -633,60 +506,317 @@ def main():
         f"Relative Improvement: {stats_results['relative_improvement']:.1f}%")
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Conversion comparison chart
+    # Beta-Binomial posteriors; the draws behind P(B > A) are cached per
+    # group counts, so only new counts are sampled
+    bayes = view.cached('bayesian_tests',
+                        lambda: perform_bayesian_tests(view.metrics.totals))
+    st.markdown('<div class="statistical-result">', unsafe_allow_html=True)
+    st.markdown(f"**Bayesian Analysis (Beta{DEFAULT_PRIOR} prior)**")
+    st.write(f"Posterior mean A: {bayes['mean_a']:.4f} "
+             f"[{bayes['ci_lower_a']:.4f}, {bayes['ci_upper_a']:.4f}]")
+    st.write(f"Posterior mean B: {bayes['mean_b']:.4f} "
+             f"[{bayes['ci_lower_b']:.4f}, {bayes['ci_upper_b']:.4f}]")
+    st.write(f"P(B > A): {bayes['prob_b_better']:.3f}")
+    st.write(f"Expected loss of choosing B: {bayes['expected_loss_b']:.5f} "
+             f"(A: {bayes['expected_loss_a']:.5f})")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+@profiled
+def render_conversion_comparison(view):
+    """Conversion rate bar chart"""
     st.markdown("---")
     st.markdown('<h2 class="section-header">📊 Conversion Rate Comparison</h2>',
                 unsafe_allow_html=True)
-    conv_chart = create_conversion_comparison_chart(df)
-    st.plotly_chart(conv_chart, use_container_width=True)
+    conv_chart = view.cached(
+        'create_conversion_comparison_chart',
+        lambda: create_conversion_comparison_chart(view.metrics.totals))
+    show_chart(conv_chart)
+
 
-    # Segmentation analysis
+@profiled
+def render_timeseries(view):
+    """Cumulative results over the selected dates"""
     st.markdown("---")
-    st.markdown('<h2 class="section-header">🎯 Segmentation Analysis</h2>',
+    st.markdown('<h2 class="section-header">📅 Results Over Time</h2>',
                 unsafe_allow_html=True)
 
-    device_fig, channel_fig, region_fig = create_segmentation_charts(df)
+    # Prefix-sum differences over the daily aggregate: no row scan
+    def build_timeseries_chart():
+        series = view.dataset.daily.series(view.date_range, view.selections)
+        return create_timeseries_chart(series)
+
+    show_chart(view.cached('create_timeseries_chart', build_timeseries_chart))
+
+
+@st.fragment
+@profiled
+def render_segmentation(view):
+    """Segment tabs; only the open tab's chart is built and sent"""
+    st.markdown("---")
+    st.markdown('<h2 class="section-header">🎯 Segmentation Analysis</h2>',
+                unsafe_allow_html=True)
 
-    tab1, tab2, tab3 = st.tabs(["Device", "Channel", "Region"])
+    # Switching tabs reruns this fragment only
+    *tabs, scan_tab = st.tabs(
+        [label for label, _ in SEGMENT_TABS.values()] + ["Segment Scan"],
+        key='segment_tab', on_change='rerun')
 
-    with tab1:
-        st.plotly_chart(device_fig, use_container_width=True)
+    for tab, dimension in zip(tabs, SEGMENT_TABS):
+        with tab:
+            if tab.open:
+                fig = view.cached(
+                    f'create_segment_chart:{dimension}',
+                    lambda: create_segment_chart(view.cube, dimension))
+                show_chart(fig)
 
-    with tab2:
-        st.plotly_chart(channel_fig, use_container_width=True)
+    with scan_tab:
+        if scan_tab.open:
+            render_segment_scan(view)
 
-    with tab3:
-        st.plotly_chart(region_fig, use_container_width=True)
 
-    # Distribution analysis
+def render_segment_scan(view):
+    """B vs A tests in every segment combination, corrected and ranked"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        max_depth = st.slider("Segment depth", min_value=1,
+                              max_value=len(SEGMENT_DIMENSIONS), value=2,
+                              key='scan_depth')
+    with col2:
+        correction = st.selectbox("Correction", list(CORRECTIONS),
+                                  format_func=CORRECTIONS.get,
+                                  key='scan_correction')
+    with col3:
+        min_users = st.number_input("Min users per group", min_value=1,
+                                    value=30, step=10, key='scan_min_users')
+
+    table = view.cached(
+        f'segment_scan:{max_depth}:{correction}:{min_users}',
+        lambda: segment_scan_table(view.cube, max_depth, correction,
+                                   min_users))
+    tested = int(table['P_Value'].notna().sum())
+    st.caption(f"{int(table['Significant'].sum())} of {tested} tested "
+               f"segments significant at α = 0.05 after correction "
+               f"({len(table) - tested} below {min_users} users per group "
+               f"not tested)")
+    st.dataframe(table, hide_index=True, use_container_width=True)
+
+
+@st.fragment
+@profiled
+def render_distributions(view):
+    """Histograms, plus bootstrap CIs computed only once expanded"""
     st.markdown("---")
     st.markdown('<h2 class="section-header">📈 Distribution Analysis</h2>',
                 unsafe_allow_html=True)
 
-    fig_duration, fig_pages = create_distribution_charts(df)
+    # Histograms are summed from the pre-binned per-cell counts
+    def build_distribution_charts():
+        histograms = {metric: view.filter(cells)
+                      for metric, cells in view.dataset.histograms.items()}
+        return create_distribution_charts(histograms, view.dataset.edges)
+
+    fig_duration, fig_pages = view.cached('create_distribution_charts',
+                                          build_distribution_charts)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        st.plotly_chart(fig_duration, use_container_width=True)
+        show_chart(fig_duration)
 
     with col2:
-        st.plotly_chart(fig_pages, use_container_width=True)
-
-    # Detailed metrics table
+        show_chart(fig_pages)
+
+    # Bootstrap CIs for the skewed continuous metrics
+    def build_bootstrap_table():
+        try:
+            table = bootstrap_metrics(
+                view.rows(BOOTSTRAP_COLUMNS), replicates=BOOTSTRAP_REPLICATES, seed=42,
+                executor=get_bootstrap_pool(),
+                time_budget=BOOTSTRAP_TIME_BUDGET)
+        except ValueError:
+            return None
+        table.index = ['Session Duration', 'Page Views']
+        table = table.drop(columns='seconds').astype({'replicates': 'int64'})
+        table.columns = ['Mean_Diff', 'Mean_CI_Lower', 'Mean_CI_Upper',
+                         'Median_Diff', 'Median_CI_Lower', 'Median_CI_Upper',
+                         'Replicates']
+        return table.round(3)
+
+    # Expanding or collapsing reruns this fragment only
+    bootstrap = st.expander(
+        "**Bootstrap 95% Confidence Intervals (Group B - Group A)**",
+        key='bootstrap_open', on_change='rerun')
+    with bootstrap:
+        if bootstrap.open:
+            # Tables cut short by the time budget are recomputed next time
+            bootstrap_table = view.cached(
+                'bootstrap_metrics', build_bootstrap_table,
+                keep=lambda table: table is None or bool(
+                    (table['Replicates'] == BOOTSTRAP_REPLICATES).all()))
+            if bootstrap_table is None:
+                st.info("Not enough users in each group for bootstrap intervals.")
+            else:
+                st.dataframe(bootstrap_table, use_container_width=True)
+
+
+@profiled
+def render_detailed_metrics(view):
+    """Detailed metrics table and Welch t-tests"""
     st.markdown("---")
     st.markdown('<h2 class="section-header">📋 Detailed Metrics</h2>',
                 unsafe_allow_html=True)
 
-    metrics_df = df.groupby('group').agg({
-        'converted': ['count', 'sum', 'mean'],
-        'session_duration_sec': ['mean', 'std'],
-        'page_views': ['mean', 'std']
-    }).round(3)
+    metrics = view.metrics
+    st.dataframe(metrics.summary, use_container_width=True)
+
+    # Welch t-tests for the continuous metrics
+    st.markdown("**Welch t-tests (Group B - Group A)**")
+    st.dataframe(metrics.continuous_tests.round(4), use_container_width=True)
+
+
+def watch_source(dataset, interval):
+    """Poll the tailed source every `interval` seconds and rerun on new rows"""
+    @st.fragment(run_every=interval)
+    def poll():
+        new_rows = dataset.refresh()
+        st.caption(f"🔄 {dataset.n_rows:,} rows · "
+                   f"{dataset.reader.bytes / 2**20:.1f} MB read")
+        if new_rows:
+            st.rerun()
+
+    with st.sidebar:
+        poll()
+
+
+def render_profile_panel(records, dataset):
+    """Collapsible sidebar tables of this rerun's stage measurements and the
+    dataset's memory layout"""
+    # The rerun itself is still running: list the stages finished inside it
+    records = [record for record in records if record.depth > 0]
+    with st.sidebar.expander("⏱️ Stage timings", expanded=False):
+        st.caption(f"Rerun so far: "
+                   f"{sum(r.wall_seconds for r in records if r.depth == 1) * 1000:,.0f} ms")
+        st.dataframe(pd.DataFrame({
+            'Stage': ['  ' * (record.depth - 1) + record.stage
+                      for record in records],
+            'Wall_ms': [record.wall_seconds * 1000 for record in records],
+            'CPU_ms': [record.cpu_seconds * 1000 for record in records],
+            'Rows': [record.rows for record in records],
+            'Alloc_MB': [None if record.alloc_bytes is None
+                         else record.alloc_bytes / 2**20
+                         for record in records],
+        }).round(2), hide_index=True, use_container_width=True)
+
+    with st.sidebar.expander("🧮 Dataset memory", expanded=False):
+        if isinstance(dataset, SqlDataset):
+            # The rows stay in the engine: report what is held in memory
+            st.caption(f"{dataset.n_rows:,} rows queried in {dataset.engine}; "
+                       f"in memory:")
+            df = dataset.cube
+        else:
+            df = dataset.filter_rows()
+        report = memory_report(df)
+        st.caption(f"{report['bytes'].sum() / 2**20:,.1f} MB for {len(df):,} "
+                   f"rows ({report['bytes'].sum() / max(len(df), 1):,.1f} B/row)")
+        st.dataframe(report.rename(columns={
+            'dtype': 'Dtype', 'bytes': 'Bytes', 'bytes_per_row': 'Bytes_per_row',
+            'share': 'Share'}).round(3), use_container_width=True)
+
+
+@profiled(name='rerun')
+def main():
+    """Main dashboard function"""
+    # Header with modern styling
+    st.markdown('<h1 class="main-header">📊 A/B Testing Dashboard</h1>',
+                unsafe_allow_html=True)
+
+    # Live mode tails the source file and folds in appended rows
+    live = st.sidebar.toggle("Live refresh", value=False)
+    if live:
+        refresh_seconds = st.sidebar.number_input(
+            "Refresh interval (seconds)", min_value=1, max_value=3600,
+            value=10, step=1)
+        with stage('load_dataset'):
+            dataset = load_live_dataset(TAIL_PATH)
+        watch_source(dataset, refresh_seconds)
+        if dataset.cube is None:
+            st.info(f"📁 Waiting for rows in {TAIL_PATH}...")
+            return
+    else:
+        with stage('load_dataset'):
+            dataset = load_dataset()
+
+    # Sufficient-statistics cube of the loaded data
+    cube = dataset.cube
+
+    # Sidebar filters with modern styling
+    st.sidebar.markdown("""
+    <div style="background: linear-gradient(135deg, #1a1a1a 0%, #2d2d2d 100%); 
+                color: #00d4ff; 
+                padding: 1rem; 
+                border-radius: 12px; 
+                margin-bottom: 1rem;
+                border: 1px solid #333333;
+                box-shadow: 0 4px 16px rgba(0, 0, 0, 0.4);">
+        <h3 style="margin: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; font-weight: 600;">🔍 Filters</h3>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Filters are resolved against the cube
+    # Date filter
+    date_range = st.sidebar.date_input(
+        "Select Date Range",
+        value=(cube['visit_date'].min(), cube['visit_date'].max()),
+        min_value=cube['visit_date'].min(),
+        max_value=cube['visit_date'].max()
+    )
+    if len(date_range) != 2:
+        date_range = None
+
+    # Device, channel and region filters (no selection means all)
+    selected_devices = st.sidebar.multiselect(
+        "Device Type", dataset.values('device'), placeholder="All")
+    selected_channels = st.sidebar.multiselect(
+        "Channel", dataset.values('channel'), placeholder="All")
+    selected_regions = st.sidebar.multiselect(
+        "Region", dataset.values('region'), placeholder="All")
+
+    # Every section reads the same filtered view of the cube
+    view = DashboardView(dataset, get_result_cache(), date_range,
+                         selected_devices, selected_channels, selected_regions)
+    metrics = view.metrics
 
-    metrics_df.columns = ['Users', 'Conversions', 'Conv_Rate', 'Avg_Session_Duration',
-                          'Std_Session_Duration', 'Avg_Page_Views', 'Std_Page_Views']
-    st.dataframe(metrics_df, use_container_width=True)
+    # Display data summary
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 📈 Data Summary")
+    # Rows without a group are counted here but are in neither test group
+    st.sidebar.metric("Total Users", f"{metrics.total_users:,}")
+    st.sidebar.metric("Group A Users", f"{metrics.users['A']:,}")
+    st.sidebar.metric("Group B Users", f"{metrics.users['B']:,}")
+    if metrics.ungrouped_users:
+        st.sidebar.caption(f"⚠️ {metrics.ungrouped_users:,} users have no "
+                           f"group and are "
+                           f"left out of the A/B comparison")
+
+    render_overview(view)
+    render_statistical_analysis(view)
+    render_conversion_comparison(view)
+    render_timeseries(view)
+    render_segmentation(view)
+    render_distributions(view)
+    render_detailed_metrics(view)
+
+    # Stage timings of this rerun (when AB_TEST_PROFILE is set)
+    if PROFILER.enabled:
+        render_profile_panel(PROFILER.records, dataset)
+
+    # Result cache counters
+    cache_stats = view.result_cache.stats()
+    st.sidebar.caption(
+        f"Result cache: {cache_stats['hits']:,} hits / "
+        f"{cache_stats['misses']:,} misses · {cache_stats['entries']} entries "
+        f"({cache_stats['bytes'] / 2**20:.1f} MB)")
 
     # Footer with modern styling
     st.markdown("---")
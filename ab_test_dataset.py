@@ -0,0 +1,85 @@
+"""
+Dataset
+=======
+
+Row-level experiment data bundled with everything built from it once at
+load time: the date-sorted rows, the sufficient-statistics cube, the
+pre-binned histograms, the daily prefix sums, the filter indexes and a
+content version used to key cached results.
+"""
+
+import pandas as pd
+
+from ab_test_cache import dataset_version
+from ab_test_cube import build_cube
+from ab_test_filters import (BitmapIndex, DateIndex, filter_positions,
+                             filter_rows, sort_by_date)
+from ab_test_histograms import build_histograms, dataset_edges
+from ab_test_timeseries import DailyAggregate
+
+
+class IndexedRows:
+    """Date-sorted rows and the filter indexes over them"""
+
+    def __init__(self, df):
+        self.df = sort_by_date(df)
+        self.bitmap_index = BitmapIndex(self.df)
+        self.date_index = DateIndex(self.df['visit_date'])
+
+    @property
+    def n_rows(self):
+        return len(self.df)
+
+    def values(self, column):
+        """Distinct values of a filter column"""
+        return self.bitmap_index.values(column)
+
+    def filter_positions(self, date_range=None, selections=None):
+        """Slice or row positions matching the sidebar filters"""
+        return filter_positions(self.bitmap_index, self.date_index,
+                                date_range, selections or {})
+
+    def filter_rows(self, date_range=None, selections=None, columns=None):
+        """Rows matching the sidebar filters (only `columns`, if given)"""
+        return filter_rows(self.df, self.bitmap_index, self.date_index,
+                           date_range, selections or {}, columns)
+
+
+class Dataset(IndexedRows):
+    """Loaded experiment rows plus their cube, histograms and filter indexes
+
+    Histogram edges span the rows unless given, so that partitions of one
+    dataset can share edges and have their counts added.
+    """
+
+    def __init__(self, df, edges=None):
+        super().__init__(df)
+        self.cube = build_cube(self.df)
+        self.edges = edges if edges is not None else dataset_edges(self.df)
+        self.histograms = build_histograms(self.df, self.edges)
+        self.daily = DailyAggregate(self.cube)
+        self.version = dataset_version(self.cube)
+
+
+def concat_rows(frames):
+    """Concatenate row frames, keeping categorical columns categorical
+
+    pandas falls back to object dtype when categoricals have different
+    categories, so categories are unified before concatenating.
+    """
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    unified = []
+    categorical = [column for column, dtype in frames[0].dtypes.items()
+                   if isinstance(dtype, pd.CategoricalDtype)]
+    categories = {
+        column: sorted(set().union(*(frame[column].cat.categories
+                                     for frame in frames)))
+        for column in categorical
+    }
+    for frame in frames:
+        unified.append(frame.astype({
+            column: pd.CategoricalDtype(values)
+            for column, values in categories.items()}))
+    return pd.concat(unified, ignore_index=True)
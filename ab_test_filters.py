@@ -0,0 +1,157 @@
+"""
+Row Filter Engine
+=================
+
+Precomputed indexes that resolve the sidebar filters over row-level data
+without rescanning columns on every Streamlit rerun.
+"""
+
+import numpy as np
+
+FILTER_COLUMNS = ['device', 'channel', 'region']
+
+
+def selected_values(selection):
+    """Normalize a filter selection to a list of values, or None for 'All'
+
+    Accepts 'All', a single value or a list of values (an empty list means
+    no restriction, like 'All').
+    """
+    if selection is None or selection == 'All':
+        return None
+    if isinstance(selection, (list, tuple, set)):
+        return list(selection) or None
+    return [selection]
+
+
+class BitmapIndex:
+    """Packed bitmap per distinct value of each categorical filter column
+
+    Bitmaps are built once at load time. A selection is resolved by OR-ing
+    the bitmaps of the selected values within a column and AND-ing across
+    columns, touching n_rows / 8 bytes per operation instead of comparing
+    every row's value.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for column in columns:
+            values = df[column].astype('category')
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[column] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(values.cat.categories)
+            }
+
+    def values(self, column):
+        """Distinct values of a column that occur in the data"""
+        return list(self.bitmaps[column])
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmaps in self.bitmaps.values()
+                   for bitmap in bitmaps.values())
+
+    def _column_bitmap(self, column, values, byte_range):
+        """OR of the selected values' bitmaps of one column over a byte range"""
+        bitmaps = self.bitmaps[column]
+        combined = np.zeros(byte_range.stop - byte_range.start, dtype=np.uint8)
+        for value in values:
+            if value in bitmaps:
+                np.bitwise_or(combined, bitmaps[value][byte_range],
+                              out=combined)
+        return combined
+
+    def select(self, selections, rows=None):
+        """Row positions matching {column: selection}, or None for all rows
+
+        When `rows` is a slice, only the bitmap bytes covering it are read
+        and the returned positions all fall inside it.
+        """
+        start, stop = (0, self.n_rows) if rows is None else (rows.start,
+                                                             rows.stop)
+        first_byte = start // 8
+        byte_range = slice(first_byte, (stop + 7) // 8)
+        combined = None
+        for column, selection in selections.items():
+            values = selected_values(selection)
+            if values is None:
+                continue
+            bitmap = self._column_bitmap(column, values, byte_range)
+            if combined is None:
+                combined = bitmap
+            else:
+                np.bitwise_and(combined, bitmap, out=combined)
+        if combined is None:
+            return None
+        bits = np.unpackbits(combined)[start - first_byte * 8:
+                                       stop - first_byte * 8]
+        return np.flatnonzero(bits) + start
+
+
+def sort_by_date(df):
+    """Physically order rows by visit_date so each day is a contiguous block"""
+    if df['visit_date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('visit_date', kind='stable', ignore_index=True)
+
+
+class DateIndex:
+    """Row offsets of each day in data sorted by visit_date
+
+    A date range resolves to a contiguous row slice with two searchsorted
+    lookups over the distinct days, and each day doubles as a partition.
+    """
+
+    def __init__(self, dates):
+        days = dates.to_numpy().astype('datetime64[D]')
+        if len(days) and (days[1:] < days[:-1]).any():
+            raise ValueError("DateIndex needs rows sorted by visit_date")
+        starts = np.flatnonzero(days[1:] != days[:-1]) + 1
+        self.offsets = np.concatenate([[0], starts, [len(days)]] if len(days)
+                                      else [[0]]).astype('int64')
+        self.days = days[self.offsets[:-1]]
+
+    def slice(self, date_range=None):
+        """Contiguous row slice covering an inclusive (start, end) date range"""
+        if date_range is None:
+            return slice(0, int(self.offsets[-1]))
+        start, end = (np.datetime64(d, 'D') for d in date_range)
+        first = np.searchsorted(self.days, start, side='left')
+        last = np.searchsorted(self.days, end, side='right')
+        return slice(int(self.offsets[first]), int(self.offsets[last]))
+
+    def partitions(self):
+        """Yield (day, row slice) for every day present in the data"""
+        for i, day in enumerate(self.days):
+            yield day, slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+
+def filter_positions(bitmap_index, date_index, date_range, selections):
+    """Rows matching the filters as a slice or an array of row positions
+
+    The date range is a contiguous slice of the date-sorted rows; the
+    categorical selections are only evaluated inside it. Nothing is copied.
+    """
+    rows = date_index.slice(date_range)
+    positions = bitmap_index.select(selections, rows)
+    return rows if positions is None else positions
+
+
+def filter_rows(df, bitmap_index, date_index, date_range, selections,
+                columns=None):
+    """Rows matching the date range and categorical selections
+
+    A date-range-only filter is a view of the frame. Otherwise only the
+    requested columns of the matching rows are materialized, once.
+    """
+    positions = filter_positions(bitmap_index, date_index, date_range,
+                                 selections)
+    if columns is not None:
+        df = df[list(columns)]
+    if isinstance(positions, slice):
+        if positions.start == 0 and positions.stop == len(df):
+            return df
+        return df.iloc[positions]
+    return df.take(positions)
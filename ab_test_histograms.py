@@ -0,0 +1,90 @@
+"""
+Pre-binned Histograms
+=====================
+
+Histogram counts of the continuous metrics, binned server-side on fixed
+edges and kept per cube cell (visit_date, device, channel, region, group).
+
+Because every cell uses the same edges, counts add up across cells,
+partitions and days: the distribution charts for any filter are a sum over
+the matching cells, and the figure carries one bar per bin instead of one
+value per user.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ab_test_cube import CUBE_KEYS, GROUPS
+
+# Bins per distribution chart
+HISTOGRAM_BINS = {
+    'session_duration_sec': 30,
+    'page_views': 20,
+}
+
+
+def histogram_edges(values, bins):
+    """Equal-width bin edges spanning the values
+
+    Integer-valued metrics get edges on half-integers so that no value sits
+    on an edge and every bar covers whole units.
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.linspace(0.0, 1.0, bins + 1)
+    return range_edges(values.min(), values.max(),
+                       np.array_equal(values, np.round(values)), bins)
+
+
+def range_edges(low, high, integer_valued, bins):
+    """histogram_edges from the range of the values alone
+
+    For engines that only report the minimum, maximum and whether every
+    value is a whole number.
+    """
+    if integer_valued:
+        width = max(np.ceil((high - low + 1) / bins), 1)
+        return low - 0.5 + width * np.arange(bins + 1)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def bin_index(values, edges):
+    """Bin of each value; values outside the edges go to the outer bins"""
+    values = np.asarray(values, dtype='float64')
+    bins = np.searchsorted(edges, values, side='right') - 1
+    return np.clip(bins, 0, len(edges) - 2)
+
+
+def build_histograms(df, edges, keys=CUBE_KEYS):
+    """Per-cell bin counts of each metric in `edges` ({metric: edges})"""
+    histograms = {}
+    for metric, metric_edges in edges.items():
+        values = df[metric]
+        present = values.notna().to_numpy()
+        rows = df[present]
+        bins = pd.Series(bin_index(values.to_numpy()[present], metric_edges),
+                         index=rows.index, name='bin')
+        counts = bins.groupby([rows[key] for key in keys] + [bins],
+                              observed=True, dropna=False).size()
+        histograms[metric] = counts.rename('count').reset_index()
+    return histograms
+
+
+def dataset_edges(df, bins=HISTOGRAM_BINS):
+    """Fixed edges for each metric, spanning the whole dataset"""
+    return {metric: histogram_edges(df[metric].to_numpy(), n_bins)
+            for metric, n_bins in bins.items()}
+
+
+def group_counts(cells, n_bins):
+    """Counts per group and bin (GROUPS x n_bins) from filtered cells"""
+    counts = np.zeros((len(GROUPS), n_bins), dtype='int64')
+    for i, group in enumerate(GROUPS):
+        in_group = (cells['group'] == group).to_numpy()
+        counts[i] = np.bincount(cells['bin'].to_numpy()[in_group],
+                                weights=cells['count'].to_numpy()[in_group],
+                                minlength=n_bins)
+    return counts
@@ -0,0 +1,184 @@
+"""
+Incremental Ingestion
+=====================
+
+Tails an append-only CSV export (or a directory of rotated CSV files) and
+folds only the newly appended rows into the in-memory dataset and its
+cube, so a refresh costs time proportional to the new data rather than the
+whole file.
+"""
+
+import glob
+import io
+import os
+import threading
+
+import pandas as pd
+
+from ab_test_cache import dataset_version
+from ab_test_cube import CUBE_KEYS, merge_cubes
+from ab_test_dataset import Dataset, IndexedRows, concat_rows
+from ab_test_storage import read_csv
+from ab_test_timeseries import DailyAggregate
+
+
+class SourceRewritten(Exception):
+    """A tailed file shrank, so previously consumed rows are no longer valid"""
+
+
+class TailingReader:
+    """Return the complete CSV rows appended since the previous poll
+
+    Files are tracked by (device, inode) rather than by name, so a file that
+    is renamed by log rotation keeps its consumed byte offset. A partially
+    written last line is left for the next poll.
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns
+        self.offsets = {}
+        self.headers = {}
+        self.rows = 0
+        self.bytes = 0
+
+    def files(self):
+        """Files to tail, oldest first"""
+        if os.path.isdir(self.path):
+            files = glob.glob(os.path.join(self.path, '*.csv'))
+            return sorted(files, key=os.path.getmtime)
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _read_new_lines(self, file_path):
+        """Header and new complete lines of one file, advancing its offset"""
+        stat = os.stat(file_path)
+        key = (stat.st_dev, stat.st_ino)
+        offset = self.offsets.get(key, 0)
+        if stat.st_size < offset:
+            raise SourceRewritten(file_path)
+        if stat.st_size == offset:
+            return None
+
+        with open(file_path, 'rb') as source:
+            source.seek(offset)
+            data = source.read(stat.st_size - offset)
+
+        if key not in self.headers:
+            header_end = data.find(b'\n') + 1
+            if header_end == 0:
+                return None
+            self.headers[key] = data[:header_end]
+            data = data[header_end:]
+            offset += header_end
+
+        complete = data.rfind(b'\n') + 1
+        self.offsets[key] = offset + complete
+        self.bytes += complete
+        if complete == 0:
+            return None
+        return self.headers[key] + data[:complete]
+
+    def poll(self):
+        """Parse rows appended since the last poll (None when there are none)"""
+        frames = []
+        for file_path in self.files():
+            lines = self._read_new_lines(file_path)
+            if lines is not None:
+                frames.append(read_csv(io.BytesIO(lines), self.columns))
+        if not frames:
+            return None
+        new_rows = concat_rows(frames)
+        self.rows += len(new_rows)
+        return new_rows
+
+
+def merge_histograms(histograms):
+    """Add the per-cell counts of histograms built on the same edges"""
+    histograms = [hist for hist in histograms if hist is not None]
+    if len(histograms) == 1:
+        return histograms[0]
+    merged = {}
+    for metric in histograms[0]:
+        combined = concat_rows([hist[metric] for hist in histograms])
+        merged[metric] = combined.groupby(CUBE_KEYS + ['bin'], observed=True,
+                                          dropna=False)[
+            'count'].sum().reset_index()
+    return merged
+
+
+class IncrementalDataset:
+    """Dataset that grows as rows are appended to its source
+
+    Rows are kept as date-sorted partitions, each with its own filter
+    indexes (IndexedRows). New rows become a new partition; adjacent partitions of similar
+    size are merged (like a binary counter), so every row is re-indexed only
+    O(log n) times. The cube and histograms are updated by adding the new
+    rows' cells; histogram edges are fixed by the first rows loaded, and later
+    values outside them are counted in the outer bins.
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns
+        self._lock = threading.Lock()
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        self.reader = TailingReader(self.path, self.columns)
+        self.partitions = []
+        self.cube = None
+        self.edges = None
+        self.histograms = None
+        self.daily = None
+        self.version = None
+
+    @property
+    def n_rows(self):
+        return sum(partition.n_rows for partition in self.partitions)
+
+    def refresh(self):
+        """Fold newly appended rows in; returns the number of new rows"""
+        with self._lock:
+            try:
+                new_rows = self.reader.poll()
+            except SourceRewritten:
+                # The source was rewritten rather than appended to: start over
+                self._reset()
+                new_rows = self.reader.poll()
+            if new_rows is None or not len(new_rows):
+                return 0
+
+            added = Dataset(new_rows, self.edges)
+            partitions = self.partitions + [added]
+            while (len(partitions) > 1 and
+                   partitions[-2].n_rows <= 2 * partitions[-1].n_rows):
+                # Only the rows and filter indexes: the cube and histograms
+                # are kept for the whole dataset, not per partition
+                merged = IndexedRows(concat_rows([partitions[-2].df,
+                                                  partitions[-1].df]))
+                partitions = partitions[:-2] + [merged]
+
+            cube = merge_cubes([self.cube, added.cube])
+            histograms = merge_histograms([self.histograms, added.histograms])
+            daily = DailyAggregate(cube)
+            # Swap in the new state at once so readers see a consistent view
+            self.partitions, self.cube = partitions, cube
+            self.edges, self.histograms = added.edges, histograms
+            self.daily = daily
+            self.version = dataset_version(cube)
+            return len(new_rows)
+
+    def values(self, column):
+        """Distinct values of a filter column across partitions"""
+        return sorted(set().union(*(partition.values(column)
+                                    for partition in self.partitions)))
+
+    def filter_rows(self, date_range=None, selections=None, columns=None):
+        """Rows matching the sidebar filters, across all partitions"""
+        partitions = self.partitions
+        if not partitions:
+            return pd.DataFrame(columns=columns or self.columns)
+        return concat_rows([partition.filter_rows(date_range, selections,
+                                                  columns)
+                            for partition in partitions])
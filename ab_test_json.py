@@ -0,0 +1,29 @@
+"""
+JSON Payloads
+=============
+
+Conversion of analysis results (frames, series, numpy scalars, timestamps)
+into plain Python values for JSON: shared by the API, the static reports
+and the batch verification report, without importing any of them.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def plain(value):
+    """JSON-ready copy of a payload (frames become lists of records)"""
+    if isinstance(value, pd.DataFrame):
+        return [plain(record) for record in value.to_dict('records')]
+    if isinstance(value, dict):
+        return {str(key): plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series)):
+        return [plain(item) for item in value]
+    if isinstance(value, (np.generic, pd.Timestamp)):
+        value = value.isoformat() if isinstance(value, pd.Timestamp) \
+            else value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
@@ -0,0 +1,239 @@
+"""
+Experiment Metrics
+==================
+
+Per-group aggregates, significance tests and the summary table of an A/B
+test, computed from per-group sufficient statistics. The dashboard and the
+verification script both go through this module so their numbers cannot
+drift apart.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from ab_test_cube import group_totals, metrics_table, ungrouped_totals
+
+
+def batch_proportion_tests(n_a, x_a, n_b, x_b, z_critical=1.96):
+    """Two-proportion z-tests and 2x2 chi-square tests for many comparisons
+
+    Takes arrays of group sizes (n) and conversions (x) for groups A and B
+    and evaluates every comparison with NumPy array operations. The
+    chi-square test applies Yates' continuity correction, matching
+    scipy.stats.chi2_contingency on the same 2x2 tables. Comparisons with an
+    empty group or no variation get NaN statistics rather than an error.
+    """
+    n_a, x_a, n_b, x_b = (np.asarray(v, dtype='float64')
+                          for v in (n_a, x_a, n_b, x_b))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Z-test for proportions
+        p_a, p_b = x_a / n_a, x_b / n_b
+        p_pooled = (x_a + x_b) / (n_a + n_b)
+        se = np.sqrt(p_pooled * (1 - p_pooled) * (1/n_a + 1/n_b))
+        z_stat = (p_b - p_a) / se
+        p_value_z = 2 * (1 - stats.norm.cdf(np.abs(z_stat)))
+
+        # Chi-square test: cells ordered (A, 0), (A, 1), (B, 0), (B, 1)
+        observed = np.stack([n_a - x_a, x_a, n_b - x_b, x_b], axis=-1)
+        total = n_a + n_b
+        not_converted = total - x_a - x_b
+        converted = x_a + x_b
+        expected = np.stack([n_a * not_converted, n_a * converted,
+                             n_b * not_converted, n_b * converted],
+                            axis=-1) / total[..., None]
+        # Yates' correction moves each observed count up to 0.5 toward
+        # its expected count
+        diff = expected - observed
+        corrected = observed + np.minimum(0.5, np.abs(diff)) * np.sign(diff)
+        chi2_stat = ((corrected - expected) ** 2 / expected).sum(axis=-1)
+        chi2_stat = np.where((expected > 0).all(axis=-1), chi2_stat, np.nan)
+        p_value_chi2 = stats.chi2.sf(chi2_stat, 1)
+
+        # Confidence interval for difference
+        difference = p_b - p_a
+        relative_improvement = difference / p_a * 100
+
+    return {
+        'z_statistic': z_stat,
+        'p_value_z': p_value_z,
+        'chi2_statistic': chi2_stat,
+        'p_value_chi2': p_value_chi2,
+        'difference': difference,
+        'ci_lower': difference - z_critical * se,
+        'ci_upper': difference + z_critical * se,
+        'relative_improvement': relative_improvement
+    }
+
+
+def batch_welch_tests(n_a, sum_a, sumsq_a, n_b, sum_b, sumsq_b,
+                      confidence=0.95):
+    """Welch t-tests for differences in means from sums and sums-of-squares
+
+    All arguments are arrays (one element per comparison); the result holds
+    the mean difference (B - A), t statistic, Welch-Satterthwaite degrees
+    of freedom, two-sided p-value and confidence interval.
+    """
+    n_a, sum_a, sumsq_a, n_b, sum_b, sumsq_b = (
+        np.asarray(v, dtype='float64')
+        for v in (n_a, sum_a, sumsq_a, n_b, sum_b, sumsq_b))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_a, mean_b = sum_a / n_a, sum_b / n_b
+        var_a = np.maximum((sumsq_a - sum_a * mean_a) / (n_a - 1), 0)
+        var_b = np.maximum((sumsq_b - sum_b * mean_b) / (n_b - 1), 0)
+        se2_a, se2_b = var_a / n_a, var_b / n_b
+        se = np.sqrt(se2_a + se2_b)
+
+        difference = mean_b - mean_a
+        t_stat = difference / se
+        dof = (se2_a + se2_b) ** 2 / (se2_a ** 2 / (n_a - 1) +
+                                      se2_b ** 2 / (n_b - 1))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), dof)
+        t_critical = stats.t.ppf(0.5 + confidence / 2, dof)
+
+    return {
+        'mean_a': mean_a,
+        'mean_b': mean_b,
+        'difference': difference,
+        't_statistic': t_stat,
+        'dof': dof,
+        'p_value': p_value,
+        'ci_lower': difference - t_critical * se,
+        'ci_upper': difference + t_critical * se
+    }
+
+
+# Multiple-testing corrections accepted by adjust_p_values
+CORRECTIONS = {
+    'fdr_bh': 'Benjamini-Hochberg (false discovery rate)',
+    'holm': 'Holm (family-wise error rate)',
+}
+
+
+def adjust_p_values(p_values, method='fdr_bh'):
+    """Adjusted p-values for a family of tests
+
+    'fdr_bh' is the Benjamini-Hochberg step-up procedure and 'holm' the Holm
+    step-down procedure. NaN p-values (tests that could not be run) stay NaN
+    and do not count towards the size of the family.
+    """
+    if method not in CORRECTIONS:
+        raise ValueError(f"Unknown correction {method!r}; "
+                         f"expected one of {sorted(CORRECTIONS)}")
+    p_values = np.asarray(p_values, dtype='float64')
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    m = len(valid)
+    if not m:
+        return adjusted
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    ranked = p_values[order]
+    rank = np.arange(1, m + 1)
+    if method == 'fdr_bh':
+        # Step-up: each p-value is capped by the ones ranked above it
+        scaled = np.minimum.accumulate((ranked * m / rank)[::-1])[::-1]
+    else:
+        # Step-down: adjusted p-values never decrease with rank
+        scaled = np.maximum.accumulate(ranked * (m - rank + 1))
+    adjusted[order] = np.minimum(scaled, 1.0)
+    return adjusted
+
+
+def perform_statistical_tests(totals):
+    """Perform statistical tests for A/B comparison from per-group totals"""
+    results = batch_proportion_tests(
+        totals.loc['A', 'users'], totals.loc['A', 'conversions'],
+        totals.loc['B', 'users'], totals.loc['B', 'conversions'])
+    return {name: float(value) for name, value in results.items()}
+
+
+def perform_continuous_tests(totals):
+    """Welch t-tests for session duration and page views from per-group totals"""
+    results = {}
+    for label, prefix in (('Session Duration', 'duration'),
+                          ('Page Views', 'page_views')):
+        a, b = totals.loc['A'], totals.loc['B']
+        tests = batch_welch_tests(
+            a['users'], a[f'{prefix}_sum'], a[f'{prefix}_sumsq'],
+            b['users'], b[f'{prefix}_sum'], b[f'{prefix}_sumsq'])
+        results[label] = {name: float(value) for name, value in tests.items()}
+    return pd.DataFrame(results).T
+
+
+@dataclass(frozen=True)
+class ExperimentMetrics:
+    """Per-group aggregates and test results of one experiment (or filter state)
+
+    `ungrouped` holds the sums of rows without a group: they count in the
+    totals and the overall rate but in neither group's tests.
+    """
+    totals: pd.DataFrame
+    tests: dict
+    continuous_tests: pd.DataFrame
+    summary: pd.DataFrame
+    ungrouped: pd.Series = None
+
+    @property
+    def users(self):
+        return self.totals['users']
+
+    @property
+    def conversions(self):
+        return self.totals['conversions']
+
+    @property
+    def rates(self):
+        return self.conversions / self.users
+
+    @property
+    def ungrouped_users(self):
+        return 0 if self.ungrouped is None else int(self.ungrouped['users'])
+
+    @property
+    def total_users(self):
+        return int(self.users.sum()) + self.ungrouped_users
+
+    @property
+    def total_conversions(self):
+        ungrouped = (0 if self.ungrouped is None
+                     else int(self.ungrouped['conversions']))
+        return int(self.conversions.sum()) + ungrouped
+
+    @property
+    def overall_rate(self):
+        # NaN, like the mean of no rows, when the filters match no one
+        if not self.total_users:
+            return float('nan')
+        return self.total_conversions / self.total_users
+
+    def summary_metrics(self):
+        """Headline metrics in the layout of ab_test_summary.csv"""
+        return pd.DataFrame({
+            'metric': ['Total_Users', 'Group_A_Users', 'Group_B_Users',
+                       'Group_A_Conv_Rate', 'Group_B_Conv_Rate',
+                       'Improvement_Percent', 'Z_Statistic', 'P_Value_Z',
+                       'Chi2_Statistic', 'P_Value_Chi2'],
+            'value': [self.total_users, self.users['A'], self.users['B'],
+                      self.rates['A'], self.rates['B'],
+                      self.tests['relative_improvement'],
+                      self.tests['z_statistic'], self.tests['p_value_z'],
+                      self.tests['chi2_statistic'], self.tests['p_value_chi2']]
+        })
+
+
+def summarize_groups(totals, ungrouped=None):
+    """Build ExperimentMetrics from per-group sufficient statistics"""
+    return ExperimentMetrics(totals=totals,
+                             tests=perform_statistical_tests(totals),
+                             continuous_tests=perform_continuous_tests(totals),
+                             summary=metrics_table(totals),
+                             ungrouped=ungrouped)
+
+
+def summarize_cube(cube):
+    """ExperimentMetrics of a (filtered) cube, counting rows without a group"""
+    return summarize_groups(group_totals(cube), ungrouped_totals(cube))
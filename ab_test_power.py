@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Power Simulator
+===============
+
+Monte Carlo power and false-positive rates of the two-proportion z-test over
+a grid of sample sizes, for sizing experiments before launch.
+
+Each block of simulated experiments is two binomial draws: a
+(simulations x sample sizes) matrix of conversions for group A, and one for
+group B under the alternative (B converts at the lifted rate) and under the
+null (B converts like A). The dashboard's z-test is applied to every column
+at once. Blocks are seeded from (seed, block index) and can be spread over a
+process pool without changing the result.
+
+    python ab_test_power.py --baseline 0.12 --lift 0.10 --simulations 20000
+    python ab_test_power.py --scenarios launches.csv --output sizing.csv
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from ab_test_metrics import batch_proportion_tests
+
+# Upper bound on matrix cells (simulations x sample sizes) drawn per block
+BLOCK_CELLS = 2_000_000
+
+
+@dataclass(frozen=True)
+class PowerScenario:
+    """Experiment design to simulate"""
+    baseline_rate: float = 0.12
+    # Relative lift of group B over the baseline (0.1 = +10%)
+    lift: float = 0.10
+    # Share of traffic assigned to group B
+    split_b: float = 0.5
+    alpha: float = 0.05
+
+    def __post_init__(self):
+        for name, rate in (('baseline rate', self.baseline_rate),
+                           ('treatment rate', self.treatment_rate),
+                           ('traffic split', self.split_b),
+                           ('alpha', self.alpha)):
+            if not 0 < rate < 1:
+                raise ValueError(f"The {name} must be between 0 and 1 "
+                                 f"(exclusive), got {rate:g}")
+
+    @property
+    def treatment_rate(self):
+        return self.baseline_rate * (1 + self.lift)
+
+    def group_sizes(self, sample_sizes):
+        """Users in A and B for each total sample size"""
+        sample_sizes = np.asarray(sample_sizes, dtype='int64')
+        n_b = np.rint(sample_sizes * self.split_b).astype('int64')
+        return sample_sizes - n_b, n_b
+
+
+def sample_size_grid(low=500, high=100_000, points=20):
+    """Roughly geometric grid of distinct total sample sizes"""
+    grid = np.geomspace(low, high, points).round().astype('int64')
+    return np.unique(grid)
+
+
+def simulate_block(scenario, sample_sizes, simulations, seed):
+    """Rejections of one block of simulated experiments per sample size
+
+    Returns (rejections under the alternative, rejections under the null),
+    each an array with one count per sample size.
+    """
+    rng = np.random.default_rng(seed)
+    n_a, n_b = scenario.group_sizes(sample_sizes)
+    shape = (simulations, len(n_a))
+    x_a = rng.binomial(n_a, scenario.baseline_rate, size=shape)
+    x_b = rng.binomial(n_b, scenario.treatment_rate, size=shape)
+    x_null = rng.binomial(n_b, scenario.baseline_rate, size=shape)
+
+    rejections = []
+    for x_treatment in (x_b, x_null):
+        p_values = batch_proportion_tests(n_a, x_a, n_b,
+                                          x_treatment)['p_value_z']
+        # Experiments without any conversion cannot be tested (NaN p-value)
+        # and count as not significant
+        rejections.append((p_values < scenario.alpha).sum(axis=0))
+    return tuple(rejections)
+
+
+def _simulate_planned_block(args):
+    """Process pool entry point"""
+    return simulate_block(*args)
+
+
+def analytic_power(scenario, sample_sizes):
+    """Normal-approximation power of the two-sided z-test"""
+    n_a, n_b = scenario.group_sizes(sample_sizes)
+    p_a, p_b = scenario.baseline_rate, scenario.treatment_rate
+    pooled = (n_a * p_a + n_b * p_b) / (n_a + n_b)
+    se_null = np.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+    se_alternative = np.sqrt(p_a * (1 - p_a) / n_a + p_b * (1 - p_b) / n_b)
+    z_critical = stats.norm.ppf(1 - scenario.alpha / 2)
+    effect = abs(p_b - p_a)
+    return (stats.norm.cdf((effect - z_critical * se_null) / se_alternative) +
+            stats.norm.cdf((-effect - z_critical * se_null) / se_alternative))
+
+
+def simulate_power(scenario, sample_sizes=None, simulations=10_000, seed=42,
+                   workers=1, executor=None):
+    """Power curve and false-positive rate of a scenario
+
+    Simulations are drawn in blocks of at most BLOCK_CELLS matrix cells.
+    Blocks run in `executor` when given, otherwise in a temporary process
+    pool when workers > 1, otherwise inline. Returns one row per sample
+    size with the simulated power (and its 95% Monte Carlo interval), the
+    false-positive rate and the normal-approximation power.
+    """
+    sample_sizes = (sample_size_grid() if sample_sizes is None
+                    else np.unique(np.asarray(sample_sizes, dtype='int64')))
+    block_size = max(BLOCK_CELLS // len(sample_sizes), 1)
+    seeds = np.random.SeedSequence(seed).spawn(-(-simulations // block_size))
+    blocks = [(scenario, sample_sizes,
+               min(block_size, simulations - i * block_size), block_seed)
+              for i, block_seed in enumerate(seeds)]
+
+    if executor is None and workers <= 1:
+        results = [simulate_block(*block) for block in blocks]
+    else:
+        own_executor = executor is None
+        executor = executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            results = list(executor.map(_simulate_planned_block, blocks))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    rejections = np.sum([result[0] for result in results], axis=0)
+    false_positives = np.sum([result[1] for result in results], axis=0)
+    power = rejections / simulations
+    # Normal approximation to the binomial Monte Carlo error
+    margin = 1.96 * np.sqrt(power * (1 - power) / simulations)
+    n_a, n_b = scenario.group_sizes(sample_sizes)
+    return pd.DataFrame({
+        'sample_size': sample_sizes,
+        'users_a': n_a,
+        'users_b': n_b,
+        'power': power,
+        'power_ci_lower': np.clip(power - margin, 0, 1),
+        'power_ci_upper': np.clip(power + margin, 0, 1),
+        'false_positive_rate': false_positives / simulations,
+        'analytic_power': analytic_power(scenario, sample_sizes),
+        'simulations': simulations,
+    })
+
+
+def required_sample_size(curve, target=0.8):
+    """Smallest simulated total sample size reaching the target power
+
+    None when no sample size in the grid reaches it.
+    """
+    reached = curve.loc[curve['power'] >= target, 'sample_size']
+    return int(reached.iloc[0]) if len(reached) else None
+
+
+def size_scenarios(scenarios, sample_sizes=None, simulations=10_000,
+                   target=0.8, seed=42, workers=1):
+    """Required sample size of each row of a scenarios frame
+
+    Rows need a baseline_rate and lift; split_b and alpha are optional.
+    Every row is validated before any is simulated; an invalid one raises
+    ValueError naming its row number (1 = first row after the header).
+    All scenarios share one process pool.
+    """
+    defaults = PowerScenario()
+    records = scenarios.to_dict('records')
+    planned = []
+    for number, record in enumerate(records, start=1):
+        try:
+            planned.append(PowerScenario(
+                baseline_rate=float(record['baseline_rate']),
+                lift=float(record['lift']),
+                split_b=float(record.get('split_b', defaults.split_b)),
+                alpha=float(record.get('alpha', defaults.alpha))))
+        except ValueError as error:
+            raise ValueError(f"Scenario row {number}: {error}") from error
+
+    rows = []
+    executor = (ProcessPoolExecutor(max_workers=workers) if workers > 1
+                else None)
+    try:
+        for record, scenario in zip(records, planned):
+            curve = simulate_power(scenario, sample_sizes, simulations, seed,
+                                   executor=executor)
+            largest = curve.iloc[-1]
+            rows.append(dict(
+                record,
+                required_sample_size=required_sample_size(curve, target),
+                power_at_largest=largest['power'],
+                false_positive_rate=curve['false_positive_rate'].mean()))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    # Nullable integers: unreachable targets stay empty
+    return pd.DataFrame(rows).astype({'required_sample_size': 'Int64'})
+
+
+def main():
+    """Simulate power curves from the command line"""
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo power and sample-size simulator")
+    parser.add_argument('--baseline', type=float, default=0.12,
+                        help="Conversion rate of group A")
+    parser.add_argument('--lift', type=float, default=0.10,
+                        help="Relative lift of group B (0.1 = +10%%)")
+    parser.add_argument('--split-b', type=float, default=0.5,
+                        help="Share of traffic assigned to group B")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--scenarios', default=None,
+                        help="CSV with baseline_rate, lift and optional "
+                             "split_b, alpha columns: size every row")
+    parser.add_argument('--sample-sizes', type=int, nargs='+', default=None,
+                        help="Total sample sizes (default: 500..100k grid)")
+    parser.add_argument('--simulations', type=int, default=10_000)
+    parser.add_argument('--target', type=float, default=0.8,
+                        help="Power used to report the required sample size")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default=None, help="Write a CSV")
+    args = parser.parse_args()
+
+    if args.scenarios:
+        try:
+            result = size_scenarios(pd.read_csv(args.scenarios),
+                                    args.sample_sizes, args.simulations,
+                                    args.target, args.seed, args.workers)
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        try:
+            scenario = PowerScenario(args.baseline, args.lift, args.split_b,
+                                     args.alpha)
+        except ValueError as error:
+            parser.error(str(error))
+        result = simulate_power(scenario, args.sample_sizes,
+                                args.simulations, args.seed, args.workers)
+        required = required_sample_size(result, args.target)
+        print(f"🎯 {scenario.baseline_rate:.2%} -> "
+              f"{scenario.treatment_rate:.2%}: "
+              + (f"{args.target:.0%} power at {required:,} users"
+                 if required else
+                 f"{args.target:.0%} power not reached in the grid"))
+    print(result.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"✅ Wrote '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
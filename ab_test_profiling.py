@@ -0,0 +1,243 @@
+"""
+Stage Instrumentation
+=====================
+
+Opt-in per-stage wall time, CPU time, rows processed and bytes allocated for
+dashboard reruns, written to a rotating JSON-lines file and/or a Prometheus
+textfile for the node exporter's textfile collector.
+
+Configured from the environment when this module is imported:
+
+    AB_TEST_PROFILE=1                 enable instrumentation
+    AB_TEST_PROFILE_JSONL=path        append one JSON record per stage
+    AB_TEST_PROFILE_PROM=path         rewrite a Prometheus textfile per run
+    AB_TEST_PROFILE_MEMORY=0          skip allocation tracing (tracemalloc)
+
+When disabled, `stage()` returns a shared no-op context manager and
+`profiled` returns the function unchanged, so instrumented code pays only a
+flag check.
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+
+class StageRecord:
+    """Measurements of one stage of one run"""
+
+    __slots__ = ('path', 'depth', 'wall_seconds', 'cpu_seconds', 'rows',
+                 'alloc_bytes', 'started')
+
+    def __init__(self, path, depth, rows=None):
+        self.path = path
+        self.depth = depth
+        self.rows = rows
+        self.started = time.time()
+        self.wall_seconds = self.cpu_seconds = 0.0
+        self.alloc_bytes = None
+
+    @property
+    def stage(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    def as_dict(self):
+        return {'stage': self.stage, 'path': self.path, 'depth': self.depth,
+                'timestamp': self.started,
+                'wall_seconds': self.wall_seconds,
+                'cpu_seconds': self.cpu_seconds, 'rows': self.rows,
+                'alloc_bytes': self.alloc_bytes}
+
+
+class JsonlSink:
+    """Append stage records to a size-rotated JSON-lines file"""
+
+    def __init__(self, path, max_bytes=10 << 20, backups=5):
+        self.logger = logging.getLogger(f'ab_test_profiling.{path}')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+
+    def write(self, run_id, records):
+        for record in records:
+            self.logger.info(json.dumps(dict(record.as_dict(), run=run_id)))
+
+
+class PrometheusSink:
+    """Cumulative per-stage counters rewritten atomically as a textfile
+
+    Series are labelled with the stage name and its path (the chain of
+    enclosing stages), e.g. stage="plotly_chart",
+    path="rerun/render_segmentation/plotly_chart".
+    """
+
+    METRICS = (
+        ('ab_test_stage_runs_total', 'Stage executions', None),
+        ('ab_test_stage_wall_seconds_total', 'Stage wall time',
+         'wall_seconds'),
+        ('ab_test_stage_cpu_seconds_total', 'Stage CPU time (thread)',
+         'cpu_seconds'),
+        ('ab_test_stage_rows_total', 'Rows processed by the stage', 'rows'),
+        ('ab_test_stage_alloc_bytes_total',
+         'Peak bytes allocated by the stage', 'alloc_bytes'),
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.totals = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def write(self, run_id, records):
+        with self._lock:
+            for record in records:
+                totals = self.totals[record.path]
+                totals[None] += 1
+                for _, _, field in self.METRICS[1:]:
+                    totals[field] += getattr(record, field) or 0
+            lines = []
+            for name, help_text, field in self.METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for path, totals in sorted(self.totals.items()):
+                    stage = path.rsplit('/', 1)[-1]
+                    lines.append(f'{name}{{stage="{stage}",path="{path}"}} '
+                                 f'{totals[field]:g}')
+            # Write-then-rename so the collector never reads a partial file
+            temporary = f'{self.path}.{os.getpid()}.tmp'
+            with open(temporary, 'w') as output:
+                output.write('\n'.join(lines) + '\n')
+            os.replace(temporary, self.path)
+
+
+class Profiler:
+    """Per-thread stage stacks; the outermost stage of a thread is a run
+
+    Streamlit runs each session's script in its own thread, so stacks and
+    CPU time are per thread. Allocation tracing is process-wide and
+    includes other sessions' allocations that overlap a stage.
+    """
+
+    def __init__(self, enabled=False, sinks=(), trace_memory=True):
+        self.enabled = enabled
+        self.sinks = list(sinks)
+        self.trace_memory = enabled and trace_memory
+        self._local = threading.local()
+        self._run_ids = iter(range(1, 1 << 62))
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def records(self):
+        """Records of the current (or last finished) run of this thread"""
+        return getattr(self._local, 'records', [])
+
+    @contextlib.contextmanager
+    def _stage(self, name, rows=None):
+        local = self._local
+        stack = getattr(local, 'stack', None)
+        if not stack:
+            stack = local.stack = []
+            local.records = []
+        parent = stack[-1] if stack else None
+        record = StageRecord(f'{parent[0].path}/{name}' if parent else name,
+                             len(stack), rows)
+        local.records.append(record)
+
+        memory = self.trace_memory
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent[1] = max(parent[1], peak)
+            tracemalloc.reset_peak()
+        frame = [record, 0, current if memory else 0]
+        stack.append(frame)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - start
+            record.cpu_seconds = time.thread_time() - cpu_start
+            stack.pop()
+            if memory:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                record.alloc_bytes = max(peak - frame[2], 0)
+                if parent is not None:
+                    parent[1] = max(parent[1], peak)
+            if not stack:
+                self._flush(local.records)
+
+    def _flush(self, records):
+        run_id = next(self._run_ids)
+        for sink in self.sinks:
+            sink.write(run_id, records)
+
+    def stage(self, name, rows=None):
+        """Context manager measuring one stage (a no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name, rows)
+
+    def profiled(self, func=None, *, name=None):
+        """Decorator measuring every call of a function as a stage"""
+        if func is None:
+            return functools.partial(self.profiled, name=name)
+        if not self.enabled:
+            return func
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._stage(stage_name, _rows_of(args)):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _rows_of(args):
+    """Length of the first frame-like argument, if any"""
+    for arg in args:
+        if hasattr(arg, 'shape') and getattr(arg, 'ndim', 0) >= 1:
+            return int(arg.shape[0])
+    return None
+
+
+class _NullStage:
+    """Reusable do-nothing context manager"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def profiler_from_env(environ=os.environ):
+    """Profiler configured from the AB_TEST_PROFILE* variables"""
+    if environ.get('AB_TEST_PROFILE', '0').lower() in ('', '0', 'false', 'no'):
+        return Profiler(enabled=False)
+    sinks = []
+    if environ.get('AB_TEST_PROFILE_JSONL'):
+        sinks.append(JsonlSink(environ['AB_TEST_PROFILE_JSONL']))
+    if environ.get('AB_TEST_PROFILE_PROM'):
+        sinks.append(PrometheusSink(environ['AB_TEST_PROFILE_PROM']))
+    trace_memory = environ.get('AB_TEST_PROFILE_MEMORY', '1').lower() not in (
+        '0', 'false', 'no')
+    return Profiler(enabled=True, sinks=sinks, trace_memory=trace_memory)
+
+
+PROFILER = profiler_from_env()
+stage = PROFILER.stage
+profiled = PROFILER.profiled
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Static Reports
+==============
+
+Pre-renders a self-contained HTML report (and a JSON twin) for every
+device x channel x region filter combination and date window, with the
+dashboard's chart builders from ab_test_charts:
+
+    python ab_test_reports.py ab_test_enriched.csv --output-dir reports \\
+        --window all --window last7 --window 2024-01-01:2024-01-31
+
+Each dimension is either 'All' or one of its values, so a dataset with 4
+devices, 5 channels and 5 regions yields 5 x 6 x 6 = 180 combinations per
+window. The dataset is loaded and aggregated once: the workers of the
+process pool receive its cube, histogram counts and daily prefix sums when
+they start, and each report only filters those cube-sized aggregates.
+
+Runs are incremental. A report's input hash covers its filtered cells, the
+histogram edges and the report format; reports whose hash matches the one
+in <output-dir>/manifest.json (and whose files exist) are skipped, and a
+run where every report is unchanged never starts the process pool.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ab_test_api import BACKENDS, load_dataset
+from ab_test_bayes import DEFAULT_PRIOR, perform_bayesian_tests
+from ab_test_cache import dataset_version
+from ab_test_charts import (SEGMENT_TABS, create_conversion_comparison_chart,
+                            create_distribution_charts,
+                            create_segmentation_charts,
+                            create_timeseries_chart)
+from ab_test_cube import apply_filters
+from ab_test_json import plain
+from ab_test_metrics import summarize_cube
+from ab_test_segments import SEGMENT_DIMENSIONS
+
+# Bumped whenever the report layout changes, so every report is rebuilt
+REPORT_FORMAT = 1
+
+# How reports get plotly.js: embedded in each file (self-contained),
+# written once next to them, or loaded from the CDN
+PLOTLYJS_MODES = ('inline', 'directory', 'cdn')
+
+MANIFEST_NAME = 'manifest.json'
+
+# Aggregates shared by the reports, set once per worker process
+_shared = {}
+
+
+def parse_window(spec, first_day, last_day):
+    """(name, date_range) of a window: 'all', 'lastN' or 'START:END'"""
+    if spec == 'all':
+        return 'all', None
+    match = re.fullmatch(r'last(\d+)', spec)
+    if match:
+        days = int(match.group(1))
+        if days < 1:
+            raise ValueError(f"window {spec}: expected at least one day")
+        return spec, (max(first_day, last_day - pd.Timedelta(days=days - 1)),
+                      last_day)
+    start, sep, end = spec.partition(':')
+    if not sep:
+        raise ValueError(f"window {spec}: expected all, lastN or START:END")
+    start = pd.Timestamp(start) if start else first_day
+    end = pd.Timestamp(end) if end else last_day
+    return f"{start:%Y%m%d}-{end:%Y%m%d}", (start, end)
+
+
+def _slug(value):
+    return re.sub(r'[^A-Za-z0-9]+', '-', str(value)).strip('-') or 'x'
+
+
+def report_specs(dataset, windows):
+    """One spec per window and device x channel x region combination"""
+    days = dataset.cube['visit_date']
+    first_day, last_day = days.min(), days.max()
+    choices = [['All'] + list(dataset.values(dimension))
+               for dimension in SEGMENT_DIMENSIONS]
+    specs = []
+    for window in windows:
+        window_name, date_range = parse_window(window, first_day, last_day)
+        for values in pd.MultiIndex.from_product(choices):
+            selections = dict(zip(SEGMENT_DIMENSIONS, values))
+            name = '__'.join(
+                [f'{dimension}-{_slug(value)}'
+                 for dimension, value in selections.items()] +
+                [f'window-{window_name}'])
+            specs.append({'name': name, 'date_range': date_range,
+                          'selections': selections})
+    return specs
+
+
+def _init_worker(cube, edges, histograms, daily):
+    """Receive the shared aggregates"""
+    warnings.filterwarnings('ignore')
+    _shared.update(cube=cube, edges=edges, histograms=histograms, daily=daily)
+
+
+def _filter(cells, spec):
+    return apply_filters(cells, spec['date_range'],
+                         *(spec['selections'][d] for d in SEGMENT_DIMENSIONS))
+
+
+def input_hash(cube, histograms, edges, plotlyjs):
+    """Hash of everything a report is rendered from"""
+    digest = hashlib.sha1(f'{REPORT_FORMAT}:{plotlyjs}'.encode())
+    digest.update(dataset_version(cube).encode())
+    for metric in sorted(histograms):
+        digest.update(metric.encode())
+        digest.update(np.asarray(edges[metric], dtype='float64').tobytes())
+        digest.update(dataset_version(histograms[metric]).encode())
+    return digest.hexdigest()[:16]
+
+
+def _describe(spec):
+    filters = ', '.join(f'{dimension}: {value}'
+                        for dimension, value in spec['selections'].items())
+    if spec['date_range'] is None:
+        return f'{filters}; all dates'
+    start, end = spec['date_range']
+    return f'{filters}; {start:%Y-%m-%d} to {end:%Y-%m-%d}'
+
+
+def report_content(spec, cube, histograms):
+    """Statistics and figures of one report"""
+    metrics = summarize_cube(cube)
+    series = _shared['daily'].series(spec['date_range'], spec['selections'])
+    figures = {
+        'conversion': create_conversion_comparison_chart(metrics.totals),
+        'timeseries': create_timeseries_chart(series),
+    }
+    for dimension, figure in zip(SEGMENT_TABS,
+                                 create_segmentation_charts(cube)):
+        figures[f'segment_{dimension}'] = figure
+    figures['session_duration'], figures['page_views'] = \
+        create_distribution_charts(histograms, _shared['edges'])
+    return metrics, perform_bayesian_tests(metrics.totals), figures
+
+
+PAGE_STYLE = """
+body { background: #0e1117; color: #fafafa; margin: 2rem;
+       font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto,
+                    sans-serif; }
+h1 { color: #00d4ff; } h2 { border-bottom: 1px solid #333; }
+table { border-collapse: collapse; margin: 1rem 0; }
+th, td { border: 1px solid #333; padding: 0.3rem 0.6rem; text-align: right; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; }
+"""
+
+
+def render_html(spec, metrics, bayes, figures, plotlyjs):
+    """Self-contained HTML page of one report"""
+    tests = metrics.tests
+    rates = metrics.rates
+    kpis = pd.DataFrame({
+        'Users': metrics.users, 'Conversions': metrics.conversions,
+        'Conversion Rate': rates.round(4)})
+    results = pd.DataFrame({'Value': {
+        'Difference (B - A)': f"{tests['difference']:.4f}",
+        '95% CI': f"[{tests['ci_lower']:.4f}, {tests['ci_upper']:.4f}]",
+        'Relative Improvement': f"{tests['relative_improvement']:.1f}%",
+        'Z-statistic (p)': f"{tests['z_statistic']:.3f} "
+                           f"({tests['p_value_z']:.4f})",
+        'Chi²-statistic (p)': f"{tests['chi2_statistic']:.3f} "
+                              f"({tests['p_value_chi2']:.4f})",
+        f'P(B > A), Beta{DEFAULT_PRIOR} prior':
+            f"{bayes['prob_b_better']:.3f}",
+        'Expected loss of choosing B': f"{bayes['expected_loss_b']:.5f}",
+    }})
+
+    # plotly.js goes into the first figure only
+    include = True if plotlyjs == 'inline' else plotlyjs
+    charts = []
+    for i, figure in enumerate(figures.values()):
+        charts.append(figure.to_html(
+            full_html=False, include_plotlyjs=include if i == 0 else False,
+            config={'responsive': True}))
+
+    title = html.escape(_describe(spec))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>A/B Test Report: {title}</title>
+<style>{PAGE_STYLE}</style></head><body>
+<h1>📊 A/B Test Report</h1>
+<p>{title} · {metrics.total_users:,} users</p>
+<h2>🔬 Statistical Analysis</h2>
+<div class="grid">{kpis.to_html()}{results.to_html()}</div>
+{charts[0]}{charts[1]}
+<h2>🎯 Segmentation Analysis</h2>
+{''.join(charts[2:5])}
+<h2>📈 Distribution Analysis</h2>
+<div class="grid">{charts[5]}{charts[6]}</div>
+<h2>📋 Detailed Metrics</h2>
+{metrics.summary.to_html()}
+{metrics.continuous_tests.round(4).to_html()}
+</body></html>
+"""
+
+
+def render_json(spec, digest, metrics, bayes, figures):
+    """JSON twin of a report: the statistics and the Plotly figure specs"""
+    from plotly.utils import PlotlyJSONEncoder
+    payload = plain({
+        'name': spec['name'],
+        'input_hash': digest,
+        'filters': {'date_range': spec['date_range'], **spec['selections']},
+        'users': metrics.total_users,
+        'groups': metrics.summary.rename_axis('group').reset_index(),
+        'proportion': metrics.tests,
+        'continuous': metrics.continuous_tests.rename_axis(
+            'metric').reset_index(),
+        'bayesian': bayes,
+    })
+    payload['figures'] = figures
+    return json.dumps(payload, cls=PlotlyJSONEncoder)
+
+
+def report_inputs(spec, cube, histograms, edges, output_dir, plotlyjs):
+    """Filtered aggregates and manifest entry (hash, paths) of one report"""
+    cube = _filter(cube, spec)
+    histograms = {metric: _filter(cells, spec)
+                  for metric, cells in histograms.items()}
+    paths = {kind: os.path.join(output_dir, f"{spec['name']}.{kind}")
+             for kind in ('html', 'json')}
+    entry = {'name': spec['name'],
+             'input_hash': input_hash(cube, histograms, edges, plotlyjs),
+             'users': int(cube['users'].sum()), 'outputs': paths}
+    return cube, histograms, entry
+
+
+def is_unchanged(entry, previous):
+    """Whether a report's previous outputs match its current inputs"""
+    return (entry['input_hash'] == previous.get('input_hash') and
+            all(map(os.path.exists, entry['outputs'].values())))
+
+
+def build_report(spec, output_dir, plotlyjs):
+    """Render one report in a worker process; returns its manifest entry"""
+    start = time.perf_counter()
+    cube, histograms, entry = report_inputs(
+        spec, _shared['cube'], _shared['histograms'], _shared['edges'],
+        output_dir, plotlyjs)
+    digest, paths = entry['input_hash'], entry['outputs']
+
+    if entry['users'] == 0:
+        status = 'empty'
+    else:
+        try:
+            metrics, bayes, figures = report_content(spec, cube, histograms)
+            for kind, text in (
+                    ('html', render_html(spec, metrics, bayes, figures,
+                                         plotlyjs)),
+                    ('json', render_json(spec, digest, metrics, bayes,
+                                         figures))):
+                # Written aside and renamed, so a report is never half there
+                with open(paths[kind] + '.tmp', 'w', encoding='utf-8') as out:
+                    out.write(text)
+                os.replace(paths[kind] + '.tmp', paths[kind])
+            status = 'built'
+        except Exception as error:
+            entry['error'] = f'{type(error).__name__}: {error}'
+            status = 'error'
+    entry.update(status=status, seconds=time.perf_counter() - start)
+    return entry
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as source:
+        return json.load(source).get('reports', {})
+
+
+def write_plotlyjs(output_dir):
+    """plotly.min.js next to the reports, for --plotlyjs directory"""
+    from plotly.offline import get_plotlyjs
+    path = os.path.join(output_dir, 'plotly.min.js')
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(get_plotlyjs())
+
+
+def run_reports(dataset, specs, output_dir, workers, plotlyjs='inline',
+                force=False, progress=None):
+    """Build the reports in a process pool; returns the run summary"""
+    os.makedirs(output_dir, exist_ok=True)
+    if plotlyjs == 'directory':
+        write_plotlyjs(output_dir)
+    previous = {} if force else load_manifest(output_dir)
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    entries = []
+    stale = []
+    # Hashing only filters cube-sized aggregates, so unchanged reports are
+    # settled here and a run with nothing to build never starts the pool
+    for spec in specs:
+        report_start = time.perf_counter()
+        _, _, entry = report_inputs(spec, dataset.cube, dataset.histograms,
+                                    dataset.edges, output_dir, plotlyjs)
+        if is_unchanged(entry, previous.get(spec['name'], {})):
+            entry.update(status='unchanged',
+                         seconds=time.perf_counter() - report_start)
+            entries.append(entry)
+            if progress is not None:
+                progress(entry)
+        else:
+            stale.append(spec)
+
+    if stale:
+        # Spawned (not forked) workers, as elsewhere; each receives the
+        # shared aggregates once, not once per report
+        with ProcessPoolExecutor(
+                max_workers=min(workers, len(stale)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(dataset.cube, dataset.edges, dataset.histograms,
+                          dataset.daily)) as pool:
+            futures = [pool.submit(build_report, spec, output_dir, plotlyjs)
+                       for spec in stale]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries.append(entry)
+                if progress is not None:
+                    progress(entry)
+    wall_seconds = time.perf_counter() - start
+
+    entries.sort(key=lambda entry: entry['name'])
+    statuses = [entry['status'] for entry in entries]
+    summary = {
+        'started': started.isoformat(),
+        'dataset_version': dataset.version,
+        'workers': workers,
+        'plotlyjs': plotlyjs,
+        'reports': len(entries),
+        **{status: statuses.count(status)
+           for status in ('built', 'unchanged', 'empty', 'error')},
+        'wall_seconds': wall_seconds,
+    }
+    # Reports of earlier runs outside this run's combinations are kept
+    reports = {**previous, **{entry['name']: entry for entry in entries
+                              if entry['status'] in ('built', 'unchanged')}}
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as output:
+        json.dump({'last_run': summary, 'reports': reports}, output, indent=2)
+    return summary, entries
+
+
+def print_progress(entry):
+    if entry['status'] == 'built':
+        print(f"✅ {entry['name']} ({entry['seconds']:.2f}s)")
+    elif entry['status'] == 'error':
+        print(f"💥 {entry['name']}: {entry['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pre-render static HTML/JSON reports for every filter "
+                    "combination")
+    parser.add_argument('path', nargs='?', default='ab_test_enriched.csv',
+                        help="CSV export (or directory of exports for the "
+                             "SQL backends)")
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--window', action='append', default=None,
+                        help="Date window: all, lastN or START:END "
+                             "(repeatable; default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas')
+    parser.add_argument('--plotlyjs', choices=PLOTLYJS_MODES,
+                        default='inline',
+                        help="Embed plotly.js in every report, write it once "
+                             "to the output directory, or use the CDN")
+    parser.add_argument('--force', action='store_true',
+                        help="Rebuild reports whose inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.path, args.backend)
+    try:
+        specs = report_specs(dataset, args.window or ['all'])
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"📊 {len(specs)} reports over {dataset.n_rows:,} rows (aggregated "
+          f"in {time.perf_counter() - start:.1f}s) with {args.workers} "
+          f"workers")
+
+    summary, _ = run_reports(dataset, specs, args.output_dir, args.workers,
+                             args.plotlyjs, args.force,
+                             progress=print_progress)
+    print(f"\n📄 {summary['built']} built, {summary['unchanged']} unchanged, "
+          f"{summary['empty']} empty, {summary['error']} errors in "
+          f"{summary['wall_seconds']:.1f}s")
+    print(f"✅ Wrote reports to '{args.output_dir}'")
+    return 0 if summary['error'] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
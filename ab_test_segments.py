@@ -0,0 +1,122 @@
+"""
+Segment Scan
+============
+
+Significance tests of group B against group A in every segment up to a
+given depth: each device, channel and region, each pair such as
+Mobile x Paid Search, and each full combination such as
+Mobile x Paid Search x London.
+
+Counts come from the sufficient-statistics cube, with one grouped
+aggregation per depth, and all segments are tested at once with the
+vectorized two-proportion tests. The p-values are then corrected for the
+number of segments tested. Each segment also gets the Bayesian P(B > A) and
+expected loss, evaluated in one batch over cached posterior draws.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from ab_test_bayes import DEFAULT_PRIOR, batch_bayesian_tests
+from ab_test_metrics import adjust_p_values, batch_proportion_tests
+
+SEGMENT_DIMENSIONS = ['device', 'channel', 'region']
+
+
+def segment_cells(cube, dimensions=SEGMENT_DIMENSIONS):
+    """Users and conversions per group in each finest segment
+
+    One row per combination of all dimensions present in the cube, with
+    columns users_a, conversions_a, users_b and conversions_b.
+    """
+    cells = cube.groupby(dimensions + ['group'], observed=True)[
+        ['users', 'conversions']].sum().unstack('group', fill_value=0)
+    cells = cells.reindex(columns=pd.MultiIndex.from_product(
+        [['users', 'conversions'], ['A', 'B']]), fill_value=0)
+    cells.columns = [f'{column}_{group.lower()}'
+                     for column, group in cells.columns]
+    cells = cells.reset_index()
+    for dimension in dimensions:
+        # Strings, but a missing value stays missing rather than 'nan'
+        values = cells[dimension]
+        cells[dimension] = values.where(values.isna(), values.astype(str))
+    return cells
+
+
+def level_counts(cells, depth, dimensions=SEGMENT_DIMENSIONS):
+    """Counts of every segment defined by exactly `depth` dimensions
+
+    The finest cells are stacked once per combination of dimensions, with
+    the dimensions outside the combination blanked out, and summed in a
+    single grouped aggregation. Blank (None) means "any value".
+    """
+    stacked = []
+    for subset in combinations(dimensions, depth):
+        blanked = cells.copy()
+        for dimension in dimensions:
+            if dimension not in subset:
+                blanked[dimension] = None
+        stacked.append(blanked)
+    counts = pd.concat(stacked, ignore_index=True).groupby(
+        dimensions, dropna=False, sort=False).sum()
+    counts = counts.reset_index()
+    counts.insert(0, 'depth', depth)
+    return counts
+
+
+def segment_label(segments, dimensions=SEGMENT_DIMENSIONS):
+    """'Mobile × Paid Search' style label of each segment"""
+    parts = segments[dimensions].astype(object).where(
+        segments[dimensions].notna(), None).to_numpy()
+    return [' × '.join(value for value in row if value is not None)
+            for row in parts]
+
+
+def scan_segments(cube, max_depth=2, correction='fdr_bh', alpha=0.05,
+                  min_users=30, dimensions=SEGMENT_DIMENSIONS,
+                  prior=DEFAULT_PRIOR, draws=4_000):
+    """Tested and corrected segments, most significant first
+
+    Segments with fewer than min_users users in either group are listed
+    but not tested, and do not count towards the multiple-testing
+    correction. Returns one row per segment with its counts, rates,
+    difference, z statistic, raw and adjusted p-values, whether the
+    adjusted p-value is below alpha, and the posterior P(B > A) and expected
+    loss of shipping B (from `draws` posterior draws per group).
+    """
+    cells = segment_cells(cube, dimensions)
+    segments = pd.concat([level_counts(cells, depth, dimensions)
+                          for depth in range(1, max_depth + 1)],
+                         ignore_index=True)
+
+    tests = batch_proportion_tests(
+        segments['users_a'], segments['conversions_a'],
+        segments['users_b'], segments['conversions_b'])
+    testable = ((segments['users_a'] >= min_users) &
+                (segments['users_b'] >= min_users)).to_numpy()
+    p_values = np.where(testable, tests['p_value_z'], np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        segments['rate_a'] = segments['conversions_a'] / segments['users_a']
+        segments['rate_b'] = segments['conversions_b'] / segments['users_b']
+    segments['difference'] = tests['difference']
+    segments['relative_improvement'] = tests['relative_improvement']
+    segments['ci_lower'] = tests['ci_lower']
+    segments['ci_upper'] = tests['ci_upper']
+    segments['z_statistic'] = tests['z_statistic']
+    segments['p_value'] = p_values
+    segments['p_adjusted'] = adjust_p_values(p_values, correction)
+    segments['significant'] = segments['p_adjusted'] < alpha
+
+    bayesian = batch_bayesian_tests(
+        segments['users_a'], segments['conversions_a'],
+        segments['users_b'], segments['conversions_b'], prior, draws)
+    segments['prob_b_better'] = bayesian['prob_b_better']
+    segments['expected_loss_b'] = bayesian['expected_loss_b']
+    segments.insert(0, 'segment', segment_label(segments, dimensions))
+
+    return segments.sort_values(['p_adjusted', 'p_value'],
+                                na_position='last', kind='stable',
+                                ignore_index=True)
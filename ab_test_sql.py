@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+SQL Backend
+===========
+
+Experiment data left on disk and queried through an embedded, in-process
+SQL engine, for datasets larger than memory.
+
+The export is registered with DuckDB when it is installed (the CSV, a
+directory of rotated CSVs or the Parquet copy is scanned in place) and
+otherwise imported once, in chunks, into a SQLite file next to it. The
+sufficient-statistics cube and the per-cell histograms are each one
+GROUP BY query, so every filter, group total, segment breakdown and metrics
+table of the dashboard is computed from aggregates the engine returns.
+Row-level reads (the bootstrap) push the filters into a WHERE clause and
+select only the columns they need.
+
+    python ab_test_sql.py ab_test_enriched.csv --engine sqlite
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: SQLite (stdlib) is used instead
+    duckdb = None
+
+from ab_test_cache import dataset_version
+from ab_test_cube import CUBE_KEYS, MOMENT_METRICS, SUM_COLUMNS
+from ab_test_filters import selected_values
+from ab_test_histograms import HISTOGRAM_BINS, range_edges
+from ab_test_storage import (CATEGORICAL_COLUMNS, DATE_DTYPE, DATE_FORMATS,
+                             columnar_path, parse_visit_dates)
+from ab_test_timeseries import DailyAggregate
+
+ENGINES = ('duckdb', 'sqlite')
+
+# Name of the table (SQLite) or view (DuckDB) holding the rows
+TABLE = 'experiment'
+
+# Rows per chunk when importing a CSV into SQLite
+IMPORT_CHUNK_ROWS = 250_000
+
+
+def default_engine():
+    """DuckDB when installed, otherwise SQLite"""
+    return 'duckdb' if duckdb is not None else 'sqlite'
+
+
+def sqlite_path(path):
+    """Return the SQLite database path that sits next to an export"""
+    return os.path.splitext(path.rstrip(os.sep))[0] + '.sqlite'
+
+
+def csv_files(path):
+    """CSV files of an export: the file itself, or every CSV in a directory"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.csv')))
+    return [path]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _source_mtime(path):
+    files = [file for file in csv_files(path) if os.path.exists(file)]
+    if not files:
+        raise FileNotFoundError(path)
+    return max(os.path.getmtime(file) for file in files)
+
+
+def register_duckdb(connection, path):
+    """Create the rows view over the export, read in place by DuckDB
+
+    Prefers an up-to-date Parquet copy of a CSV. visit_date in CSVs is read
+    as text and parsed with each of the export's date formats; the text is
+    also exposed as visit_date_text, so aggregates can group on it and parse
+    each distinct date once instead of once per row.
+    """
+    parquet = columnar_path(path)
+    if (not os.path.isdir(path) and os.path.exists(parquet) and
+            os.path.getmtime(parquet) >= _source_mtime(path)):
+        source = f"read_parquet({_literal(parquet)})"
+        visit_date = 'CAST(visit_date AS DATE)'
+    else:
+        _source_mtime(path)
+        pattern = (os.path.join(path, '*.csv') if os.path.isdir(path)
+                   else path)
+        source = (f"read_csv({_literal(pattern)}, header=true, "
+                  f"types={{'visit_date': 'VARCHAR'}})")
+        visit_date = 'CAST(COALESCE({}) AS DATE)'.format(', '.join(
+            f"TRY_STRPTIME(visit_date, {_literal(fmt)})"
+            for fmt in DATE_FORMATS))
+    connection.execute(
+        f"CREATE OR REPLACE VIEW {TABLE} AS "
+        f"SELECT * REPLACE ({visit_date} AS visit_date), "
+        f"visit_date AS visit_date_text FROM {source}")
+
+
+def import_sqlite(path, database=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import the CSV export(s) into a SQLite file once, in chunks
+
+    The database is rebuilt only when a CSV is newer than it. Dates are
+    stored as ISO text, so they sort and compare as dates.
+    """
+    database = database or sqlite_path(path)
+    if (os.path.exists(database) and
+            os.path.getmtime(database) >= _source_mtime(path)):
+        return database
+
+    partial = database + '.tmp'
+    if os.path.exists(partial):
+        os.remove(partial)
+    connection = sqlite3.connect(partial)
+    try:
+        for file in csv_files(path):
+            for chunk in pd.read_csv(file, chunksize=chunk_rows):
+                chunk['visit_date'] = parse_visit_dates(
+                    chunk['visit_date']).dt.strftime('%Y-%m-%d')
+                chunk.to_sql(TABLE, connection, if_exists='append',
+                             index=False)
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_visit_date "
+            f"ON {TABLE} (visit_date)")
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(partial, database)
+    return database
+
+
+def _text(values):
+    """Values as strings, NULLs left missing"""
+    return values.where(values.isna(), values.astype(str))
+
+
+def where_clause(date_range=None, selections=None):
+    """WHERE clause and parameters matching the sidebar filters"""
+    conditions, params = [], []
+    if date_range is not None:
+        conditions.append('visit_date BETWEEN ? AND ?')
+        params += [pd.Timestamp(d).date().isoformat() for d in date_range]
+    for column, selection in (selections or {}).items():
+        values = selected_values(selection)
+        if values is not None:
+            if not len(values):
+                conditions.append('FALSE')
+                continue
+            conditions.append(f"{_quote(column)} IN "
+                              f"({', '.join('?' * len(values))})")
+            params += [str(value) for value in values]
+    return ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+
+def bin_expression(column, edges):
+    """SQL for ab_test_histograms.bin_index: inner edges at or below the value"""
+    return ' + '.join(f"CAST({column} >= {float(edge)!r} AS INTEGER)"
+                      for edge in edges[1:-1]) or '0'
+
+
+def positions(count):
+    """GROUP BY list of the first `count` selected columns"""
+    return ', '.join(str(position) for position in range(1, count + 1))
+
+
+class SqlDataset:
+    """Cube, histograms and filtered rows of an export queried in SQL
+
+    Offers the same attributes and methods as Dataset, but the rows stay in
+    the engine: only the cube, the histogram counts and explicitly requested
+    row subsets are brought into memory.
+    """
+
+    def __init__(self, path, engine=None, edges=None):
+        self.path = path
+        self.engine = engine or default_engine()
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown SQL engine '{self.engine}'")
+        # Queries may come from any session's thread
+        self._lock = threading.Lock()
+        if self.engine == 'duckdb':
+            if duckdb is None:
+                raise ImportError("The duckdb engine needs the duckdb package")
+            self._connection = duckdb.connect()
+            register_duckdb(self._connection, path)
+        else:
+            self._connection = sqlite3.connect(import_sqlite(path),
+                                               check_same_thread=False)
+
+        # DuckDB parses dates lazily in its view; SQLite stores them parsed
+        self._date_column = ('visit_date_text' if self.engine == 'duckdb'
+                             else 'visit_date')
+
+        self.cube = self._cells(self._cube_sql(), SUM_COLUMNS)
+        self.edges = edges if edges is not None else self._edges()
+        self.histograms = {
+            metric: self._cells(self._histogram_sql(metric, metric_edges),
+                                ['count'], ['bin'])
+            for metric, metric_edges in self.edges.items()}
+        self.daily = DailyAggregate(self.cube)
+        self.version = dataset_version(self.cube)
+
+    def query(self, sql, params=()):
+        """Result of a query as a DataFrame"""
+        with self._lock:
+            if self.engine == 'duckdb':
+                return self._connection.execute(sql, list(params)).df()
+            return pd.read_sql_query(sql, self._connection,
+                                     params=list(params))
+
+    @staticmethod
+    def _typed(frame):
+        """Cast query results to the dtypes of the in-memory backend"""
+        for column in frame.columns:
+            if column == 'visit_date':
+                frame[column] = pd.to_datetime(frame[column]).astype(DATE_DTYPE)
+            elif column in CATEGORICAL_COLUMNS:
+                # NULL keys stay missing rather than becoming 'None'
+                frame[column] = _text(frame[column]).astype('category')
+        return frame
+
+    def _cells(self, sql, sums, extra_keys=()):
+        """Per-cell aggregates grouped on the date text, merged per day
+
+        The same day written in two date formats is two groups in SQL and
+        one cell once parsed.
+        """
+        cells = self.query(sql)
+        cells['visit_date'] = parse_visit_dates(
+            _text(cells.pop('visit_date')))
+        keys = CUBE_KEYS + list(extra_keys)
+        cells = self._typed(cells)
+        return cells.groupby(keys, observed=True, dropna=False)[
+            sums].sum().reset_index()
+
+    def _keys(self):
+        """Cell keys of the aggregate queries, the date as stored"""
+        return ', '.join([f"{self._date_column} AS visit_date"] +
+                         [_quote(key) for key in CUBE_KEYS[1:]])
+
+    def _cube_sql(self):
+        keys = self._keys()
+        sums = ["COUNT(*) AS users",
+                "CAST(COALESCE(SUM(converted), 0) AS BIGINT) AS conversions"]
+        for column, prefix in MOMENT_METRICS.items():
+            metric = f"CAST({_quote(column)} AS DOUBLE)"
+            sums += [f"COALESCE(SUM({metric}), 0) AS {prefix}_sum",
+                     f"COALESCE(SUM({metric} * {metric}), 0) AS {prefix}_sumsq"]
+        return (f"SELECT {keys}, {', '.join(sums)} FROM {TABLE} "
+                f"GROUP BY {positions(5)}")
+
+    def _edges(self):
+        """Dataset-wide histogram edges from each metric's range"""
+        edges = {}
+        for metric, bins in HISTOGRAM_BINS.items():
+            column = _quote(metric)
+            low, high, fractional = self.query(
+                f"SELECT MIN({column}), MAX({column}), "
+                f"SUM(CASE WHEN {column} = ROUND({column}) THEN 0 ELSE 1 END) "
+                f"FROM {TABLE} WHERE {column} IS NOT NULL").iloc[0]
+            edges[metric] = (np.linspace(0.0, 1.0, bins + 1) if pd.isna(low)
+                             else range_edges(float(low), float(high),
+                                              not fractional, bins))
+        return edges
+
+    def _histogram_sql(self, metric, edges):
+        return (f"SELECT {self._keys()}, "
+                f"{bin_expression(_quote(metric), edges)} AS bin, "
+                f"COUNT(*) AS count FROM {TABLE} "
+                f"WHERE {_quote(metric)} IS NOT NULL GROUP BY {positions(6)}")
+
+    @property
+    def n_rows(self):
+        return int(self.cube['users'].sum())
+
+    def values(self, column):
+        """Distinct values of a filter column"""
+        return sorted(self.cube[column].dropna().astype(str).unique())
+
+    def filter_rows(self, date_range=None, selections=None, columns=None):
+        """Rows matching the sidebar filters (only `columns`, if given)"""
+        where, params = where_clause(date_range, selections)
+        select = ', '.join(map(_quote, columns)) if columns else '*'
+        return self._typed(self.query(f"SELECT {select} FROM {TABLE} {where}",
+                                      params))
+
+
+def main():
+    """Build the aggregates of an export with a SQL engine and time them"""
+    parser = argparse.ArgumentParser(
+        description="Aggregate an A/B test export with an embedded SQL engine")
+    parser.add_argument('path', nargs='?', default='ab_test_enriched.csv',
+                        help="CSV export or directory of CSV exports")
+    parser.add_argument('--engine', choices=ENGINES, default=default_engine())
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = SqlDataset(args.path, args.engine)
+    elapsed = time.perf_counter() - start
+    histogram_cells = sum(len(cells) for cells in dataset.histograms.values())
+    print(f"✅ {dataset.engine}: {dataset.n_rows:,} rows -> "
+          f"{len(dataset.cube):,} cube cells and {histogram_cells:,} "
+          f"histogram cells in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
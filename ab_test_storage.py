@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Columnar Storage
+================
+
+Typed schema and one-time CSV -> Parquet / Arrow IPC conversion for the A/B
+test dataset, so the dashboard can skip CSV parsing and date inference on
+cold start and read only the columns a view needs.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+
+# Dimension columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ['group', 'device', 'channel', 'region']
+
+# On-disk schema for the experiment dataset; the dictionary index width of
+# the dimensions is widened per file to fit its dictionaries
+SCHEMA = pa.schema([
+    ('user_id', pa.int64()),
+    ('group', pa.dictionary(pa.int8(), pa.string())),
+    ('visit_date', pa.date32()),
+    ('converted', pa.int8()),
+    ('session_duration_sec', pa.float32()),
+    ('page_views', pa.int16()),
+    ('device', pa.dictionary(pa.int8(), pa.string())),
+    ('channel', pa.dictionary(pa.int8(), pa.string())),
+    ('region', pa.dictionary(pa.int8(), pa.string())),
+])
+
+# Date formats found in experiment exports ('1/28/2024' and '2024-01-28')
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d']
+
+# In-memory dtype of visit_date, whichever file it was read from
+DATE_DTYPE = 'datetime64[ns]'
+
+FORMAT_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def columnar_path(csv_path, fmt='parquet'):
+    """Return the columnar file path that sits next to a CSV export"""
+    return os.path.splitext(csv_path)[0] + FORMAT_EXTENSIONS[fmt]
+
+
+def _csv_convert_options(columns=None):
+    """pyarrow CSV options that parse straight into the storage types"""
+    column_types = {field.name: field.type for field in SCHEMA
+                    if field.name not in CATEGORICAL_COLUMNS}
+    # Dates are parsed as timestamps and cast to date32 afterwards
+    column_types['visit_date'] = pa.timestamp('s')
+    for name in CATEGORICAL_COLUMNS:
+        column_types[name] = pa.string()
+    return pa_csv.ConvertOptions(
+        column_types=column_types,
+        timestamp_parsers=DATE_FORMATS,
+        include_columns=columns,
+        # Blank dimensions are missing, as pandas reads them
+        strings_can_be_null=True
+    )
+
+
+def _scan_dictionaries(csv_path, block_size):
+    """First pass: collect the sorted distinct values of each dimension"""
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=_csv_convert_options(CATEGORICAL_COLUMNS)
+    )
+    values = {name: set() for name in CATEGORICAL_COLUMNS}
+    for batch in reader:
+        for name in CATEGORICAL_COLUMNS:
+            values[name].update(pc.unique(batch.column(name)).to_pylist())
+    return {name: pa.array(sorted(v for v in values[name] if v is not None),
+                           pa.string())
+            for name in CATEGORICAL_COLUMNS}
+
+
+def index_type(size):
+    """Smallest signed integer type indexing a dictionary of `size` values"""
+    for candidate in (pa.int8(), pa.int16(), pa.int32()):
+        if size <= np.iinfo(candidate.to_pandas_dtype()).max + 1:
+            return candidate
+    return pa.int64()
+
+
+def file_schema(dictionaries):
+    """SCHEMA with dictionary indices wide enough for `dictionaries`"""
+    return pa.schema([
+        pa.field(field.name, pa.dictionary(
+            index_type(len(dictionaries[field.name])), pa.string()))
+        if field.name in CATEGORICAL_COLUMNS else field
+        for field in SCHEMA])
+
+
+def _encode_batch(batch, dictionaries, schema):
+    """Cast a parsed CSV batch to `schema` using fixed dictionaries"""
+    arrays = []
+    for field in schema:
+        column = batch.column(field.name)
+        if field.name in CATEGORICAL_COLUMNS:
+            dictionary = dictionaries[field.name]
+            indices = pc.cast(pc.index_in(column, value_set=dictionary),
+                              field.type.index_type)
+            column = pa.DictionaryArray.from_arrays(indices, dictionary)
+        else:
+            column = pc.cast(column, field.type)
+        arrays.append(column)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def convert_csv(csv_path, output_path=None, fmt='parquet',
+                block_size=64 << 20):
+    """Convert a CSV export to Parquet or Arrow IPC with the fixed schema
+
+    The CSV is streamed twice in blocks: once to collect the category
+    dictionaries, once to encode and write, so memory stays bounded by the
+    block size rather than the file size. Every batch shares the same
+    dictionaries, which keeps the Arrow IPC file memory-mappable.
+    """
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    output_path = output_path or columnar_path(csv_path, fmt)
+    dictionaries = _scan_dictionaries(csv_path, block_size)
+    schema = file_schema(dictionaries)
+
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=_csv_convert_options([f.name for f in SCHEMA])
+    )
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(output_path, schema, compression='zstd')
+    else:
+        writer = pa_ipc.new_file(output_path, schema)
+
+    rows = 0
+    with writer:
+        for batch in reader:
+            encoded = _encode_batch(batch, dictionaries, schema)
+            if fmt == 'parquet':
+                writer.write_batch(encoded)
+            else:
+                writer.write(encoded)
+            rows += encoded.num_rows
+
+    return output_path, rows
+
+
+def read_columnar(path, columns=None):
+    """Read a Parquet or Arrow IPC dataset into pandas
+
+    Only the requested columns are read from disk. Dimensions come back as
+    pandas categoricals and visit_date as datetime64.
+    """
+    if path.endswith(FORMAT_EXTENSIONS['arrow']):
+        with pa.memory_map(path) as source:
+            table = pa_ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        table = pq.read_table(path, columns=columns)
+    df = table.to_pandas(date_as_object=False)
+    if 'visit_date' in df.columns:
+        df['visit_date'] = df['visit_date'].astype(DATE_DTYPE)
+    return df
+
+
+def shared_path(csv_path):
+    """Path of the memory-mappable copy of a CSV export's loaded rows"""
+    return os.path.splitext(csv_path)[0] + '.shared.arrow'
+
+
+def write_shared(df, path):
+    """Write a frame as an uncompressed, single-batch Arrow IPC file
+
+    Columns are stored exactly as they are laid out in memory (categorical
+    codes plus dictionary, datetime64[ns] as timestamp[ns]), so read_shared
+    can map every column without converting it.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with pa_ipc.new_file(temporary, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+    # Readers mapping the old file keep their pages until they let go
+    os.replace(temporary, path)
+
+
+def read_shared(path, columns=None):
+    """Read-only frame whose columns are views of a memory-mapped file
+
+    Nothing is copied: every column of the frame points into the mapped
+    file, so all sessions and processes reading it share the OS page cache
+    instead of holding their own copy of the rows.
+    """
+    table = pa_ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    data = {}
+    for name, column in zip(table.column_names, table.columns):
+        chunk = (column.chunk(0) if column.num_chunks == 1
+                 else column.combine_chunks())
+        if pa.types.is_dictionary(chunk.type):
+            # Wrap the mapped codes; pyarrow's conversion would copy them
+            data[name] = pd.Categorical.from_codes(
+                chunk.indices.to_numpy(zero_copy_only=False),
+                chunk.dictionary.to_pandas(), validate=False)
+        else:
+            data[name] = chunk.to_numpy(zero_copy_only=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def parse_visit_dates(values):
+    """Parse visit_date strings by converting each distinct value once"""
+    categories = values.astype('category')
+    parsed = pd.to_datetime(categories.cat.categories, format='mixed')
+    # Missing values have code -1, which takes the NaT appended last
+    parsed = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))
+    return pd.Series(parsed[categories.cat.codes.to_numpy()],
+                     index=values.index,
+                     name=values.name).astype(DATE_DTYPE)
+
+
+def compact_frame(df, max_category_share=0.5):
+    """Shrink a frame parsed with pandas' default dtypes, keeping every value
+
+    Text columns with few distinct values (at most max_category_share of the
+    rows) become categoricals, integer columns are downcast to the smallest
+    (unsigned where possible) integer type, and float columns to float32 when
+    every value survives the round trip. Works per chunk as well.
+    """
+    compact = {}
+    for column, values in df.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            compact[column] = values
+        elif (pd.api.types.is_object_dtype(values.dtype) or
+              pd.api.types.is_string_dtype(values.dtype)):
+            if values.nunique() <= max_category_share * len(values):
+                values = values.astype('category')
+            compact[column] = values
+        elif (pd.api.types.is_integer_dtype(values.dtype) and
+              not pd.api.types.is_extension_array_dtype(values.dtype)):
+            downcast = 'unsigned' if len(values) and values.min() >= 0 \
+                else 'integer'
+            compact[column] = pd.to_numeric(values, downcast=downcast)
+        elif pd.api.types.is_float_dtype(values.dtype) and \
+                values.dtype.itemsize > 4:
+            narrow = values.astype('float32')
+            lossless = ((narrow.astype(values.dtype) == values) |
+                        values.isna()).all()
+            compact[column] = narrow if lossless else values
+        else:
+            compact[column] = values
+    return pd.DataFrame(compact, index=df.index)
+
+
+def memory_report(df):
+    """Bytes held by each column (strings and categories counted deeply)"""
+    usage = df.memory_usage(deep=True, index=False)
+    total = usage.sum()
+    return pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'bytes_per_row': usage / max(len(df), 1),
+        'share': usage / total if total else 0.0,
+    })
+
+
+def read_csv(path, columns=None):
+    """Read a CSV export with the storage dtypes applied"""
+    dtypes = {field.name: field.type.to_pandas_dtype() for field in SCHEMA
+              if field.name not in CATEGORICAL_COLUMNS + ['visit_date']}
+    dtypes.update({name: 'category' for name in CATEGORICAL_COLUMNS})
+    df = pd.read_csv(path, usecols=columns, dtype=dtypes)
+    if 'visit_date' in df.columns:
+        df['visit_date'] = parse_visit_dates(df['visit_date'])
+    return df
+
+
+def read_dataset(csv_path, columns=None):
+    """Read the experiment dataset, preferring a columnar copy of the CSV
+
+    Looks for '<name>.arrow' then '<name>.parquet' next to the CSV and falls
+    back to parsing the CSV itself. A columnar copy older than the CSV is
+    ignored so a re-exported CSV is never shadowed by stale data.
+    """
+    csv_mtime = (os.path.getmtime(csv_path)
+                 if os.path.exists(csv_path) else None)
+    for fmt in ('arrow', 'parquet'):
+        path = columnar_path(csv_path, fmt)
+        if os.path.exists(path) and (csv_mtime is None or
+                                     os.path.getmtime(path) >= csv_mtime):
+            return read_columnar(path, columns)
+    return read_csv(csv_path, columns)
+
+
+def main():
+    """Convert a CSV export to a columnar file"""
+    parser = argparse.ArgumentParser(
+        description="Convert an A/B test CSV export to Parquet or Arrow IPC")
+    parser.add_argument('csv_path', nargs='?', default='ab_test_enriched.csv')
+    parser.add_argument('--format', dest='fmt', default='parquet',
+                        choices=sorted(FORMAT_EXTENSIONS))
+    parser.add_argument('--output', default=None,
+                        help="Output path (default: next to the CSV)")
+    parser.add_argument('--shared', action='store_true',
+                        help="Write the memory-mappable copy served to "
+                             "every session with AB_TEST_SHARED=1")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print bytes per column for each in-memory "
+                             "layout instead of converting")
+    args = parser.parse_args()
+
+    if args.shared:
+        output_path = args.output or shared_path(args.csv_path)
+        df = read_dataset(args.csv_path)
+        # Date-sorted as the dashboard keeps it, so loading copies nothing
+        df = df.sort_values('visit_date', kind='stable', ignore_index=True)
+        write_shared(df, output_path)
+        print(f"✅ Wrote {len(df):,} rows to '{output_path}' "
+              f"({os.path.getsize(output_path) / 2**20:,.1f} MB)")
+        return
+
+    if args.memory_report:
+        default = pd.read_csv(args.csv_path)
+        layouts = {'pandas defaults': default,
+                   'compact_frame': compact_frame(default),
+                   'storage schema': read_csv(args.csv_path)}
+        for name, df in layouts.items():
+            report = memory_report(df)
+            print(f"\n{name}: {report['bytes'].sum() / 2**20:,.2f} MB "
+                  f"({report['bytes'].sum() / max(len(df), 1):,.1f} B/row)")
+            print(report.to_string(float_format=lambda v: f"{v:,.3f}"))
+        return
+
+    output_path, rows = convert_csv(args.csv_path, args.output, args.fmt)
+    print(f"✅ Wrote {rows:,} rows to '{output_path}'")
+
+
+if __name__ == "__main__":
+    main()
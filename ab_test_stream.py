@@ -0,0 +1,133 @@
+"""
+Streaming Verification
+======================
+
+Single-pass, bounded-memory checks over a CSV export read in chunks.
+
+Everything the verification report needs is kept as a mergeable
+accumulator: the sufficient-statistics cube (group sizes, conversions,
+segments and moments), missing-value and row counts, and the column dtypes.
+Duplicate rows are found by hashing each row and spilling the hashes to
+on-disk partitions, which are deduplicated one at a time after the pass.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ab_test_cube import build_cube, merge_cubes
+
+
+def row_hashes(chunk):
+    """64-bit hash of each row that does not depend on the chunk's dtypes
+
+    The same value can be parsed as int64 in one chunk and float64 in
+    another (when that chunk has a missing value), so numeric columns are
+    hashed as float64 and everything else as strings.
+    """
+    canonical = pd.DataFrame({
+        column: (values.astype('float64')
+                 if pd.api.types.is_numeric_dtype(values)
+                 else values.astype('string'))
+        for column, values in chunk.items()})
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+class DuplicateCounter:
+    """Count rows identical to an earlier row, in bounded memory
+
+    Row hashes are appended to one of `partitions` spill files chosen by
+    their top bits, so equal rows always land in the same file and each
+    file holds about 8 * rows / partitions bytes (partitions is a power of
+    two). Distinct rows colliding on a 64-bit hash are the only source of
+    error.
+    """
+
+    def __init__(self, partitions=256, spill_dir=None):
+        # The partition is the top `bits` bits of a hash, so at least one
+        if partitions < 2 or partitions & (partitions - 1):
+            raise ValueError(f"Partitions must be a power of two of at "
+                             f"least 2, got {partitions}")
+        self.bits = partitions.bit_length() - 1
+        self.directory = tempfile.mkdtemp(prefix='ab_dupes_', dir=spill_dir)
+        self.files = [open(os.path.join(self.directory, f'{i:04d}.u64'), 'wb')
+                      for i in range(1 << self.bits)]
+
+    def add(self, chunk):
+        hashes = row_hashes(chunk)
+        partition = (hashes >> np.uint64(64 - self.bits)).astype('int64')
+        order = np.argsort(partition, kind='stable')
+        bounds = np.searchsorted(partition[order],
+                                 np.arange(len(self.files) + 1))
+        for i, spill in enumerate(self.files):
+            if bounds[i + 1] > bounds[i]:
+                hashes[order[bounds[i]:bounds[i + 1]]].tofile(spill)
+
+    def count(self):
+        """Number of duplicate rows across everything added"""
+        duplicates = 0
+        for spill in self.files:
+            spill.close()
+            hashes = np.fromfile(spill.name, dtype='uint64')
+            duplicates += len(hashes) - len(np.unique(hashes))
+        return duplicates
+
+    def close(self):
+        for spill in self.files:
+            spill.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def merge_dtypes(left, right):
+    """Dtype a column would get if two chunks had been read together"""
+    if left == right:
+        return left
+    # Chunks see different category sets; the column stays categorical
+    if (isinstance(left, pd.CategoricalDtype) and
+            isinstance(right, pd.CategoricalDtype)):
+        return pd.CategoricalDtype()
+    if (pd.api.types.is_numeric_dtype(left) and
+            pd.api.types.is_numeric_dtype(right)):
+        return np.result_type(left, right)
+    return np.dtype('object')
+
+
+class StreamSummary:
+    """Mergeable per-chunk aggregates of a CSV export"""
+
+    def __init__(self):
+        self.rows = 0
+        self.missing = 0
+        self.dtypes = None
+        self.cube = None
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+        self.missing += int(chunk.isnull().sum().sum())
+        self.dtypes = self._merge_dtypes(self.dtypes, chunk.dtypes.to_dict())
+        self.cube = merge_cubes([self.cube, build_cube(chunk)])
+
+    def merge(self, other):
+        """Fold in the summary of another (disjoint) part of the data"""
+        self.rows += other.rows
+        self.missing += other.missing
+        self.dtypes = self._merge_dtypes(self.dtypes, other.dtypes)
+        self.cube = merge_cubes([self.cube, other.cube])
+        return self
+
+    @staticmethod
+    def _merge_dtypes(left, right):
+        if left is None or right is None:
+            return left or right
+        return {column: merge_dtypes(dtype, right[column])
+                for column, dtype in left.items()}
+
@@ -0,0 +1,105 @@
+"""
+Results Over Time
+=================
+
+Daily and cumulative conversion per group, with the running z-test,
+confidence interval and lift, for any date range and sidebar filter state.
+
+The cube is folded once into cumulative sums of users and conversions per
+(day, segment, group), where a segment is one device x channel x region
+combination. A filter state selects segments, and a date range [first, last]
+is answered by subtracting the prefix row before `first` from every row up
+to `last`. A year of daily data is a few thousand numbers, so a series costs
+microseconds whatever the number of rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ab_test_cube import GROUPS
+from ab_test_filters import selected_values
+from ab_test_metrics import batch_proportion_tests
+from ab_test_segments import SEGMENT_DIMENSIONS
+
+
+class DailyAggregate:
+    """Prefix sums of users and conversions per (day, segment, group)"""
+
+    def __init__(self, cube, dimensions=SEGMENT_DIMENSIONS):
+        self.dimensions = dimensions
+        # Cells without a date belong to no day
+        cube = cube[cube['visit_date'].notna()]
+        days = cube['visit_date'].to_numpy().astype('datetime64[D]')
+        self.days, day_codes = np.unique(days, return_inverse=True)
+
+        # Strings, but a missing value stays missing rather than 'nan'
+        segments = cube[dimensions]
+        segments = segments.where(segments.isna(), segments.astype(str))
+        segment_codes, uniques = pd.MultiIndex.from_frame(segments) \
+            .factorize()
+        self.segments = uniques.to_frame(index=False, name=dimensions)
+        group_codes = pd.Categorical(cube['group'].astype(str),
+                                     categories=GROUPS).codes
+
+        # counts[day, segment, group, (users, conversions)]
+        counts = np.zeros((len(self.days), len(self.segments), len(GROUPS),
+                           2), dtype='int64')
+        valid = group_codes >= 0
+        for stat, column in enumerate(('users', 'conversions')):
+            np.add.at(counts[..., stat],
+                      (day_codes[valid], segment_codes[valid],
+                       group_codes[valid]),
+                      cube[column].to_numpy()[valid])
+        self.prefix = np.concatenate(
+            [np.zeros((1,) + counts.shape[1:], dtype='int64'),
+             counts.cumsum(axis=0)])
+
+    def segment_mask(self, selections):
+        """Segments matching {dimension: selection}"""
+        mask = np.ones(len(self.segments), dtype=bool)
+        for dimension, selection in (selections or {}).items():
+            values = selected_values(selection)
+            if values is not None:
+                mask &= self.segments[dimension].isin(
+                    [str(value) for value in values]).to_numpy()
+        return mask
+
+    def cumulative(self, date_range=None, selections=None):
+        """(days, cumulative counts[day, group, (users, conversions)])"""
+        if date_range is None:
+            first, last = 0, len(self.days)
+        else:
+            start, end = (np.datetime64(d, 'D') for d in date_range)
+            first = np.searchsorted(self.days, start, side='left')
+            last = np.searchsorted(self.days, end, side='right')
+        prefix = self.prefix[:, self.segment_mask(selections)].sum(axis=1)
+        return (self.days[first:last],
+                prefix[first + 1:last + 1] - prefix[first])
+
+    def series(self, date_range=None, selections=None):
+        """Daily and cumulative rates, running z-test and lift per day"""
+        days, cumulative = self.cumulative(date_range, selections)
+        daily = np.diff(cumulative, axis=0,
+                        prepend=np.zeros((1,) + cumulative.shape[1:],
+                                         dtype='int64'))
+        users, conversions = cumulative[..., 0], cumulative[..., 1]
+        tests = batch_proportion_tests(users[:, 0], conversions[:, 0],
+                                       users[:, 1], conversions[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame = pd.DataFrame({
+                'users_a': daily[:, 0, 0],
+                'users_b': daily[:, 1, 0],
+                'rate_a': daily[:, 0, 1] / daily[:, 0, 0],
+                'rate_b': daily[:, 1, 1] / daily[:, 1, 0],
+                'cumulative_users_a': users[:, 0],
+                'cumulative_users_b': users[:, 1],
+                'cumulative_rate_a': conversions[:, 0] / users[:, 0],
+                'cumulative_rate_b': conversions[:, 1] / users[:, 1],
+                'difference': tests['difference'],
+                'ci_lower': tests['ci_lower'],
+                'ci_upper': tests['ci_upper'],
+                'z_statistic': tests['z_statistic'],
+                'p_value': tests['p_value_z'],
+                'relative_improvement': tests['relative_improvement'],
+            }, index=pd.DatetimeIndex(days, name='visit_date'))
+        return frame
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Analytics API Load Test
+=======================
+
+Drives the analytics API with concurrent keep-alive clients and reports
+latency percentiles and throughput, first against an empty response cache
+(every distinct request computed once, concurrent duplicates coalesced) and
+then against a warm one:
+
+    python benchmarks/bench_api.py --rows 1000000 --concurrency 64
+    python benchmarks/bench_api.py --url http://127.0.0.1:8765 --requests 5000
+
+Without --url the server is started on a free port over a generated dataset
+and stopped at the end. Requests are drawn from --distinct URLs: random
+filter states over every endpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from ab_test_generator import GeneratorConfig, write_dataset  # noqa: E402
+
+ENDPOINTS = ['/summary', '/tests', '/segments', '/segments/scan',
+             '/distributions']
+
+# Filter values sampled for the request mix (those of the generated data)
+FILTER_VALUES = {
+    'device': list(GeneratorConfig().device_mix),
+    'channel': list(GeneratorConfig().channel_mix),
+    'region': list(GeneratorConfig().region_mix),
+}
+
+
+def request_paths(distinct, seed=42):
+    """Distinct request targets: each endpoint with random filter states"""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(distinct):
+        query = {}
+        for dimension, values in FILTER_VALUES.items():
+            if rng.random() < 0.5:
+                picked = rng.choice(values, rng.integers(1, 3), replace=False)
+                query[dimension] = ','.join(sorted(picked))
+        target = ENDPOINTS[i % len(ENDPOINTS)]
+        paths.append(target + ('?' + urlencode(query) if query else ''))
+    return paths
+
+
+async def client(host, port, paths, latencies, outcomes):
+    """One keep-alive connection sending its share of the requests in turn"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n"
+                         .encode())
+            await writer.drain()
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            headers = dict(line.split(': ', 1)
+                           for line in head.split('\r\n')[1:] if line)
+            await reader.readexactly(int(headers['Content-Length']))
+            latencies.append(time.perf_counter() - start)
+            status = head.split(' ', 2)[1]
+            outcomes[headers.get('X-Cache') if status == '200'
+                     else f'HTTP {status}'] += 1
+    finally:
+        writer.close()
+
+
+async def run_phase(host, port, paths, requests, concurrency, seed):
+    """Latencies (seconds), outcome counts and wall time of one phase"""
+    rng = np.random.default_rng(seed)
+    picked = [paths[i] for i in rng.integers(0, len(paths), requests)]
+    latencies, outcomes = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, picked[i::concurrency],
+                                  latencies, outcomes)
+                           for i in range(concurrency)))
+    return np.array(latencies), outcomes, time.perf_counter() - start
+
+
+async def fetch_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(csv_path, port, workers, backend):
+    """Start ab_test_api.py and wait until it accepts connections"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, 'ab_test_api.py'), csv_path,
+         '--port', str(port), '--workers', str(workers),
+         '--backend', backend], cwd=REPO_ROOT)
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The API server exited during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("The API server did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default=None,
+                        help="Running server to test (default: start one)")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--backend', default='pandas')
+    parser.add_argument('--requests', type=int, default=2_000,
+                        help="Requests per phase")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--distinct', type=int, default=100,
+                        help="Distinct request URLs in the mix")
+    parser.add_argument('--workdir', default=None,
+                        help="Directory for the generated data (default: temp)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        workdir = args.workdir or tempfile.mkdtemp(prefix='ab_api_')
+        os.makedirs(workdir, exist_ok=True)
+        csv_path = os.path.join(workdir, 'ab_test_enriched.csv')
+        if not os.path.exists(csv_path):
+            print(f"Generating {args.rows:,} rows -> {csv_path}")
+            write_dataset(csv_path, args.rows, GeneratorConfig(), seed=42)
+        host, port = '127.0.0.1', free_port()
+        server = start_server(csv_path, port, args.workers, args.backend)
+
+    try:
+        paths = request_paths(args.distinct)
+        print(f"\n{args.requests:,} requests per phase, {args.concurrency} "
+              f"connections, {len(paths)} distinct URLs")
+        print(f"{'phase':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+              f"{'max ms':>10}  outcomes")
+        print("-" * 72)
+        for seed, phase in enumerate(('cold', 'warm')):
+            latencies, outcomes, wall = asyncio.run(run_phase(
+                host, port, paths, args.requests, args.concurrency, seed))
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{phase:<8}{len(latencies) / wall:>10.1f}{p50:>10.1f}"
+                  f"{p99:>10.1f}{latencies.max() * 1000:>10.1f}  "
+                  + ', '.join(f"{name} {count}" for name, count
+                              in sorted(outcomes.items())))
+        health = asyncio.run(fetch_json(host, port, '/health'))
+        print(f"\nServer: {health['rows']:,} rows, "
+              f"{health['coalesced']:,} coalesced, "
+              f"{health['cache']['entries']} cached responses "
+              f"({health['cache']['bytes'] / 2**20:.1f} MB)")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Load Path Benchmark
+===================
+
+Compares cold-start load time and peak RSS of the legacy CSV path against the
+typed CSV reader and the Parquet / Arrow IPC columnar copies.
+
+Each measurement runs in a fresh subprocess so peak RSS is not polluted by
+earlier runs:
+
+    python benchmarks/bench_load.py --rows 5000000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import ab_test_storage  # noqa: E402
+
+SOURCE_CSV = os.path.join(REPO_ROOT, 'ab_test_enriched.csv')
+
+# Columns a typical view reads (everything except user_id)
+VIEW_COLUMNS = ['group', 'visit_date', 'converted', 'session_duration_sec',
+                'page_views', 'device', 'channel', 'region']
+
+MODES = ['csv_legacy', 'csv_typed', 'parquet', 'parquet_view', 'arrow',
+         'arrow_view']
+
+
+def build_csv(path, n_rows, seed=42, chunk_rows=1_000_000):
+    """Write an n_rows CSV by resampling rows of the bundled export"""
+    source = pd.read_csv(SOURCE_CSV)
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        chunk = source.iloc[rng.integers(0, len(source), size)].copy()
+        chunk['user_id'] = np.arange(written + 1, written + size + 1)
+        chunk.to_csv(path, mode='a' if written else 'w',
+                     header=not written, index=False)
+        written += size
+
+
+def load(mode, base):
+    """Run one load path and return the number of rows read"""
+    csv_path = base + '.csv'
+    if mode == 'csv_legacy':
+        # The original load_data() + main() behaviour
+        df = pd.read_csv(csv_path)
+        df['visit_date'] = pd.to_datetime(df['visit_date'])
+    elif mode == 'csv_typed':
+        df = ab_test_storage.read_csv(csv_path)
+    else:
+        fmt, _, view = mode.partition('_')
+        df = ab_test_storage.read_columnar(
+            ab_test_storage.columnar_path(csv_path, fmt),
+            VIEW_COLUMNS if view else None)
+    return len(df)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process"""
+    # VmHWM is reset on exec, unlike ru_maxrss which a child inherits from
+    # the (large) parent that forked it
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_child(mode, base):
+    """Measure a single load inside this (fresh) process"""
+    start = time.perf_counter()
+    rows = load(mode, base)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'rows': rows, 'seconds': elapsed,
+                      'peak_rss_bytes': peak_rss_bytes()}))
+
+
+def main():
+    """Build the dataset once, then time every load path"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workdir', default=None,
+                        help="Directory for the generated files (default: temp)")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'BASE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ab_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    base = os.path.join(workdir, f'ab_test_{args.rows}')
+    csv_path = base + '.csv'
+    if not os.path.exists(csv_path):
+        print(f"Generating {args.rows:,} rows -> {csv_path}")
+        build_csv(csv_path, args.rows)
+    for fmt in ('parquet', 'arrow'):
+        path = ab_test_storage.columnar_path(csv_path, fmt)
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            ab_test_storage.convert_csv(csv_path, path, fmt)
+            print(f"Converted to {fmt} in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n{'mode':<14}{'seconds':>10}{'peak RSS (MB)':>16}")
+    print("-" * 40)
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, base],
+            check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<14}{result['seconds']:>10.3f}"
+              f"{result['peak_rss_bytes'] / 2**20:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
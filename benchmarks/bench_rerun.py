@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Dashboard Rerun Benchmark
+=========================
+
+Times end-to-end Streamlit script runs of the dashboard with AppTest: the
+cold first run, a rerun with nothing changed, a rerun after a filter change
+(fresh cache entries), a return to an already-seen filter and a switch of
+the segmentation tab:
+
+    python benchmarks/bench_rerun.py --rows 1000000
+    python benchmarks/bench_rerun.py --app /tmp/old_dashboard.py
+
+The dataset is generated into a work directory as ab_test_enriched.csv and
+the app runs from there.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from ab_test_generator import GeneratorConfig, write_dataset  # noqa: E402
+
+# Filter combinations cycled through for the filter-change scenario
+FILTER_CHANGES = [
+    (['Mobile'], [], []),
+    (['Desktop'], ['Email'], []),
+    (['Tablet'], [], ['Europe']),
+    ([], ['Social'], ['Asia']),
+    (['Mobile', 'Tablet'], [], []),
+    ([], [], ['North America']),
+]
+
+
+def timed_run(app):
+    """Run the script once and return the wall time in milliseconds"""
+    start = time.perf_counter()
+    app.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+
+def set_filters(app, devices, channels, regions):
+    for widget, values in zip(app.multiselect, (devices, channels, regions)):
+        options = set(widget.options)
+        widget.set_value([value for value in values if value in options])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--app', default=os.path.join(REPO_ROOT,
+                                                      'ab_test_dashboard.py'))
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--workdir', default=None,
+                        help="Directory for the generated data (default: temp)")
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest
+    warnings.filterwarnings('ignore')
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ab_rerun_')
+    os.makedirs(workdir, exist_ok=True)
+    csv_path = os.path.join(workdir, 'ab_test_enriched.csv')
+    if not os.path.exists(csv_path):
+        print(f"Generating {args.rows:,} rows -> {csv_path}")
+        write_dataset(csv_path, args.rows, GeneratorConfig(), seed=42)
+    os.chdir(workdir)
+
+    app = AppTest.from_file(os.path.abspath(args.app), default_timeout=600)
+    timings = {'cold run': [timed_run(app)], 'unchanged rerun': [],
+               'filter change': [], 'seen filter': [], 'tab switch': []}
+
+    for i in range(args.repeats):
+        timings['unchanged rerun'].append(timed_run(app))
+
+        set_filters(app, *FILTER_CHANGES[i % len(FILTER_CHANGES)])
+        timings['filter change'].append(timed_run(app))
+
+        set_filters(app, [], [], [])
+        timings['seen filter'].append(timed_run(app))
+
+        # Apps without a keyed tab widget just rerun in full
+        app.session_state['segment_tab'] = ('Channel', 'Region')[i % 2]
+        timings['tab switch'].append(timed_run(app))
+
+    print(f"\n{os.path.basename(args.app)}: {args.rows:,} rows, "
+          f"{args.repeats} repeats")
+    print(f"{'scenario':<18}{'median ms':>12}{'max ms':>10}")
+    print("-" * 40)
+    for scenario, values in timings.items():
+        print(f"{scenario:<18}{statistics.median(values):>12.1f}"
+              f"{max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
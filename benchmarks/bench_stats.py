@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Hypothesis Test Benchmark
+=========================
+
+Times the batched NumPy tests in ab_test_metrics against calling the
+per-comparison path (scipy.stats.chi2_contingency on a 2x2 table plus a
+z-test) once per comparison:
+
+    python benchmarks/bench_stats.py --comparisons 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_metrics import (batch_proportion_tests,  # noqa: E402
+                             batch_welch_tests)
+
+
+def per_call_tests(n_a, x_a, n_b, x_b):
+    """The original one-comparison-per-call path"""
+    p_a, p_b = x_a / n_a, x_b / n_b
+    p_pooled = (x_a + x_b) / (n_a + n_b)
+    se = np.sqrt(p_pooled * (1 - p_pooled) * (1/n_a + 1/n_b))
+    z_stat = (p_b - p_a) / se
+    p_value_z = 2 * (1 - stats.norm.cdf(abs(z_stat)))
+    chi2_stat, p_value_chi2, _, _ = stats.chi2_contingency(
+        np.array([[n_a - x_a, x_a], [n_b - x_b, x_b]]))
+    return z_stat, p_value_z, chi2_stat, p_value_chi2
+
+
+def make_comparisons(count, seed=42):
+    """Random experiment sizes and conversion counts"""
+    rng = np.random.default_rng(seed)
+    n_a = rng.integers(1_000, 1_000_000, count)
+    n_b = rng.integers(1_000, 1_000_000, count)
+    rate = rng.uniform(0.01, 0.3, count)
+    x_a = rng.binomial(n_a, rate)
+    x_b = rng.binomial(n_b, rate * rng.uniform(0.9, 1.2, count))
+    return n_a, x_a, n_b, x_b
+
+
+def best_of(repeats, func):
+    """Best wall time of several runs"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--comparisons', type=int, default=10_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    n_a, x_a, n_b, x_b = make_comparisons(args.comparisons)
+
+    per_call = best_of(args.repeats, lambda: [
+        per_call_tests(*values) for values in zip(n_a, x_a, n_b, x_b)])
+    batched = best_of(args.repeats,
+                      lambda: batch_proportion_tests(n_a, x_a, n_b, x_b))
+
+    # Check both paths agree before reporting
+    expected = np.array([per_call_tests(*values)
+                         for values in zip(n_a[:200], x_a[:200],
+                                           n_b[:200], x_b[:200])])
+    results = batch_proportion_tests(n_a[:200], x_a[:200], n_b[:200], x_b[:200])
+    np.testing.assert_allclose(
+        np.column_stack([results['z_statistic'], results['p_value_z'],
+                         results['chi2_statistic'], results['p_value_chi2']]),
+        expected, rtol=1e-9, atol=1e-12)
+
+    # Continuous metrics: Welch t-tests from sums and sums-of-squares
+    rng = np.random.default_rng(7)
+    sums = rng.uniform(1e5, 1e6, (6, args.comparisons))
+    sums[2] = sums[1] ** 2 / sums[0] * 1.5
+    sums[5] = sums[4] ** 2 / sums[3] * 1.5
+    welch = best_of(args.repeats, lambda: batch_welch_tests(*sums))
+
+    report = pd.DataFrame({
+        'seconds': [per_call, batched, welch],
+        'comparisons/s': [args.comparisons / per_call,
+                          args.comparisons / batched,
+                          args.comparisons / welch],
+    }, index=['per-call proportions', 'batched proportions', 'batched welch'])
+    print(f"{args.comparisons:,} comparisons, best of {args.repeats}")
+    print(report.to_string(float_format=lambda v: f"{v:,.4f}"))
+    print(f"Speed-up (proportions): {per_call / batched:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
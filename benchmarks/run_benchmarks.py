@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+===============
+
+Times the dashboard and verifier hot paths on synthetic datasets generated
+with a fixed seed, and records each stage's peak memory:
+
+    python benchmarks/run_benchmarks.py --sizes 10k 1M --output results.json
+    python benchmarks/run_benchmarks.py --sizes 10k 1M --baseline results.json
+
+Stages:
+
+    load_data            read the columnar copy of the dataset
+    build_dataset        cube, histograms and filter indexes
+    filter               sidebar filters over the cube and the rows
+    statistical_tests    per-group metrics and significance tests
+    conversion_chart     conversion comparison figure (built and serialized)
+    segmentation_charts  device / channel / region figures
+    distribution_charts  pre-binned histogram figures
+    verify               streaming verification of the CSV export
+
+Every size runs in a fresh subprocess. Before each stage the process's peak
+RSS is reset (Linux /proc/self/clear_refs), so each stage reports its own
+high-water mark. With --baseline, any stage slower (or more memory hungry)
+than the baseline by more than --threshold is reported as a regression and
+the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from ab_test_generator import GeneratorConfig, write_dataset  # noqa: E402
+
+SEED = 42
+
+# Fixed end date so every run generates identical data
+CONFIG = GeneratorConfig(end_date=date(2024, 1, 31))
+
+STAGES = ['load_data', 'build_dataset', 'filter', 'statistical_tests',
+          'conversion_chart', 'segmentation_charts', 'distribution_charts',
+          'verify']
+
+# Columns the dashboard views read (everything except user_id)
+VIEW_COLUMNS = ['group', 'visit_date', 'converted', 'session_duration_sec',
+                'page_views', 'device', 'channel', 'region']
+
+# Sidebar states replayed by the filter and statistics stages
+FILTER_STATES = [
+    (None, [], [], []),
+    ((date(2024, 1, 5), date(2024, 1, 20)), [], [], []),
+    (None, ['Mobile'], [], []),
+    (None, ['Desktop', 'Tablet'], ['Email', 'Social'], []),
+    ((date(2024, 1, 10), date(2024, 1, 12)), ['Mobile'], ['Paid'],
+     ['Europe']),
+]
+
+# Stage timings below this are treated as noise when comparing
+MIN_SECONDS = 0.005
+
+SIZE_SUFFIXES = {'k': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def format_size(rows):
+    for suffix, scale in sorted(SIZE_SUFFIXES.items(), key=lambda s: -s[1]):
+        if rows >= scale and rows % scale == 0:
+            return f'{rows // scale}{suffix}'
+    return str(rows)
+
+
+def reset_peak_rss():
+    """Reset the peak RSS counter; False where the OS does not support it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_bytes(field):
+    """VmRSS / VmHWM of this process, falling back to ru_maxrss"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def measure(func, repeats):
+    """Best wall time of several calls, peak RSS and the last result"""
+    reset_peak_rss()
+    start_rss = rss_bytes('VmRSS')
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    peak = rss_bytes('VmHWM')
+    return result, {'seconds': min(timings), 'peak_rss_bytes': peak,
+                    'peak_rss_delta_bytes': max(peak - start_rss, 0)}
+
+
+def dataset_paths(workdir, rows):
+    base = os.path.join(workdir, f'ab_bench_{format_size(rows)}')
+    return base + '.parquet', base + '.csv'
+
+
+def ensure_dataset(workdir, rows, need_csv, workers):
+    """Generate the Parquet (and CSV) copies of a size once"""
+    parquet_path, csv_path = dataset_paths(workdir, rows)
+    for path, needed in ((parquet_path, True), (csv_path, need_csv)):
+        if needed and not os.path.exists(path):
+            print(f"Generating {rows:,} rows -> {path}", file=sys.stderr)
+            write_dataset(path + '.tmp' + os.path.splitext(path)[1], rows,
+                          CONFIG, seed=SEED, workers=workers)
+            os.replace(path + '.tmp' + os.path.splitext(path)[1], path)
+    return parquet_path, csv_path
+
+
+def run_size(rows, workdir, stages, repeats):
+    """Run the stages on one dataset size in this process"""
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    from ab_test_cube import apply_filters
+    from ab_test_dataset import Dataset
+    from ab_test_filters import sort_by_date
+    from ab_test_metrics import summarize_cube
+    from ab_test_storage import read_columnar
+    import ab_test_charts as charts
+    import verify_data_alignment
+
+    parquet_path, csv_path = dataset_paths(workdir, rows)
+    results = {}
+
+    def run(stage, func, stage_repeats=repeats):
+        if stage not in stages:
+            return None
+        value, results[stage] = measure(func, stage_repeats)
+        return value
+
+    def payload(figures):
+        return sum(len(figure.to_json()) for figure in figures)
+
+    df = run('load_data', lambda: sort_by_date(read_columnar(
+        parquet_path, VIEW_COLUMNS)), 1)
+    if df is None:
+        df = sort_by_date(read_columnar(parquet_path, VIEW_COLUMNS))
+    dataset = run('build_dataset', lambda: Dataset(df), 1) or Dataset(df)
+
+    def filter_all():
+        for date_range, devices, channels, regions in FILTER_STATES:
+            apply_filters(dataset.cube, date_range, devices, channels, regions)
+            dataset.filter_rows(date_range, {'device': devices,
+                                             'channel': channels,
+                                             'region': regions})
+
+    run('filter', filter_all)
+
+    cubes = [apply_filters(dataset.cube, *state) for state in FILTER_STATES]
+    metrics = run('statistical_tests', lambda: [
+        summarize_cube(cube) for cube in cubes])
+    metrics = metrics or [summarize_cube(cube) for cube in cubes]
+
+    payloads = {}
+    payloads['conversion_chart'] = run('conversion_chart', lambda: payload(
+        [charts.create_conversion_comparison_chart(m.totals)
+         for m in metrics]))
+    payloads['segmentation_charts'] = run(
+        'segmentation_charts', lambda: payload(
+            [figure for cube in cubes
+             for figure in charts.create_segmentation_charts(cube)]))
+
+    def distribution_charts():
+        figures = []
+        for state in FILTER_STATES:
+            histograms = {metric: apply_filters(cells, *state)
+                          for metric, cells in dataset.histograms.items()}
+            figures.extend(charts.create_distribution_charts(
+                histograms, dataset.edges))
+        return payload(figures)
+
+    payloads['distribution_charts'] = run('distribution_charts',
+                                          distribution_charts)
+    for stage, size in payloads.items():
+        if size is not None:
+            results[stage]['payload_bytes'] = size
+
+    del df, dataset
+    output_dir = tempfile.mkdtemp(prefix='ab_bench_verify_')
+    try:
+        run('verify', lambda: verify_data_alignment.verify(
+            csv_path, os.path.join(output_dir, 'cleaned.csv'),
+            os.path.join(output_dir, 'summary.csv'), stream=True), 1)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Regressions of current against baseline results"""
+    regressions = []
+    for size, stages in current['results'].items():
+        for stage, result in stages.items():
+            before = baseline.get('results', {}).get(size, {}).get(stage)
+            if before is None:
+                continue
+            for metric, floor in (('seconds', MIN_SECONDS),
+                                  ('peak_rss_delta_bytes', 16 << 20)):
+                old, new = before[metric], result[metric]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append({
+                        'size': size, 'stage': stage, 'metric': metric,
+                        'baseline': old, 'current': new,
+                        'ratio': new / old if old else float('inf')})
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1M', '10M',
+                                                       '100M'])
+    parser.add_argument('--stages', nargs='+', default=STAGES,
+                        choices=STAGES)
+    parser.add_argument('--repeats', type=int, default=3,
+                        help="Runs per fast stage (the best one is kept)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Processes used to generate the datasets")
+    parser.add_argument('--workdir', default=os.path.join(
+        tempfile.gettempdir(), 'ab_bench'),
+        help="Directory holding the generated datasets (reused)")
+    parser.add_argument('--output', default=None,
+                        help="Write the results as JSON")
+    parser.add_argument('--baseline', default=None,
+                        help="Results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        results = run_size(args.child, args.workdir, args.stages,
+                           args.repeats)
+        print(json.dumps(results))
+        return 0
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': SEED,
+            'repeats': args.repeats,
+        },
+        'results': {},
+    }
+    for size in args.sizes:
+        rows = parse_size(size)
+        ensure_dataset(args.workdir, rows, 'verify' in args.stages,
+                       args.workers)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', str(rows),
+             '--workdir', args.workdir, '--repeats', str(args.repeats),
+             '--stages', *args.stages],
+            check=True, capture_output=True, text=True).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        report['results'][format_size(rows)] = results
+
+        print(f"\n{format_size(rows)} rows")
+        print(f"{'stage':<22}{'seconds':>10}{'peak RSS (MB)':>16}"
+              f"{'+RSS (MB)':>12}")
+        print("-" * 60)
+        for stage in args.stages:
+            result = results[stage]
+            print(f"{stage:<22}{result['seconds']:>10.4f}"
+                  f"{result['peak_rss_bytes'] / 2**20:>16.1f}"
+                  f"{result['peak_rss_delta_bytes'] / 2**20:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"\n✅ Wrote results to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"❌ {regression['size']} {regression['stage']} "
+                  f"{regression['metric']}: {regression['baseline']:.4g} -> "
+                  f"{regression['current']:.4g} "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"✅ No regressions beyond {args.threshold:.0%} "
+              f"against '{args.baseline}'")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
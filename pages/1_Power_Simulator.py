@@ -0,0 +1,122 @@
+"""
+Power Simulator Page
+====================
+
+Pre-launch sizing: Monte Carlo power curves and false-positive rates of the
+dashboard's z-test for a planned experiment.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from ab_test_power import (PowerScenario, required_sample_size,
+                           sample_size_grid, simulate_power)
+
+st.set_page_config(page_title="Power Simulator", page_icon="🎲",
+                   layout="wide")
+
+
+@st.cache_resource
+def get_simulation_pool():
+    """Process pool shared by all sessions for simulation blocks"""
+    # Spawned (not forked) workers: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(max_workers=os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+@st.cache_data(max_entries=256)
+def run_simulation(scenario, low, high, points, simulations, seed):
+    """Power curve of a scenario, cached per input"""
+    workers = os.cpu_count() or 1
+    return simulate_power(scenario, sample_size_grid(low, high, points),
+                          simulations, seed,
+                          executor=get_simulation_pool() if workers > 1
+                          else None)
+
+
+def create_power_chart(curve, target):
+    """Simulated and analytic power, plus the false-positive rate"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=curve['sample_size'], y=curve['power_ci_upper'], mode='lines',
+        line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=curve['sample_size'], y=curve['power_ci_lower'], mode='lines',
+        line=dict(width=0), fill='tonexty',
+        fillcolor='rgba(255, 107, 107, 0.2)', name='95% MC interval'))
+    fig.add_trace(go.Scatter(
+        x=curve['sample_size'], y=curve['power'], mode='lines+markers',
+        name='Simulated power', line=dict(color='#ff6b6b')))
+    fig.add_trace(go.Scatter(
+        x=curve['sample_size'], y=curve['analytic_power'], mode='lines',
+        name='Normal approximation', line=dict(color='#00d4ff', dash='dash')))
+    fig.add_trace(go.Scatter(
+        x=curve['sample_size'], y=curve['false_positive_rate'],
+        mode='lines+markers', name='False-positive rate',
+        line=dict(color='#ffd166')))
+    fig.add_hline(y=target, line_dash='dot', line_color='#888888')
+    fig.update_layout(
+        title='Power Curve',
+        xaxis_title='Total Users', yaxis_title='Probability',
+        xaxis_type='log', yaxis_range=[0, 1.02], height=450,
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+st.title("🎲 Power Simulator")
+st.caption("Simulated experiments analysed with the dashboard's "
+           "two-proportion z-test")
+
+with st.sidebar:
+    st.markdown("### Scenario")
+    baseline = st.number_input("Baseline conversion rate", min_value=0.001,
+                               max_value=0.999, value=0.12, step=0.01,
+                               format="%.3f")
+    lift = st.number_input("Relative lift of B (%)", min_value=-90.0,
+                           max_value=500.0, value=10.0, step=1.0) / 100
+    split_b = st.slider("Traffic to B", min_value=0.05, max_value=0.95,
+                        value=0.5, step=0.05)
+    alpha = st.select_slider("α", options=[0.001, 0.01, 0.05, 0.1],
+                             value=0.05)
+    target = st.slider("Target power", min_value=0.5, max_value=0.99,
+                       value=0.8, step=0.01)
+
+    st.markdown("### Simulation")
+    low, high = st.select_slider(
+        "Total users", options=[100, 200, 500, 1_000, 2_000, 5_000, 10_000,
+                                20_000, 50_000, 100_000, 200_000, 500_000,
+                                1_000_000],
+        value=(500, 100_000))
+    points = st.slider("Grid points", min_value=5, max_value=60, value=20)
+    simulations = st.select_slider(
+        "Simulations per point", options=[1_000, 5_000, 10_000, 20_000,
+                                          50_000],
+        value=10_000)
+
+try:
+    scenario = PowerScenario(baseline, lift, split_b, alpha)
+except ValueError as error:
+    # e.g. a lift that takes the treatment rate to 100% or more
+    st.error(f"⚠️ {error}. Lower the lift for a baseline of {baseline:.1%}.")
+    st.stop()
+with st.spinner("Simulating..."):
+    curve = run_simulation(scenario, low, high, points, simulations, seed=42)
+
+required = required_sample_size(curve, target)
+col1, col2, col3 = st.columns(3)
+col1.metric("Rates (A → B)", f"{scenario.baseline_rate:.2%} → "
+                             f"{scenario.treatment_rate:.2%}")
+col2.metric(f"Users for {target:.0%} power",
+            f"{required:,}" if required else f"> {high:,}")
+col3.metric("False-positive rate", f"{curve['false_positive_rate'].mean():.3f}",
+            delta=f"{curve['false_positive_rate'].mean() - alpha:+.3f} vs α",
+            delta_color='off')
+
+st.plotly_chart(create_power_chart(curve, target), use_container_width=True)
+st.dataframe(curve.round(4), hide_index=True, use_container_width=True)
+st.caption("Size many experiments at once from the command line: "
+           "`python ab_test_power.py --scenarios launches.csv`")
@@ -0,0 +1,57 @@
+"""Dashboard reruns on filter states that match no users"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from ab_test_cube import build_cube  # noqa: E402
+from ab_test_generator import GeneratorConfig, generate_dataset  # noqa: E402
+from ab_test_metrics import summarize_cube  # noqa: E402
+
+
+def test_overall_rate_of_no_users_is_nan():
+    df = generate_dataset(200, GeneratorConfig(), seed=1)
+    metrics = summarize_cube(build_cube(df).iloc[:0])
+    assert metrics.total_users == 0
+    assert np.isnan(metrics.overall_rate)
+
+
+def test_rows_without_a_group_count_in_the_totals():
+    df = generate_dataset(500, GeneratorConfig(), seed=1)
+    df['group'] = df['group'].astype(object)
+    df.loc[:9, 'group'] = np.nan
+    metrics = summarize_cube(build_cube(df))
+    assert metrics.total_users == len(df)
+    assert metrics.ungrouped_users == 10
+    assert metrics.total_conversions == df['converted'].sum()
+    assert metrics.overall_rate == pytest.approx(df['converted'].mean())
+
+
+def test_empty_filter_state_renders(tmp_path, monkeypatch):
+    testing = pytest.importorskip('streamlit.testing.v1')
+    df = generate_dataset(2_000, GeneratorConfig(), seed=3)
+    day = df['visit_date'].min()
+    device, channel, region = (df[column].iloc[0]
+                               for column in ('device', 'channel', 'region'))
+    # Every value stays selectable, but no row has all of them on that day
+    empty = ((df['visit_date'] == day) & (df['device'] == device) &
+             (df['channel'] == channel) & (df['region'] == region))
+    df[~empty].to_csv(tmp_path / 'ab_test_enriched.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+
+    app = testing.AppTest.from_file(
+        os.path.join(REPO_ROOT, 'ab_test_dashboard.py'), default_timeout=120)
+    app.run()
+    app.sidebar.date_input[0].set_value((day.date(), day.date()))
+    for widget, value in zip(app.sidebar.multiselect,
+                             (device, channel, region)):
+        widget.set_value([value])
+    app.run()
+
+    assert not app.exception
+    assert app.sidebar.metric[0].value == '0'
@@ -0,0 +1,139 @@
+"""Filter indexes against a naive boolean mask on random frames"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_filters import (FILTER_COLUMNS, BitmapIndex,  # noqa: E402
+                             DateIndex, filter_rows, sort_by_date)
+
+VALUES = {'device': ['Desktop', 'Mobile', 'Tablet'],
+          'channel': ['Organic', 'Paid', 'Email'],
+          'region': ['Europe', 'Asia', 'Africa', 'Oceania']}
+
+
+def random_frame(rng, n_rows):
+    """Random dimensions, with some values missing"""
+    df = pd.DataFrame({column: rng.choice(values, n_rows)
+                       for column, values in VALUES.items()})
+    for column in VALUES:
+        df.loc[rng.random(n_rows) < 0.05, column] = np.nan
+    return df
+
+
+def random_selections(rng):
+    """'All', one value or a few values per column, some absent from data"""
+    selections = {}
+    for column, values in VALUES.items():
+        pool = values + ['Missing']
+        kind = rng.integers(4)
+        if kind == 0:
+            selections[column] = 'All'
+        elif kind == 1:
+            selections[column] = str(rng.choice(pool))
+        else:
+            size = int(rng.integers(0, len(pool)))
+            selections[column] = list(rng.choice(pool, size, replace=False))
+    return selections
+
+
+def naive_mask(df, selections):
+    mask = np.ones(len(df), dtype=bool)
+    for column, selection in selections.items():
+        if selection == 'All' or selection == []:
+            continue
+        values = selection if isinstance(selection, list) else [selection]
+        mask &= df[column].isin(values).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize('n_rows', [1, 7, 8, 13, 1_001])
+def test_bitmap_select_matches_a_boolean_mask(n_rows):
+    rng = np.random.default_rng(n_rows)
+    df = random_frame(rng, n_rows)
+    index = BitmapIndex(df, FILTER_COLUMNS)
+
+    for _ in range(50):
+        selections = random_selections(rng)
+        mask = naive_mask(df, selections)
+        positions = index.select(selections)
+        expected = np.flatnonzero(mask)
+        if positions is None:
+            assert mask.all()
+        else:
+            np.testing.assert_array_equal(positions, expected)
+
+        # Row slices with edges inside a byte, at the ends and empty
+        start = int(rng.integers(0, n_rows + 1))
+        stop = int(rng.integers(start, n_rows + 1))
+        positions = index.select(selections, slice(start, stop))
+        if positions is None:
+            assert mask.all()
+        else:
+            np.testing.assert_array_equal(
+                positions, expected[(expected >= start) & (expected < stop)])
+
+
+def random_dates(rng, n_rows):
+    """Sorted dates over a month with gaps, plus a few missing ones"""
+    days = pd.Timestamp('2024-01-01') + pd.to_timedelta(
+        rng.choice(np.arange(0, 31, 2), n_rows), unit='D')
+    dates = pd.Series(days, dtype='datetime64[ns]')
+    missing = rng.random(n_rows) < 0.03
+    missing[0] = False
+    dates[missing] = pd.NaT
+    return dates
+
+
+def date_ranges(rng, dates):
+    """Ranges at, inside and beyond the data's first and last days"""
+    first, last = dates.min(), dates.max()
+    day = pd.Timedelta(days=1)
+    ranges = [(first, last), (first - 5 * day, last + 5 * day),
+              (first, first), (last, last), (first - 9 * day, first - day),
+              (last + day, last + 9 * day), (last, first)]
+    for _ in range(30):
+        start, end = sorted(rng.integers(-3, 35, 2))
+        ranges.append((first + start * day, first + end * day))
+    return [(start.date(), end.date()) for start, end in ranges]
+
+
+@pytest.mark.parametrize('n_rows', [1, 13, 1_001])
+def test_date_slice_matches_a_boolean_mask(n_rows):
+    rng = np.random.default_rng(n_rows)
+    dates = sort_by_date(pd.DataFrame({'visit_date': random_dates(
+        rng, n_rows)}))['visit_date']
+    index = DateIndex(dates)
+
+    assert index.slice() == slice(0, n_rows)
+    for date_range in date_ranges(rng, dates):
+        start, end = (pd.Timestamp(d) for d in date_range)
+        mask = ((dates >= start) & (dates <= end)).to_numpy()
+        rows = index.slice(date_range)
+        np.testing.assert_array_equal(np.arange(n_rows)[rows],
+                                      np.flatnonzero(mask))
+
+
+def test_date_and_value_filters_match_a_boolean_mask():
+    rng = np.random.default_rng(5)
+    df = random_frame(rng, 1_003)
+    df['visit_date'] = random_dates(rng, len(df)).to_numpy()
+    df = sort_by_date(df)
+    bitmap_index = BitmapIndex(df, FILTER_COLUMNS)
+    date_index = DateIndex(df['visit_date'])
+
+    for date_range in date_ranges(rng, df['visit_date']):
+        selections = random_selections(rng)
+        start, end = (pd.Timestamp(d) for d in date_range)
+        mask = (naive_mask(df, selections) &
+                ((df['visit_date'] >= start) & (df['visit_date'] <= end))
+                .to_numpy())
+        pd.testing.assert_frame_equal(
+            filter_rows(df, bitmap_index, date_index, date_range,
+                        selections).reset_index(drop=True),
+            df[mask].reset_index(drop=True))
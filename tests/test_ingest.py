@@ -0,0 +1,97 @@
+"""Tailing an append-only export: partial lines, rotation and truncation"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_dataset import Dataset  # noqa: E402
+from ab_test_generator import GeneratorConfig, generate_dataset  # noqa: E402
+from ab_test_ingest import (IncrementalDataset, SourceRewritten,  # noqa: E402
+                            TailingReader)
+from ab_test_storage import read_csv  # noqa: E402
+
+
+@pytest.fixture
+def rows():
+    df = generate_dataset(600, GeneratorConfig(), seed=9)
+    return df.to_csv(index=False, date_format='%Y-%m-%d').splitlines(
+        keepends=True)
+
+
+def _append(path, lines):
+    with open(path, 'a') as output:
+        output.write(''.join(lines))
+
+
+def test_partial_last_line_waits_for_its_newline(tmp_path, rows):
+    path = tmp_path / 'export.csv'
+    last = rows[11]
+    _append(path, rows[:11] + [last[:7]])
+    reader = TailingReader(str(path))
+
+    assert len(reader.poll()) == 10
+    assert reader.poll() is None
+    _append(path, [last[7:]] + rows[12:20])
+    new_rows = reader.poll()
+    assert len(new_rows) == 9
+    assert new_rows['user_id'].tolist() == list(range(11, 20))
+    assert reader.rows == 19
+
+
+def test_rotated_file_keeps_its_offset(tmp_path, rows):
+    directory = tmp_path / 'exports'
+    directory.mkdir()
+    current = directory / 'current.csv'
+    _append(current, rows[:101])
+    reader = TailingReader(str(directory))
+    assert len(reader.poll()) == 100
+
+    # Rows land in the old file, which is then renamed; a new file follows
+    _append(current, rows[101:151])
+    os.rename(current, directory / 'rotated-1.csv')
+    os.utime(directory / 'rotated-1.csv', (1, 1))
+    _append(current, rows[:1] + rows[151:])
+    new_rows = reader.poll()
+
+    assert new_rows['user_id'].tolist() == list(range(101, len(rows)))
+    assert reader.poll() is None
+
+
+def test_truncated_file_is_reported(tmp_path, rows):
+    path = tmp_path / 'export.csv'
+    _append(path, rows[:201])
+    reader = TailingReader(str(path))
+    reader.poll()
+    path.write_text(''.join(rows[:51]))
+    with pytest.raises(SourceRewritten):
+        reader.poll()
+
+
+def test_incremental_dataset_matches_a_full_load(tmp_path, rows):
+    path = tmp_path / 'export.csv'
+    _append(path, rows[:101])
+    dataset = IncrementalDataset(str(path))
+    # Uneven appends, so partitions are merged more than once
+    for start, end in ((101, 151), (151, 176), (176, 401), (401, len(rows))):
+        _append(path, rows[start:end])
+        assert dataset.refresh() == end - start
+    assert len(dataset.partitions) < 5
+
+    full = Dataset(read_csv(str(path)))
+    assert dataset.n_rows == full.n_rows
+    for column in ('users', 'conversions'):
+        assert (dataset.cube.groupby('group', observed=True)[column].sum()
+                .to_dict() ==
+                full.cube.groupby('group', observed=True)[column].sum()
+                .to_dict())
+    selections = {'device': ['Mobile'], 'region': ['Europe', 'Asia']}
+    assert (sorted(dataset.filter_rows(None, selections)['user_id']) ==
+            sorted(full.filter_rows(None, selections)['user_id']))
+
+    # Truncation starts over from the file's current contents
+    path.write_text(''.join(rows[:51]))
+    assert dataset.refresh() == 50
+    assert dataset.n_rows == 50
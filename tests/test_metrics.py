@@ -0,0 +1,100 @@
+"""Batch significance tests against their scipy.stats counterparts"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_metrics import (adjust_p_values,  # noqa: E402
+                             batch_proportion_tests, batch_welch_tests)
+
+# (n_a, x_a, n_b, x_b), including small counts where Yates' correction is
+# capped by the distance to the expected count
+TABLES = [
+    (5_000, 600, 5_000, 750),
+    (1_200, 130, 800, 97),
+    (40, 3, 35, 9),
+    (10, 5, 12, 6),
+    (7, 0, 9, 1),
+]
+
+
+def test_proportion_tests_match_scipy():
+    n_a, x_a, n_b, x_b = (np.array(column) for column in zip(*TABLES))
+    results = batch_proportion_tests(n_a, x_a, n_b, x_b)
+
+    for i, (na, xa, nb, xb) in enumerate(TABLES):
+        table = [[na - xa, xa], [nb - xb, xb]]
+        chi2, p_value, _, _ = stats.chi2_contingency(table, correction=True)
+        assert results['chi2_statistic'][i] == pytest.approx(chi2)
+        assert results['p_value_chi2'][i] == pytest.approx(p_value)
+
+        # The pooled z-test is the uncorrected chi-square test on one df
+        chi2, p_value, _, _ = stats.chi2_contingency(table, correction=False)
+        assert results['z_statistic'][i] ** 2 == pytest.approx(chi2)
+        assert results['p_value_z'][i] == pytest.approx(p_value)
+        assert np.sign(results['z_statistic'][i]) == np.sign(xb / nb - xa / na)
+
+
+def test_welch_tests_match_scipy():
+    rng = np.random.default_rng(3)
+    samples = [(rng.exponential(300, 400), rng.exponential(320, 250)),
+               (rng.poisson(8, 30).astype(float), rng.poisson(9, 45)
+                .astype(float)),
+               (rng.normal(5, 1, 12), rng.normal(5.5, 3, 8))]
+    # One (n, sum, sum of squares) per group and comparison, transposed
+    # into one array per argument
+    results = batch_welch_tests(
+        *zip(*[(len(a), a.sum(), (a ** 2).sum(), len(b), b.sum(),
+                (b ** 2).sum()) for a, b in samples]))
+    for i, (a, b) in enumerate(samples):
+        expected = stats.ttest_ind(b, a, equal_var=False)
+        assert results['difference'][i] == pytest.approx(b.mean() - a.mean())
+        assert results['t_statistic'][i] == pytest.approx(expected.statistic)
+        assert results['p_value'][i] == pytest.approx(expected.pvalue)
+
+
+def test_empty_group_gives_nan():
+    proportions = batch_proportion_tests([0, 100], [0, 10], [50, 100],
+                                         [5, 12])
+    for name in ('z_statistic', 'p_value_z', 'chi2_statistic',
+                 'p_value_chi2', 'difference', 'ci_lower', 'ci_upper'):
+        assert np.isnan(proportions[name][0])
+        assert np.isfinite(proportions[name][1])
+
+    welch = batch_welch_tests([0, 20], [0.0, 40.0], [0.0, 100.0],
+                              [30, 20], [60.0, 50.0], [150.0, 140.0])
+    for name in ('t_statistic', 'p_value', 'ci_lower', 'ci_upper'):
+        assert np.isnan(welch[name][0])
+        assert np.isfinite(welch[name][1])
+
+
+# p-values and their adjustments, as given by R's p.adjust
+ADJUSTED = [
+    ([0.01, 0.04, 0.03, 0.005],
+     {'fdr_bh': [0.02, 0.04, 0.04, 0.02],
+      'holm': [0.03, 0.06, 0.06, 0.02]}),
+    ([0.01, 0.02, 0.03, 0.04, 0.05],
+     {'fdr_bh': [0.05, 0.05, 0.05, 0.05, 0.05],
+      'holm': [0.05, 0.08, 0.09, 0.09, 0.09]}),
+    # Untested comparisons stay NaN and do not count towards the family
+    ([0.2, 0.6, np.nan, 0.9],
+     {'fdr_bh': [0.6, 0.9, np.nan, 0.9],
+      'holm': [0.6, 1.0, np.nan, 1.0]}),
+]
+
+
+@pytest.mark.parametrize('method', ['fdr_bh', 'holm'])
+@pytest.mark.parametrize('p_values, expected', ADJUSTED)
+def test_adjusted_p_values_match_reference(p_values, expected, method):
+    np.testing.assert_allclose(adjust_p_values(p_values, method),
+                               expected[method])
+
+
+def test_unknown_correction_is_rejected():
+    with pytest.raises(ValueError, match='Unknown correction'):
+        adjust_p_values([0.01], 'bonferroni')
@@ -0,0 +1,50 @@
+"""Monte Carlo power against the normal approximation, and scenario input"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ab_test_power  # noqa: E402
+from ab_test_power import (PowerScenario, analytic_power,  # noqa: E402
+                           simulate_power, size_scenarios)
+
+
+@pytest.mark.parametrize('scenario', [
+    PowerScenario(),
+    PowerScenario(baseline_rate=0.3, lift=0.05, split_b=0.3, alpha=0.01),
+])
+def test_simulated_power_matches_the_normal_approximation(scenario):
+    simulations = 20_000
+    curve = simulate_power(scenario, [2_000, 10_000, 40_000, 80_000],
+                           simulations=simulations, seed=7)
+    expected = analytic_power(scenario, curve['sample_size'])
+    # Four Monte Carlo standard errors, plus a little for the approximation
+    tolerance = 4 * np.sqrt(expected * (1 - expected) / simulations) + 0.01
+    assert np.all(np.abs(curve['power'] - expected) <= tolerance)
+    # Under the null the test rejects at about alpha
+    assert curve['false_positive_rate'].mean() == pytest.approx(
+        scenario.alpha, abs=0.01)
+
+
+def test_invalid_scenario_row_is_named():
+    scenarios = pd.DataFrame({'baseline_rate': [0.1, 0.5],
+                              'lift': [0.1, 1.5]})
+    with pytest.raises(ValueError, match='Scenario row 2'):
+        size_scenarios(scenarios, [1_000], simulations=10)
+
+
+def test_scenarios_cli_reports_the_invalid_row(tmp_path, monkeypatch,
+                                               capsys):
+    path = tmp_path / 'scenarios.csv'
+    path.write_text('baseline_rate,lift\n0.1,0.1\n1.2,0.1\n')
+    monkeypatch.setattr(sys, 'argv', ['ab_test_power.py', '--scenarios',
+                                      str(path), '--workers', '1'])
+    with pytest.raises(SystemExit) as exited:
+        ab_test_power.main()
+    assert exited.value.code == 2
+    assert 'Scenario row 2' in capsys.readouterr().err
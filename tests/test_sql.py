@@ -0,0 +1,67 @@
+"""SQL backend against the in-memory Dataset on the same export"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_cube import CUBE_KEYS, SUM_COLUMNS  # noqa: E402
+from ab_test_dataset import Dataset  # noqa: E402
+from ab_test_generator import GeneratorConfig, generate_dataset  # noqa: E402
+from ab_test_sql import SqlDataset  # noqa: E402
+from ab_test_storage import read_csv  # noqa: E402
+
+
+@pytest.fixture
+def export(tmp_path):
+    """CSV with both date formats and blank dimensions"""
+    df = generate_dataset(4_000, GeneratorConfig(), seed=13)
+    rng = np.random.default_rng(13)
+    for column in ('group', 'device', 'channel', 'region'):
+        df[column] = df[column].astype(object)
+        df.loc[rng.random(len(df)) < 0.02, column] = np.nan
+    df['session_duration_sec'] = df['session_duration_sec'].astype('float64')
+    df.loc[rng.random(len(df)) < 0.01, 'session_duration_sec'] = np.nan
+    # '1/28/2024' on every other row, '2024-01-28' on the rest
+    dates = df['visit_date']
+    us_dates = (dates.dt.month.astype(str) + '/' + dates.dt.day.astype(str) +
+                '/' + dates.dt.year.astype(str))
+    df['visit_date'] = np.where(np.arange(len(df)) % 2,
+                                dates.dt.strftime('%Y-%m-%d'), us_dates)
+    path = tmp_path / 'export.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _cells(cells, keys, sums):
+    """Cells in key order, missing keys included, dimensions as text"""
+    cells = cells.astype({key: object for key in keys
+                          if key != 'visit_date'})
+    cells = cells.sort_values(keys, na_position='last', ignore_index=True)
+    return cells[keys + sums]
+
+
+def test_sqlite_matches_the_in_memory_dataset(export):
+    memory = Dataset(read_csv(export))
+    sql = SqlDataset(export, 'sqlite')
+
+    assert sql.n_rows == memory.n_rows == 4_000
+    assert sql.cube['visit_date'].notna().all()
+    assert sql.cube['region'].isna().any()
+    pd.testing.assert_frame_equal(
+        _cells(sql.cube, CUBE_KEYS, SUM_COLUMNS),
+        _cells(memory.cube, CUBE_KEYS, SUM_COLUMNS),
+        check_dtype=False, rtol=1e-9)
+
+    assert sql.edges.keys() == memory.edges.keys()
+    for metric, edges in memory.edges.items():
+        np.testing.assert_allclose(sql.edges[metric], edges)
+        pd.testing.assert_frame_equal(
+            _cells(sql.histograms[metric], CUBE_KEYS + ['bin'], ['count']),
+            _cells(memory.histograms[metric], CUBE_KEYS + ['bin'],
+                   ['count']),
+            check_dtype=False)
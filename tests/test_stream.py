@@ -0,0 +1,41 @@
+"""Chunked duplicate counting agrees with pandas on the whole export"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_generator import GeneratorConfig, generate_dataset  # noqa: E402
+from ab_test_stream import DuplicateCounter  # noqa: E402
+
+
+@pytest.mark.parametrize('partitions', [2, 16, 256])
+def test_duplicates_across_chunks_are_counted(tmp_path, partitions):
+    df = generate_dataset(2_000, GeneratorConfig(), seed=11)
+    df['page_views'] = df['page_views'].astype('float64')
+    # A missing value makes its chunk parse page_views as float64
+    df.loc[1_950, 'page_views'] = np.nan
+    # Copies of rows from the first chunk land in every later chunk, one
+    # of them on the boundary itself, plus a copy of the row with the NaN
+    copies = df.iloc[[0, 1, 1, 299, 650, 1_950]]
+    df = pd.concat([df.iloc[:300], copies.iloc[:2], df.iloc[300:1_000],
+                    copies.iloc[2:], df.iloc[1_000:]], ignore_index=True)
+    path = tmp_path / 'export.csv'
+    df.to_csv(path, index=False)
+
+    with DuplicateCounter(partitions, spill_dir=tmp_path) as counter:
+        for chunk in pd.read_csv(path, chunksize=300):
+            counter.add(chunk)
+        duplicates = counter.count()
+
+    assert duplicates == pd.read_csv(path).duplicated().sum() == 6
+
+
+@pytest.mark.parametrize('partitions', [0, 1, 3, 100])
+def test_partitions_must_be_a_power_of_two(tmp_path, partitions):
+    with pytest.raises(ValueError, match='power of two'):
+        DuplicateCounter(partitions, spill_dir=tmp_path)
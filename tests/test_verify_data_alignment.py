@@ -0,0 +1,43 @@
+"""Regression checks: the verifier counts rows with a missing dimension"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ab_test_generator import GeneratorConfig, generate_dataset  # noqa: E402
+from verify_data_alignment import observed_values, verify  # noqa: E402
+
+
+@pytest.fixture
+def export_with_blanks(tmp_path):
+    df = generate_dataset(3_000, GeneratorConfig(), seed=7)
+    df['region'] = df['region'].astype(object)
+    df.loc[5, 'region'] = np.nan
+    df['device'] = df['device'].astype(object)
+    df.loc[11, 'device'] = np.nan
+    path = tmp_path / 'export.csv'
+    df.to_csv(path, index=False)
+    return path, pd.read_csv(path)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_missing_dimension_rows_are_counted(tmp_path, export_with_blanks,
+                                            stream):
+    path, df = export_with_blanks
+    summary, duplicates, metrics = verify(
+        path, tmp_path / 'cleaned.csv', tmp_path / 'summary.csv',
+        stream=stream, chunksize=1_000)
+    observed = observed_values(summary, duplicates, metrics)
+
+    assert observed['total_users'] == len(df)
+    assert observed['group_a_users'] == (df['group'] == 'A').sum()
+    assert observed['group_b_users'] == (df['group'] == 'B').sum()
+    assert observed['overall_rate'] == pytest.approx(df['converted'].mean())
+    for group in ('A', 'B'):
+        rows = df[df['group'] == group]
+        assert metrics.conversions[group] == rows['converted'].sum()
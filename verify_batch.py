@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Batch Verification
+==================
+
+Verifies every experiment export in a directory (or matching a glob) in a
+process pool and writes one consolidated JSON report:
+
+    python verify_batch.py exports/ --manifest expectations.json --workers 8
+
+Each file gets its own cleaned CSV and summary CSV in the output directory,
+named after its path below the inputs' common directory (d1/exp.csv gives
+d1__exp_cleaned.csv).
+The manifest maps file names (or fnmatch patterns) to expectations, with
+optional defaults applied to every file:
+
+    {
+      "defaults": {"duplicates": 0, "missing_values": 0},
+      "files": {
+        "checkout_*.csv": {"total_users": 2000, "group_b_rate": [0.10, 0.20]}
+      }
+    }
+
+An expectation is an exact value or a [low, high] range over any field of
+the per-file "observed" block in the report. A file without expectations
+is reported as unchecked. The exit status is non-zero when a file fails a
+check or cannot be verified.
+"""
+
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from ab_test_json import plain
+from verify_data_alignment import check_expectations, observed_values, verify
+
+
+def find_exports(inputs):
+    """CSV files named by directories, globs or paths, in sorted order"""
+    files = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            files.update(glob.glob(os.path.join(pattern, '*.csv')))
+        else:
+            files.update(glob.glob(pattern))
+    return sorted(files)
+
+
+def load_manifest(path):
+    if path is None:
+        return {'defaults': {}, 'files': {}}
+    with open(path) as source:
+        manifest = json.load(source)
+    return {'defaults': manifest.get('defaults', {}),
+            'files': manifest.get('files', {})}
+
+
+def expectations_for(manifest, csv_path):
+    """Defaults merged with the first manifest entry matching the file name"""
+    expected = dict(manifest['defaults'])
+    name = os.path.basename(csv_path)
+    for pattern, values in manifest['files'].items():
+        if name == pattern or fnmatch.fnmatch(name, pattern):
+            expected.update(values)
+            break
+    return expected
+
+
+def output_stems(files):
+    """Unique output name per file: its path below the files' common root
+
+    Files with the same name in different directories would otherwise
+    overwrite each other's outputs.
+    """
+    paths = [os.path.abspath(path) for path in files]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths]) \
+        if paths else ''
+    stems = {path: os.path.splitext(os.path.relpath(absolute, root))[0]
+             .replace(os.sep, '__')
+             for path, absolute in zip(files, paths)}
+    if len(set(stems.values())) < len(stems):
+        raise ValueError("exports map to the same output names: "
+                         + ', '.join(sorted(files)))
+    return stems
+
+
+def output_paths(output_dir, stem):
+    return (os.path.join(output_dir, f'{stem}_cleaned.csv'),
+            os.path.join(output_dir, f'{stem}_summary.csv'))
+
+
+def verify_export(csv_path, expected, output_dir, stem, stream=False,
+                  chunksize=500_000):
+    """Verify one export in a worker process; returns its report entry"""
+    cleaned_path, summary_path = output_paths(output_dir, stem)
+    entry = {'file': csv_path, 'pid': os.getpid(),
+             'outputs': {'cleaned': cleaned_path, 'summary': summary_path}}
+    timing = entry['timing'] = {}
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        timing['bytes'] = os.path.getsize(csv_path)
+        summary, duplicates, metrics = verify(csv_path, cleaned_path,
+                                              summary_path, stream, chunksize)
+        seconds = time.perf_counter() - start
+        # No rate for a run shorter than the clock's resolution
+        timing['mb_per_second'] = (timing['bytes'] / 2**20 / seconds
+                                   if seconds > 0 else None)
+        observed = observed_values(summary, duplicates, metrics)
+        checks = check_expectations(observed, expected)
+        # A file without expectations has nothing to pass
+        if not checks:
+            status = 'unchecked'
+        elif all(c['match'] for c in checks.values()):
+            status = 'passed'
+        else:
+            status = 'failed'
+        entry.update(status=status, observed=observed, checks=checks)
+    except Exception as error:
+        entry.update(status='error', error=f'{type(error).__name__}: {error}')
+    timing.update(seconds=time.perf_counter() - start,
+                  cpu_seconds=time.process_time() - cpu_start)
+    return entry
+
+
+def run_batch(files, manifest, output_dir, workers, stream=False,
+              chunksize=500_000, progress=None):
+    """Verify files in a process pool; returns the consolidated report"""
+    os.makedirs(output_dir, exist_ok=True)
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    results = []
+    stems = output_stems(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(verify_export, path,
+                               expectations_for(manifest, path), output_dir,
+                               stems[path], stream, chunksize)
+                   for path in files]
+        for future in as_completed(futures):
+            entry = future.result()
+            results.append(entry)
+            if progress is not None:
+                progress(entry)
+    wall_seconds = time.perf_counter() - start
+
+    results.sort(key=lambda entry: entry['file'])
+    statuses = [entry['status'] for entry in results]
+    busy_seconds = sum(entry['timing']['seconds'] for entry in results)
+    return {
+        'started': started.isoformat(),
+        'host': platform.node(),
+        'workers': workers,
+        'stream': stream,
+        'files': len(results),
+        'passed': statuses.count('passed'),
+        'unchecked': statuses.count('unchecked'),
+        'failed': statuses.count('failed'),
+        'errors': statuses.count('error'),
+        'wall_seconds': wall_seconds,
+        'busy_seconds': busy_seconds,
+        # Average number of workers kept busy over the run
+        'parallelism': busy_seconds / wall_seconds if wall_seconds else 0.0,
+        'results': results,
+    }
+
+
+def print_progress(entry):
+    icon = {'passed': '✅', 'unchecked': '➖', 'failed': '❌',
+            'error': '💥'}[entry['status']]
+    timing = entry['timing']
+    rate = timing.get('mb_per_second')
+    print(f"{icon} {entry['file']}: {entry['status']} in "
+          f"{timing['seconds']:.2f}s" +
+          (f" ({rate:.1f} MB/s)" if rate is not None else ''))
+    for name, check in entry.get('checks', {}).items():
+        if not check['match']:
+            print(f"    {name}: expected {check['expected']}, "
+                  f"got {check['actual']}")
+    if 'error' in entry:
+        print(f"    {entry['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verify a batch of A/B test exports in parallel")
+    parser.add_argument('inputs', nargs='+',
+                        help="Directories, globs or CSV paths")
+    parser.add_argument('--manifest', default=None,
+                        help="JSON file of expectations per export")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output-dir', default='verification')
+    parser.add_argument('--report', default=None,
+                        help="Report path (default: <output-dir>/report.json)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Verify each file in bounded-memory chunks")
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    args = parser.parse_args(argv)
+
+    files = find_exports(args.inputs)
+    if not files:
+        parser.error("no CSV files found")
+    try:
+        output_stems(files)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(f"🔍 Verifying {len(files)} exports with {args.workers} workers")
+    report = run_batch(files, load_manifest(args.manifest), args.output_dir,
+                       args.workers, args.stream, args.chunksize,
+                       progress=print_progress)
+
+    report_path = args.report or os.path.join(args.output_dir, 'report.json')
+    with open(report_path, 'w') as output:
+        # Undefined statistics (NaN) are written as null: bare NaN is not JSON
+        json.dump(plain(report), output, indent=2, allow_nan=False)
+    print(f"\n📊 {report['passed']} passed, {report['unchecked']} unchecked, "
+          f"{report['failed']} failed, "
+          f"{report['errors']} errors in {report['wall_seconds']:.1f}s "
+          f"(parallelism {report['parallelism']:.1f}x)")
+    print(f"✅ Wrote report to '{report_path}'")
+    return 0 if report['failed'] == report['errors'] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,15 +5,25 @@ Data Alignment Verification Script
 
 This script verifies that the A/B test data matches the Streamlit dashboard
 and provides comprehensive analysis to ensure consistency.
+
+With --stream the export is read in chunks and checked in a single pass with
+bounded memory, for files larger than RAM:
+
+    python verify_data_alignment.py big_export.csv --stream
 """
 
+import argparse
+import math
+
 import pandas as pd
-import numpy as np
-from scipy import stats
-from scipy.stats import chi2_contingency
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from ab_test_cube import segment_table
+from ab_test_metrics import summarize_cube
+from ab_test_storage import compact_frame
+from ab_test_stream import DuplicateCounter, StreamSummary
+
 # Set up visualisation
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
@@ -21,62 +31,194 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
 
 
-def main():
+def add_features(df):
+    """Cleaned copy of the rows with the derived dashboard features"""
+    df_clean = df.copy()
+    df_clean['visit_date'] = pd.to_datetime(df_clean['visit_date'])
+
+    # Add features
+    df_clean['visit_day'] = df_clean['visit_date'].dt.day
+    df_clean['visit_month'] = df_clean['visit_date'].dt.month
+    df_clean['visit_weekday'] = df_clean['visit_date'].dt.day_name()
+    # Full precision whatever width the duration column was stored at
+    df_clean['engagement_score'] = (
+        df_clean['session_duration_sec'].astype('float64') / 60
+    ) * df_clean['page_views']
+    return df_clean
+
+
+def scan_full(path, cleaned_path):
+    """Load the whole export; returns (summary, duplicate rows)"""
+    # Categorical text and downcast numbers: same values, a fraction of
+    # the memory
+    df = compact_frame(pd.read_csv(path))
+
+    # All aggregates come from one grouped pass over the rows, through the
+    # same metrics module as the dashboard
+    summary = StreamSummary()
+    summary.add(df)
+    duplicates = int(df.duplicated().sum())
+
+    add_features(df).to_csv(cleaned_path, index=False)
+    return summary, duplicates
+
+
+def scan_stream(path, cleaned_path, chunksize):
+    """Single bounded-memory pass; returns (summary, duplicate rows)
+
+    Each chunk is folded into the mergeable summary, its row hashes are
+    spilled for duplicate detection and its cleaned rows are appended to the
+    output, so memory is bounded by the chunk size.
+    """
+    summary = StreamSummary()
+    with DuplicateCounter() as duplicate_counter:
+        for i, chunk in enumerate(pd.read_csv(path, chunksize=chunksize)):
+            chunk = compact_frame(chunk)
+            summary.add(chunk)
+            duplicate_counter.add(chunk)
+            add_features(chunk).to_csv(cleaned_path, mode='a' if i else 'w',
+                                       header=not i, index=False)
+        duplicates = duplicate_counter.count()
+    return summary, duplicates
+
+
+def verify(csv_path, cleaned_path='ab_test_cleaned.csv',
+           summary_path='ab_test_summary.csv', stream=False,
+           chunksize=500_000):
+    """Scan an export and write its cleaned rows and summary metrics
+
+    Returns (summary, duplicate rows, ExperimentMetrics).
+    """
+    if stream:
+        summary, duplicates = scan_stream(csv_path, cleaned_path, chunksize)
+    else:
+        summary, duplicates = scan_full(csv_path, cleaned_path)
+    metrics = summarize_cube(summary.cube)
+    metrics.summary_metrics().to_csv(summary_path, index=False)
+    return summary, duplicates, metrics
+
+
+# Counts expected in the bundled ab_test_enriched.csv
+DEFAULT_EXPECTATIONS = {
+    'total_users': 2000,
+    'group_a_users': 987,
+    'group_b_users': 1013,
+}
+
+
+def observed_values(summary, duplicates, metrics):
+    """Checkable facts about a verified export
+
+    Users and the overall rate count every row, including rows with a
+    missing group, which the per-group values and tests leave out.
+    """
+    return {
+        'rows': summary.rows,
+        'total_users': metrics.total_users,
+        'ungrouped_users': metrics.ungrouped_users,
+        'group_a_users': int(metrics.users['A']),
+        'group_b_users': int(metrics.users['B']),
+        'missing_values': summary.missing,
+        'duplicates': int(duplicates),
+        'overall_rate': float(metrics.overall_rate),
+        'group_a_rate': float(metrics.rates['A']),
+        'group_b_rate': float(metrics.rates['B']),
+        'p_value_z': float(metrics.tests['p_value_z']),
+        'p_value_chi2': float(metrics.tests['p_value_chi2']),
+        'significant': bool(metrics.tests['p_value_z'] < 0.05),
+    }
+
+
+def check_expectations(observed, expected):
+    """Compare observed values with expectations
+
+    An expectation is either an exact value or a [low, high] range.
+    Returns {name: {'expected', 'actual', 'match'}}.
+    """
+    checks = {}
+    for name, want in expected.items():
+        actual = observed.get(name)
+        if actual is None:
+            match = False
+        elif isinstance(want, (list, tuple)):
+            match = want[0] <= actual <= want[1]
+        elif isinstance(want, float) or isinstance(actual, float):
+            match = math.isclose(actual, want, rel_tol=1e-9, abs_tol=1e-12)
+        else:
+            match = actual == want
+        checks[name] = {'expected': want, 'actual': actual, 'match': match}
+    return checks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verify an A/B test export against the dashboard")
+    parser.add_argument('csv_path', nargs='?', default='ab_test_enriched.csv')
+    parser.add_argument('--stream', action='store_true',
+                        help="Read in chunks with bounded memory")
+    parser.add_argument('--chunksize', type=int, default=500_000,
+                        help="Rows per chunk in --stream mode")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main analysis function"""
+    args = parse_args(argv)
+
     print("🔍 A/B TEST DATA ALIGNMENT VERIFICATION")
     print("=" * 60)
 
-    # Load data
-    df = pd.read_csv('ab_test_enriched.csv')
+    # Load data (the cleaned and summary exports are written in the same pass)
+    summary, duplicates, metrics = verify(args.csv_path, stream=args.stream,
+                                          chunksize=args.chunksize)
+    cube = summary.cube
 
     # 1. Basic Data Verification
     print("\n📊 BASIC DATA VERIFICATION:")
     print("-" * 40)
-    total_users = len(df)
-    group_a_users = len(df[df['group'] == 'A'])
-    group_b_users = len(df[df['group'] == 'B'])
+    observed = observed_values(summary, duplicates, metrics)
+    total_users = observed['total_users']
+    group_a_users = metrics.users['A']
+    group_b_users = metrics.users['B']
 
     print(f"Total users: {total_users:,}")
     print(f"Group A users: {group_a_users:,}")
     print(f"Group B users: {group_b_users:,}")
+    if observed['ungrouped_users']:
+        print(f"Users without a group: {observed['ungrouped_users']:,}")
     print(f"Group A percentage: {group_a_users/total_users*100:.2f}%")
     print(f"Group B percentage: {group_b_users/total_users*100:.2f}%")
 
     # Verify against expected values
-    expected_total = 2000
-    expected_group_a = 987
-    expected_group_b = 1013
+    checks = check_expectations(observed, DEFAULT_EXPECTATIONS)
 
     print(f"\n✅ VERIFICATION RESULTS:")
     print(
-        f"Total users match: {'Yes' if total_users == expected_total else 'No'}")
+        f"Total users match: {'Yes' if checks['total_users']['match'] else 'No'}")
     print(
-        f"Group A users match: {'Yes' if group_a_users == expected_group_a else 'No'}")
+        f"Group A users match: {'Yes' if checks['group_a_users']['match'] else 'No'}")
     print(
-        f"Group B users match: {'Yes' if group_b_users == expected_group_b else 'No'}")
+        f"Group B users match: {'Yes' if checks['group_b_users']['match'] else 'No'}")
 
     # 2. Data Quality Check
     print(f"\n🔍 DATA QUALITY CHECK:")
     print("-" * 40)
-    print(f"Missing values: {df.isnull().sum().sum()}")
-    print(f"Duplicates: {df.duplicated().sum()}")
+    print(f"Missing values: {summary.missing}")
+    print(f"Duplicates: {duplicates}")
     print(f"Data types:")
-    for col in df.columns:
-        print(f"  {col}: {df[col].dtype}")
+    for col, dtype in summary.dtypes.items():
+        print(f"  {col}: {dtype}")
 
     # 3. Conversion Rate Analysis
     print(f"\n🎯 CONVERSION RATE ANALYSIS:")
     print("-" * 40)
 
     # Overall conversion rate
-    total_conversions = df['converted'].sum()
-    overall_conv_rate = total_conversions / total_users
+    overall_conv_rate = observed['overall_rate']
 
     # Group-specific conversion rates
-    group_a_conv = df[df['group'] == 'A']['converted'].sum()
-    group_b_conv = df[df['group'] == 'B']['converted'].sum()
-    group_a_rate = group_a_conv / group_a_users
-    group_b_rate = group_b_conv / group_b_users
+    group_a_rate = metrics.rates['A']
+    group_b_rate = metrics.rates['B']
 
     print(
         f"Overall conversion rate: {overall_conv_rate:.4f} ({overall_conv_rate*100:.2f}%)")
@@ -92,31 +234,10 @@ def main():
     print(f"\n🔬 STATISTICAL TESTING:")
     print("-" * 40)
 
-    # Z-test for proportions
-    n_a, n_b = group_a_users, group_b_users
-    p_a, p_b = group_a_rate, group_b_rate
-
-    # Pooled proportion
-    p_pooled = (group_a_conv + group_b_conv) / (n_a + n_b)
-
-    # Standard error
-    se = np.sqrt(p_pooled * (1 - p_pooled) * (1/n_a + 1/n_b))
-
-    # Z-statistic
-    z_stat = (p_b - p_a) / se
-
-    # P-value (two-tailed)
-    p_value_z = 2 * (1 - stats.norm.cdf(abs(z_stat)))
-
-    # Chi-square test
-    contingency_table = pd.crosstab(df['group'], df['converted'])
-    chi2_stat, p_value_chi2, dof, expected = chi2_contingency(
-        contingency_table)
-
-    # Confidence interval
-    diff = p_b - p_a
-    ci_lower = diff - 1.96 * se
-    ci_upper = diff + 1.96 * se
+    tests = metrics.tests
+    z_stat, p_value_z = tests['z_statistic'], tests['p_value_z']
+    chi2_stat, p_value_chi2 = tests['chi2_statistic'], tests['p_value_chi2']
+    ci_lower, ci_upper = tests['ci_lower'], tests['ci_upper']
 
     print(f"Z-test statistic: {z_stat:.4f}")
     print(f"Z-test p-value: {p_value_z:.6f}")
@@ -134,68 +255,34 @@ def main():
 
     # Device analysis
     print("Device segmentation:")
-    device_analysis = df.groupby(['device', 'group'])['converted'].agg([
-        'count', 'sum', 'mean']).round(4)
-    device_analysis.columns = ['Users', 'Conversions', 'Conv_Rate']
+    device_analysis = segment_table(cube, 'device').round(4)
     print(device_analysis)
 
     # Channel analysis
     print("\nChannel segmentation:")
-    channel_analysis = df.groupby(['channel', 'group'])['converted'].agg([
-        'count', 'sum', 'mean']).round(4)
-    channel_analysis.columns = ['Users', 'Conversions', 'Conv_Rate']
+    channel_analysis = segment_table(cube, 'channel').round(4)
     print(channel_analysis)
 
     # Region analysis
     print("\nRegion segmentation:")
-    region_analysis = df.groupby(['region', 'group'])['converted'].agg([
-        'count', 'sum', 'mean']).round(4)
-    region_analysis.columns = ['Users', 'Conversions', 'Conv_Rate']
+    region_analysis = segment_table(cube, 'region').round(4)
     print(region_analysis)
 
     # 6. Summary Statistics
     print(f"\n📈 SUMMARY STATISTICS:")
     print("-" * 40)
 
-    summary_stats = df.groupby('group').agg({
-        'converted': ['count', 'sum', 'mean'],
-        'session_duration_sec': ['mean', 'std'],
-        'page_views': ['mean', 'std']
-    }).round(3)
-
-    summary_stats.columns = ['Users', 'Conversions', 'Conv_Rate',
-                             'Avg_Session_Duration', 'Std_Session_Duration', 'Avg_Page_Views', 'Std_Page_Views']
+    summary_stats = metrics.summary
     print(summary_stats)
 
     # 7. Data Export for Dashboard
     print(f"\n💾 EXPORTING DATA FOR DASHBOARD:")
     print("-" * 40)
 
-    # Clean data
-    df_clean = df.copy()
-    df_clean['visit_date'] = pd.to_datetime(df_clean['visit_date'])
-
-    # Add features
-    df_clean['visit_day'] = df_clean['visit_date'].dt.day
-    df_clean['visit_month'] = df_clean['visit_date'].dt.month
-    df_clean['visit_weekday'] = df_clean['visit_date'].dt.day_name()
-    df_clean['engagement_score'] = (
-        df_clean['session_duration_sec'] / 60) * df_clean['page_views']
-
-    # Save cleaned data
-    df_clean.to_csv('ab_test_cleaned.csv', index=False)
+    # Cleaned data with features was saved while loading
     print("✅ Cleaned data saved to 'ab_test_cleaned.csv'")
 
-    # Export summary metrics
-    summary_metrics = {
-        'metric': ['Total_Users', 'Group_A_Users', 'Group_B_Users', 'Group_A_Conv_Rate', 'Group_B_Conv_Rate',
-                   'Improvement_Percent', 'Z_Statistic', 'P_Value_Z', 'Chi2_Statistic', 'P_Value_Chi2'],
-        'value': [total_users, group_a_users, group_b_users, group_a_rate, group_b_rate,
-                  ((group_b_rate - group_a_rate) / group_a_rate) * 100, z_stat, p_value_z, chi2_stat, p_value_chi2]
-    }
-
-    summary_df = pd.DataFrame(summary_metrics)
-    summary_df.to_csv('ab_test_summary.csv', index=False)
+    # Summary metrics were exported with the cleaned data
     print("✅ Summary statistics saved to 'ab_test_summary.csv'")
 
     # 8. Final Verification